@@ -5,18 +5,64 @@ Root __init__
 """
 
 import logging
+from importlib import import_module
 from logging.config import dictConfig as _dictConfig
-from os import path
-
-import yaml
+from os import environ
 
 __author__ = "Samuel Marks"
 __version__ = "0.0.55"
 
+# Precompiled equivalent of `_data/logging.yml`, so no YAML is parsed at import time
+LOGGING_CONFIG = {
+    "version": 1,
+    "formatters": {
+        "simple": {
+            "format": "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+            "datefmt": "%Y-%m-%d %H:%M:%S",
+        }
+    },
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+            "level": "DEBUG",
+            "formatter": "simple",
+            "stream": "ext://sys.stdout",
+        }
+    },
+    "loggers": {
+        "simpleExample": {"level": "DEBUG", "handlers": ["console"], "propagate": False}
+    },
+    "root": {"level": "DEBUG", "handlers": ["console"]},
+}
+
+_logging_configured = False
+
+
+def configure_logging(config_filename=None):
+    """
+    Configure logging for this package. Runs `dictConfig` once; later calls are no-ops unless a file is given.
+
+    :param config_filename: YAML logging config to use instead of `LOGGING_CONFIG`, e.g., `_data/logging.yml`.
+      If None, falls back to the `DOCTRANS_LOGGING_CONFIG` env var, then to `LOGGING_CONFIG`.
+    :type config_filename: ```Optional[str]```
+    """
+    global _logging_configured
+    if _logging_configured and config_filename is None:
+        return
+    config_filename = config_filename or environ.get("DOCTRANS_LOGGING_CONFIG")
+    if config_filename is None:
+        config = LOGGING_CONFIG
+    else:
+        yaml = import_module("yaml")
+        with open(config_filename, "rt") as f:
+            config = yaml.load(f, Loader=yaml.SafeLoader)
+    _dictConfig(config)
+    _logging_configured = True
+
 
 def get_logger(name=None):
     """
-    Create a logger instance with the provided name, and default YAML config from this package
+    Create a logger instance with the provided name, configuring logging for this package on first call
 
     :param name: Name of logger instance. Usually the module name with filename dot-appended. None gives root logger.
     :type name: Optional[str]
@@ -24,13 +70,17 @@ def get_logger(name=None):
     :returns: logger instance
     :rtype: ```logging.Logger```
     """
-    with open(path.join(path.dirname(__file__), "_data", "logging.yml"), "rt") as f:
-        data = yaml.load(f, Loader=yaml.SafeLoader)
-    _dictConfig(data)
+    configure_logging()
     return logging.getLogger(name=name)
 
 
 root_logger = get_logger()
 logging.getLogger("blib2to3").setLevel(logging.WARNING)
 
-__all__ = ["get_logger", "root_logger", "__version__"]
+__all__ = [
+    "LOGGING_CONFIG",
+    "configure_logging",
+    "get_logger",
+    "root_logger",
+    "__version__",
+]
@@ -5,13 +5,26 @@
 """
 from argparse import ArgumentParser, Namespace
 from codecs import decode
+from collections import OrderedDict
 from os import path
+from subprocess import CalledProcessError
 
 from doctrans import __version__
-from doctrans.conformance import ground_truth
+from doctrans.cache import caches_disabled
+from doctrans.conformance import (
+    affected_groups,
+    changed_paths,
+    ground_truth,
+    ground_truths,
+    load_manifest,
+)
+from doctrans.daemon import DEFAULT_SOCKET, serve
+from doctrans.emit import FORMATTERS, using_formatter
 from doctrans.gen import gen
 from doctrans.pure_utils import pluralise
 from doctrans.sync_properties import sync_properties
+from doctrans.watch import watch_gen, watch_sync
+from doctrans.writer import BatchWriteError
 
 
 def _build_parser():
@@ -28,6 +41,19 @@ def _build_parser():
     parser.add_argument(
         "--version", action="version", version="%(prog)s {}".format(__version__)
     )
+    parser.add_argument(
+        "--no-cache",
+        help="Don't read or write the on-disk caches, of parsed files and of emitted code.",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--formatter",
+        help=(
+            "Formatter for the code written. `builtin` lays out the code doctrans emits"
+            " directly, falling back to black for anything else. Defaults to black."
+        ),
+        choices=FORMATTERS,
+    )
 
     subparsers = parser.add_subparsers()
     subparsers.required = True
@@ -94,6 +120,14 @@ def _build_parser():
             " str]]`"
         ),
     )
+    property_parser.add_argument(
+        "--check",
+        help=(
+            "Write nothing. Print each file that would change, and exit non-zero if any"
+            " would."
+        ),
+        action="store_true",
+    )
 
     ########
     # Sync #
@@ -147,7 +181,8 @@ def _build_parser():
         type=str,
         dest="function_names",
     )
-    sync_parser.add_argument(
+    truth_or_manifest = sync_parser.add_mutually_exclusive_group(required=True)
+    truth_or_manifest.add_argument(
         "--truth",
         help=(
             "Single source of truth. Others will be generated from this. Will run with"
@@ -155,7 +190,57 @@ def _build_parser():
         ),
         choices=("argparse_function", "class", "function"),
         type=str,
-        required=True,
+    )
+    truth_or_manifest.add_argument(
+        "--manifest",
+        help=(
+            "Manifest (TOML, or YAML) of many `[[sync]]` groups, each taking the above"
+            " arguments. Instead of `--truth`."
+        ),
+        type=str,
+    )
+    sync_parser.add_argument(
+        "--jobs",
+        "-j",
+        help=(
+            "Number of processes to conform files with (with `--manifest`, to format"
+            " them with). 0 uses one per CPU."
+        ),
+        type=int,
+        default=1,
+    )
+    sync_parser.add_argument(
+        "--check",
+        help=(
+            "Write nothing. Print each file that would change, and exit non-zero if any"
+            " would."
+        ),
+        action="store_true",
+    )
+    sync_parser.add_argument(
+        "--lock",
+        help=(
+            "Skip the files unchanged since they were conformed to an unchanged truth,"
+            " per the hashes recorded in the truth's directory's `.doctrans.lock`."
+        ),
+        action="store_true",
+    )
+    sync_parser.add_argument(
+        "--changed-only",
+        help=(
+            "Sync only the groups with a file among these changed paths (`-` reads more"
+            " from stdin); or, if none are given, among those staged in git."
+        ),
+        nargs="*",
+        metavar="PATH",
+    )
+    sync_parser.add_argument(
+        "--watch",
+        help=(
+            "Keep running: re-sync each group whenever any of its files changes (or,"
+            " for every group, the manifest). Stop with Ctrl+C."
+        ),
+        action="store_true",
     )
 
     #######
@@ -214,10 +299,117 @@ def _build_parser():
         type=str,
         dest="decorator_list",
     )
+    gen_parser.add_argument(
+        "--jobs",
+        "-j",
+        help="Number of processes to parse and emit the symbols with. 0 uses one per CPU.",
+        type=int,
+        default=1,
+    )
+    gen_parser.add_argument(
+        "--incremental",
+        help=(
+            "Update the output file in-place, regenerating only the symbols whose source"
+            " changed since the hashes recorded in its directory's `.doctrans.lock`."
+        ),
+        action="store_true",
+    )
+    gen_parser.add_argument(
+        "--check",
+        help=(
+            "Write nothing. Print each file that would change, and exit non-zero if any"
+            " would."
+        ),
+        action="store_true",
+    )
+    gen_parser.add_argument(
+        "--watch",
+        help=(
+            "Keep running: regenerate, incrementally, whenever the input mapping's"
+            " module changes. Stop with Ctrl+C."
+        ),
+        action="store_true",
+    )
+
+    #########
+    # Serve #
+    #########
+    serve_parser = subparsers.add_parser(
+        "serve",
+        help=(
+            "Serve sync, sync_properties, and gen requests from a warm process over a"
+            " Unix socket. Use `python -m doctrans.daemon` as the client."
+        ),
+    )
+
+    serve_parser.add_argument(
+        "--socket",
+        help="Unix socket to listen on. Defaults to $DOCTRANS_SOCKET, else one in $XDG_RUNTIME_DIR, else one in a"
+        " directory of the temp dir private to you.",
+        default=DEFAULT_SOCKET,
+        dest="socket_path",
+    )
 
     return parser
 
 
+def _exit_on_drift(parser, drifted_filenames):
+    """
+    Print each file that would change and, if any would, exit non-zero
+
+    :param parser: The CLI parser, to exit with
+    :type parser: ```ArgumentParser```
+
+    :param drifted_filenames: Files that would change
+    :type drifted_filenames: ```Iterable[str]```
+    """
+    drifted_filenames = tuple(drifted_filenames)
+    for filename in drifted_filenames:
+        print("drifted", filename, sep="\t")
+    if drifted_filenames:
+        parser.exit(1, "{:d} file(s) would change\n".format(len(drifted_filenames)))
+
+
+def _changed_paths(parser, paths):
+    """
+    The paths changed, for `--changed-only`
+
+    :param parser: The CLI parser, to report errors with
+    :type parser: ```ArgumentParser```
+
+    :param paths: Changed paths, and/or "-" to read more from stdin. If empty, those staged in git.
+    :type paths: ```List[str]```
+
+    :returns: Resolved paths changed
+    :rtype: ```FrozenSet[str]```
+    """
+    try:
+        return changed_paths(paths)
+    except (OSError, CalledProcessError) as e:
+        parser.error(
+            "--changed-only couldn't list the files staged in git: {}".format(e)
+        )
+
+
+def _watch(watch_func, *args, **kwargs):
+    """
+    Watch, until interrupted
+
+    :param watch_func: `watch_sync` or `watch_gen`
+    :type watch_func: ```Callable[..., None]```
+
+    :param args: Passed to `watch_func`
+    :type args: ```Any```
+
+    :param kwargs: Passed to `watch_func`
+    :type kwargs: ```Any```
+    """
+    try:
+        watch_func(*args, **kwargs)
+    except KeyboardInterrupt:
+        pass
+
+
 def main(cli_argv=None, return_args=False):
     """
     Run the CLI parser
@@ -233,67 +425,238 @@ def main(cli_argv=None, return_args=False):
     """
     _parser = _build_parser()
     args = _parser.parse_args(args=cli_argv)
+    with caches_disabled(args.no_cache), using_formatter(args.formatter):
+        return _run(_parser, args, return_args)
+
+
+def _run(_parser, args, return_args):
+    """
+    Run the command the CLI arguments were parsed into
+
+    :param _parser: The CLI parser, to report errors with
+    :type _parser: ```ArgumentParser```
+
+    :param args: Namespace with the values of the CLI arguments
+    :type args: ```Namespace```
+
+    :param return_args: Primarily use is for tests. Returns the args rather than executing anything.
+    :type return_args: ```bool```
+
+    :returns: the args if `return_args`, else None
+    :rtype: ```Optional[Namespace]```
+    """
     command = args.command
-    args_dict = {k: v for k, v in vars(args).items() if k != "command"}
-    if command == "sync":
-        args = Namespace(
-            **{
-                k: v if k == "truth" or isinstance(v, list) or v is None else [v]
-                for k, v in args_dict.items()
-            }
+    args_dict = {
+        k: v
+        for k, v in vars(args).items()
+        if k
+        not in frozenset(("command", "no_cache", "formatter", "changed_only", "watch"))
+    }
+    if command == "sync" and args.manifest is not None:
+        return _sync_manifest(_parser, args, return_args)
+    elif command == "sync":
+        return _sync(_parser, args, args_dict, return_args)
+    elif command == "sync_properties":
+        return _sync_properties(_parser, args, args_dict)
+    elif command == "gen":
+        return _gen(_parser, args, args_dict)
+    elif command == "serve":
+        serve(**args_dict)
+
+
+def _sync_manifest(_parser, args, return_args):
+    """
+    Run `sync --manifest`
+
+    :param _parser: The CLI parser, to report errors with
+    :type _parser: ```ArgumentParser```
+
+    :param args: Namespace with the values of the CLI arguments
+    :type args: ```Namespace```
+
+    :param return_args: Primarily use is for tests. Returns the args rather than executing anything.
+    :type return_args: ```bool```
+
+    :returns: the args if `return_args`, else whether each file drifted (or changed)
+    :rtype: ```Optional[Union[Namespace, OrderedDict]]```
+    """
+    if any(
+        getattr(args, dest) is not None
+        for dest in (
+            "argparse_functions",
+            "argparse_function_names",
+            "classes",
+            "class_names",
+            "functions",
+            "function_names",
+        )
+    ):
+        _parser.error(
+            "--manifest can't be combined with `--argparse-function`, `--class`,"
+            " or `--function` (nor their names); give them in the manifest"
+        )
+    elif not path.isfile(args.manifest):
+        _parser.error(
+            "--manifest must be an existent file. Got: {!r}".format(args.manifest)
+        )
+    if return_args:
+        return args
+    groups = load_manifest(args.manifest)
+    if args.changed_only is not None:
+        groups = affected_groups(groups, _changed_paths(_parser, args.changed_only))
+    if args.watch:
+        return _watch(
+            watch_sync,
+            groups,
+            manifest=args.manifest,
+            check=args.check,
+            jobs=args.jobs,
+            lock=args.lock,
+        )
+    try:
+        effect = ground_truths(
+            groups,
+            check=args.check,
+            jobs=args.jobs,
+            lock=args.lock,
         )
+    except BatchWriteError as e:
+        _parser.exit(1, "{}\n".format(e))
+    if args.check:
+        _exit_on_drift(_parser, (k for k, v in effect.items() if v))
+    return effect
 
-        truth_file = getattr(args, pluralise(args.truth))
-        if truth_file is None:
-            _parser.error("--truth must be an existent file. Got: None")
-        else:
-            truth_file = truth_file[0]
 
-        truth_file = path.realpath(path.expanduser(truth_file))
+def _sync(_parser, args, args_dict, return_args):
+    """
+    Run `sync` with `--truth`
+
+    :param _parser: The CLI parser, to report errors with
+    :type _parser: ```ArgumentParser```
+
+    :param args: Namespace with the values of the CLI arguments
+    :type args: ```Namespace```
+
+    :param args_dict: The CLI arguments to pass on, as keyword arguments
+    :type args_dict: ```dict```
+
+    :param return_args: Primarily use is for tests. Returns the args rather than executing anything.
+    :type return_args: ```bool```
+
+    :returns: the args if `return_args`, else whether each file drifted (or changed)
+    :rtype: ```Optional[Union[Namespace, OrderedDict]]```
+    """
+    changed_only, watch = args.changed_only, args.watch
+    args = Namespace(
+        **{
+            k: v
+            if k in frozenset(("truth", "jobs", "manifest", "check", "lock"))
+            or isinstance(v, list)
+            or v is None
+            else [v]
+            for k, v in args_dict.items()
+        }
+    )
 
-        number_of_files = sum(
-            len(val)
-            for key, val in vars(args).items()
-            if isinstance(val, list) and not key.endswith("_names")
+    truth_file = getattr(args, pluralise(args.truth))
+    if truth_file is None:
+        _parser.error("--truth must be an existent file. Got: None")
+    else:
+        truth_file = truth_file[0]
+
+    truth_file = path.realpath(path.expanduser(truth_file))
+
+    number_of_files = sum(
+        len(val)
+        for key, val in vars(args).items()
+        if isinstance(val, list) and not key.endswith("_names")
+    )
+
+    if number_of_files < 2:
+        _parser.error(
+            "Two or more of `--argparse-function`, `--class`, and `--function` must"
+            " be specified"
         )
+    elif truth_file is None or not path.isfile(truth_file):
+        _parser.error("--truth must be an existent file. Got: {!r}".format(truth_file))
 
-        if number_of_files < 2:
-            _parser.error(
-                "Two or more of `--argparse-function`, `--class`, and `--function` must"
-                " be specified"
-            )
-        elif truth_file is None or not path.isfile(truth_file):
-            _parser.error(
-                "--truth must be an existent file. Got: {!r}".format(truth_file)
-            )
+    if return_args:
+        return args
+    elif watch:
+        return _watch(
+            watch_sync, [args], check=args.check, jobs=args.jobs, lock=args.lock
+        )
+    elif changed_only is not None and not affected_groups(
+        [args], _changed_paths(_parser, changed_only)
+    ):
+        effect = OrderedDict()
+    else:
+        effect = ground_truth(args, truth_file)
+    if args.check:
+        _exit_on_drift(_parser, (k for k, v in effect.items() if v))
+    return effect
 
-        return args if return_args else ground_truth(args, truth_file)
-    elif command == "sync_properties":
-        for fname in "input_filename", "output_filename":
-            if path.isfile(getattr(args, fname)):
-                setattr(
-                    args, fname, path.realpath(path.expanduser(getattr(args, fname)))
-                )
-        if args.input_filename is None or not path.isfile(args.input_filename):
-            _parser.error(
-                "--input-file must be an existent file. Got: {!r}".format(
-                    args.input_filename
-                )
-            )
-        elif args.output_filename is None or not path.isfile(args.output_filename):
-            _parser.error(
-                "--output-file must be an existent file. Got: {!r}".format(
-                    args.output_filename
-                )
+
+def _sync_properties(_parser, args, args_dict):
+    """
+    Run `sync_properties`
+
+    :param _parser: The CLI parser, to report errors with
+    :type _parser: ```ArgumentParser```
+
+    :param args: Namespace with the values of the CLI arguments
+    :type args: ```Namespace```
+
+    :param args_dict: The CLI arguments to pass on, as keyword arguments
+    :type args_dict: ```dict```
+    """
+    for fname in "input_filename", "output_filename":
+        if path.isfile(getattr(args, fname)):
+            setattr(args, fname, path.realpath(path.expanduser(getattr(args, fname))))
+    if args.input_filename is None or not path.isfile(args.input_filename):
+        _parser.error(
+            "--input-file must be an existent file. Got: {!r}".format(
+                args.input_filename
             )
-        sync_properties(**args_dict)
-    elif command == "gen":
-        if path.isfile(args.output_filename):
-            raise IOError(
-                "File exists and this is a destructive operation. Delete/move {!r} then"
-                " rerun.".format(args.output_filename)
+        )
+    elif args.output_filename is None or not path.isfile(args.output_filename):
+        _parser.error(
+            "--output-file must be an existent file. Got: {!r}".format(
+                args.output_filename
             )
-        gen(**args_dict)
+        )
+    drifted = sync_properties(**args_dict)
+    if args.check:
+        _exit_on_drift(_parser, (args.output_filename,) if drifted else ())
+
+
+def _gen(_parser, args, args_dict):
+    """
+    Run `gen`
+
+    :param _parser: The CLI parser, to report errors with
+    :type _parser: ```ArgumentParser```
+
+    :param args: Namespace with the values of the CLI arguments
+    :type args: ```Namespace```
+
+    :param args_dict: The CLI arguments to pass on, as keyword arguments
+    :type args_dict: ```dict```
+
+    :raises IOError: If the output file exists, and would be overwritten
+    """
+    if path.isfile(args.output_filename) and not (
+        args.check or args.incremental or args.watch
+    ):
+        raise IOError(
+            "File exists and this is a destructive operation. Delete/move {!r} then"
+            " rerun.".format(args.output_filename)
+        )
+    elif args.watch:
+        return _watch(watch_gen, **args_dict)
+    drifted = gen(**args_dict)
+    if args.check:
+        _exit_on_drift(_parser, (args.output_filename,) if drifted else ())
 
 
 if __name__ == "__main__":
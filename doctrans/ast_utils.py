@@ -31,17 +31,18 @@ from ast import (
     keyword,
     walk,
 )
+from collections import OrderedDict
 from contextlib import suppress
 from copy import deepcopy
+from hashlib import blake2b
 from importlib import import_module
 from inspect import isclass, isfunction
 from json import dumps
 from operator import inv, neg, not_, pos
 from sys import version_info
 
-from yaml import safe_dump_all
-
 from doctrans.defaults_utils import extract_default, needs_quoting
+from doctrans.ir import Param
 from doctrans.pure_utils import (
     PY_GTE_3_8,
     PY_GTE_3_9,
@@ -583,18 +584,18 @@ def func_arg2param(func_arg, default=None):
     :param default: The default value, if None isn't added to returned dict
     :type default: ```Optional[Any]```
 
-    :returns: Name, dict with keys: 'typ', 'doc', 'default'
-    :rtype: ```Tuple[str, dict]```
+    :returns: Name, `Param` with keys: 'typ', 'doc', 'default'
+    :rtype: ```Tuple[str, Param]```
     """
-    return func_arg.arg, dict(
+    param = Param(
+        typ=None
+        if func_arg.annotation is None
+        else _to_code(func_arg.annotation).rstrip("\n"),
         doc=getattr(func_arg, "type_comment", None),
-        **dict(
-            typ=None
-            if func_arg.annotation is None
-            else _to_code(func_arg.annotation).rstrip("\n"),
-            **({} if default is None else {"default": default})
-        )
     )
+    if default is not None:
+        param["default"] = default
+    return func_arg.arg, param
 
 
 # def needs_quoting(node):
@@ -813,14 +814,16 @@ def find_in_ast(search, node):
        Can be top level like `['a']` for `a=5` or E.g., `['A', 'F']` for `class A: F`, `['f', 'g']` for `def f(g): ...`
     :type search: ```List[str]```
 
-    :param node: AST node (must have a `body`)
+    :param node: AST node (must have a `body`). If annotated by `annotate_ancestry`, its location index is tried
+      first; see `_find_indexed`.
     :type node: ```AST```
 
     :returns: AST node that was found, or None if nothing was found
     :rtype: ```Optional[AST]```
     """
-    if not search or hasattr(node, "_location") and node._location == search:
-        return node
+    found = _find_indexed(search, node)
+    if found is not None:
+        return found
 
     child_node, cursor, current_search = node, node.body, deepcopy(search)
     while len(current_search):
@@ -865,6 +868,37 @@ def find_in_ast(search, node):
                 break
 
 
+def _find_indexed(search, node):
+    """
+    Find the node at `search` without walking: `node` itself, if `search` is empty or its location; else the node in
+    the location index of a module annotated by `annotate_ancestry`, setting the `default` of an argument that has one.
+
+    This is the first node at that location, in the order `RewriteAtQuery` visits them; so what is found is what it
+    would replace. Unlike the walk in `find_in_ast`, that includes keyword-only arguments, and nodes nested within
+    other statements, e.g., within an `if`.
+
+    :param search: Location within AST of property
+    :type search: ```List[str]```
+
+    :param node: AST node; with a location index if annotated by `annotate_ancestry`
+    :type node: ```AST```
+
+    :returns: AST node that was found, or None if it isn't indexed
+    :rtype: ```Optional[AST]```
+    """
+    if not search or hasattr(node, "_location") and node._location == search:
+        return node
+    entry = getattr(node, "_location_index", {}).get(tuple(search))
+    if entry is None:
+        return None
+    found, parent, field, idx = entry
+    if isinstance(found, ast.arg):
+        defaults = parent.defaults if field == "args" else parent.kw_defaults
+        if len(defaults) > idx and defaults[idx] is not None:
+            setattr(found, "default", defaults[idx])
+    return found
+
+
 def annotate_ancestry(node):
     """
     Look to your roots. Find the child; find the parent.
@@ -876,6 +910,18 @@ def annotate_ancestry(node):
     :returns: Annotated AST node; also `node` arg will be annotated in-place.
     :rtype: ```AST```
     """
+    _annotate_locations(node)
+    node._location_index = _index_locations(node, {})
+    return node
+
+
+def _annotate_locations(node):
+    """
+    Sets _location attribute to every child node, and _idx to every argument of every child function.
+
+    :param node: AST node. Will be annotated in-place.
+    :type node: ```AST```
+    """
     # print("annotating", getattr(node, "name", None))
     node._location = [node.name] if hasattr(node, "name") else []
     parent_location = []
@@ -934,7 +980,182 @@ def annotate_ancestry(node):
                         ),
                     )
                 )
-    return node
+
+
+def _index_locations(node, index, parent=None, field=None, idx=None):
+    """
+    Index `node` and its descendants by `_location`, in the pre-order `RewriteAtQuery` visits them in.
+    The first node at a location wins. Like `find_in_ast` and `RewriteAtQuery`, the body of a function isn't
+    descended into—only its arguments—and constants (whose `_location` is derived from their value) are skipped.
+
+    :param node: AST node, annotated by `_annotate_locations`
+    :type node: ```AST```
+
+    :param index: Index to add to, in-place
+    :type index: ```dict```
+
+    :param parent: Parent of `node`
+    :type parent: ```Optional[AST]```
+
+    :param field: Field of `parent` that `node` is in
+    :type field: ```Optional[str]```
+
+    :param idx: Index of `node` within that field, if the field is a list
+    :type idx: ```Optional[int]```
+
+    :returns: `index`, mapping location tuple to (node, parent, field, index within field)
+    :rtype: ```Dict[Tuple[str, ...], Tuple[AST, Optional[AST], Optional[str], Optional[int]]]```
+    """
+    stack = [(node, parent, field, idx)]
+    while stack:
+        entry = stack.pop()
+        _node = entry[0]
+        if hasattr(_node, "_location") and not isinstance(_node, (Constant, Str)):
+            index.setdefault(tuple(_node._location), entry)
+        if isinstance(_node, FunctionDef):
+            children = (
+                (_arg, _node.args, arg_attr, i)
+                for arg_attr in ("args", "kwonlyargs")
+                for i, _arg in enumerate(getattr(_node.args, arg_attr))
+            )
+        else:
+            children = (
+                (child, _node, name, i)
+                for name, value in ast.iter_fields(_node)
+                for i, child in (
+                    enumerate(value) if isinstance(value, list) else ((None, value),)
+                )
+                if isinstance(child, AST)
+            )
+        stack.extend(reversed(tuple(children)))
+    return index
+
+
+def _unindex_locations(node, index):
+    """
+    Remove `node` and its descendants from the index
+
+    :param node: AST node
+    :type node: ```AST```
+
+    :param index: Index to remove from, in-place; as created by `_index_locations`
+    :type index: ```dict```
+    """
+    for _node in walk(node):
+        if hasattr(_node, "_location") and not isinstance(_node, (Constant, Str)):
+            location = tuple(_node._location)
+            if location in index and index[location][0] is _node:
+                del index[location]
+
+
+def ast_fingerprint(node):
+    """
+    Structural hash of the node: its type and fields, recursively. Like `cmp_ast`, ignores line numbers, column
+    offsets, and the `_location` and `_idx` annotations. Cached on each node hashed, as `_fingerprint`; the
+    rewriters drop it from the ancestors of what they replace.
+
+    :param node: AST node
+    :type node: ```AST```
+
+    :returns: Fingerprint, equal for structurally equal nodes
+    :rtype: ```bytes```
+    """
+    fingerprint = node.__dict__.get("_fingerprint")
+    if fingerprint is None:
+        parts = [type(node).__name__.encode()]
+        for field in node._fields:
+            parts.append(field.encode())
+            _fingerprint_parts(getattr(node, field, _undefined), parts)
+        fingerprint = node._fingerprint = blake2b(
+            b"\0".join(parts), digest_size=16
+        ).digest()
+    return fingerprint
+
+
+# Stands in for a field missing from a node, as distinct from one set to None
+_undefined = object()
+
+
+def _fingerprint_parts(value, parts):
+    """
+    Add the parts of a field value's fingerprint. Scalars are length-prefixed, so no two values' parts run together.
+
+    :param value: Field value; an AST node, list thereof, or scalar
+    :type value: ```Any```
+
+    :param parts: Parts of the fingerprint being built, appended to in-place
+    :type parts: ```List[bytes]```
+    """
+    if isinstance(value, AST):
+        parts.append(b"n" + ast_fingerprint(value))
+    elif type(value) is list:
+        parts.append(b"l%d" % len(value))
+        for elem in value:
+            _fingerprint_parts(elem, parts)
+    elif value is _undefined:
+        parts.append(b"u")
+    else:
+        scalar = repr((type(value).__name__, value)).encode()
+        parts.append(b"v%d:%s" % (len(scalar), scalar))
+
+
+def cmp_ast(node0, node1):
+    """
+    Whether the nodes are structurally equal; as `meta.asttools.cmp_ast`. Returns at the first difference found.
+    Where both nodes (at any depth) already have a fingerprint from `ast_fingerprint`, only those are compared.
+
+    :param node0: AST node, list thereof, or scalar
+    :type node0: ```Any```
+
+    :param node1: AST node, list thereof, or scalar
+    :type node1: ```Any```
+
+    :returns: Whether `node0` and `node1` are equal
+    :rtype: ```bool```
+    """
+    if type(node0) is not type(node1):
+        return False
+    elif isinstance(node0, AST):
+        fingerprint0 = node0.__dict__.get("_fingerprint")
+        if fingerprint0 is not None:
+            fingerprint1 = node1.__dict__.get("_fingerprint")
+            if fingerprint1 is not None:
+                return fingerprint0 == fingerprint1
+        for field in node0._fields:
+            if not cmp_ast(
+                getattr(node0, field, _undefined), getattr(node1, field, _undefined)
+            ):
+                return False
+        return True
+    elif type(node0) is list:
+        if len(node0) != len(node1):
+            return False
+        for elem0, elem1 in zip(node0, node1):
+            if not cmp_ast(elem0, elem1):
+                return False
+        return True
+    return node0 == node1
+
+
+def _forget_fingerprints(node, index, search):
+    """
+    Drop the cached fingerprints of the root, and of the indexed nodes (and their parents) along the query,
+    as a node beneath them was replaced in-place
+
+    :param node: Root AST node
+    :type node: ```AST```
+
+    :param index: Location index of `node`, as created by `_index_locations`
+    :type index: ```dict```
+
+    :param search: Search query, e.g., ['node_name', 'function_name', 'arg_name']
+    :type search: ```List[str]```
+    """
+    node.__dict__.pop("_fingerprint", None)
+    for end in range(1, len(search) + 1):
+        for ancestor in index.get(tuple(search[:end]), (None, None))[:2]:
+            if ancestor is not None:
+                ancestor.__dict__.pop("_fingerprint", None)
 
 
 class RewriteAtQuery(NodeTransformer):
@@ -958,6 +1179,49 @@ class RewriteAtQuery(NodeTransformer):
         self.replacement_node = replacement_node
         self.replaced = False
 
+    def visit(self, node):
+        """
+        Visit the node. If it was annotated by `annotate_ancestry`, its location index is used to go straight to
+        the query—rather than traversing the whole tree—and is kept up-to-date with the replacement.
+
+        :param node: The AST node
+        :type node: ```AST```
+
+        :returns: Potentially changed AST node
+        :rtype: ```AST```
+        """
+        index = getattr(node, "_location_index", None)
+        entry = (
+            None if index is None or self.replaced else index.get(tuple(self.search))
+        )
+        if entry is None or entry[1] is None:
+            return NodeTransformer.visit(self, node)
+
+        found, parent, field, idx = entry
+        _forget_fingerprints(node, index, self.search)
+        if isinstance(found, ast.arg):
+            function_def = index.get(tuple(self.search[:-1]), (None,))[0]
+            if isinstance(function_def, FunctionDef):
+                self.visit_FunctionDef(function_def)
+                if self.replaced:
+                    index[tuple(self.search)] = (
+                        getattr(parent, field)[idx],
+                        parent,
+                        field,
+                        idx,
+                    )
+        elif not isinstance(found, FunctionDef):
+            _unindex_locations(found, index)
+            _annotate_locations(self.replacement_node)
+            self.replacement_node._location = found._location
+            if idx is None:
+                setattr(parent, field, self.replacement_node)
+            else:
+                getattr(parent, field)[idx] = self.replacement_node
+            _index_locations(self.replacement_node, index, parent, field, idx)
+            self.replaced = True
+        return node
+
     def generic_visit(self, node):
         """
         visits the `AST`, if it's the right one, replace it
@@ -975,8 +1239,13 @@ class RewriteAtQuery(NodeTransformer):
         ):
             self.replaced = True
             return self.replacement_node
-        else:
+        elif self.replaced:
             return NodeTransformer.generic_visit(self, node)
+        node = NodeTransformer.generic_visit(self, node)
+        if self.replaced:
+            # Replaced beneath this node
+            node.__dict__.pop("_fingerprint", None)
+        return node
 
     def visit_FunctionDef(self, node):
         """
@@ -1028,6 +1297,8 @@ class RewriteAtQuery(NodeTransformer):
                     new_default = get_value(self.replacement_node)
                     if new_default is not None:
                         node.args.defaults[idx] = new_default
+                        for changed in node, node.args:
+                            changed.__dict__.pop("_fingerprint", None)
 
                 self.replacement_node = emit_arg(self.replacement_node)
             assert isinstance(
@@ -1041,13 +1312,129 @@ class RewriteAtQuery(NodeTransformer):
                         hasattr(arg_l[idx], "_location")
                         and arg_l[idx]._location == self.search
                     ):
-                        arg_l[idx] = emit_arg(self.replacement_node)
+                        new_arg = emit_arg(self.replacement_node)
+                        new_arg._location = arg_l[idx]._location
+                        if hasattr(arg_l[idx], "_idx"):
+                            new_arg._idx = arg_l[idx]._idx
+                        arg_l[idx] = new_arg
                         self.replaced = True
+                        for changed in node, node.args:
+                            changed.__dict__.pop("_fingerprint", None)
                         break
 
         return node
 
 
+class RewriteAtQueries(NodeTransformer):
+    """
+    Replace the nodes at many queries with their given nodes, in one traversal
+
+    :ivar replacements: Search query to the node to replace it with, e.g., `{('node_name', 'arg_name'): AST}`
+    :ivar replaced: Search query to whether its node has been replaced (only replaces first occurrence)
+    """
+
+    def __init__(self, replacements):
+        """
+        :param replacements: Search query to the node to replace it with, e.g., `{('node_name', 'arg_name'): AST}`
+        :type replacements: ```Union[Dict[Tuple[str, ...], AST], Iterable[Tuple[List[str], AST]]]```
+        """
+        self.replacements = OrderedDict(
+            (tuple(search), replacement_node)
+            for search, replacement_node in (
+                replacements.items() if hasattr(replacements, "items") else replacements
+            )
+        )
+        self.replaced = OrderedDict((search, False) for search in self.replacements)
+        # Queries yet to be replaced, while traversing; else None
+        self._pending = None
+        self._pending_args = None
+
+    def visit(self, node):
+        """
+        Visit the node. If it was annotated by `annotate_ancestry`, each query found in its location index is
+        replaced directly. The remaining queries are replaced in one traversal of the whole tree.
+
+        :param node: The AST node
+        :type node: ```AST```
+
+        :returns: Potentially changed AST node
+        :rtype: ```AST```
+        """
+        if self._pending is not None:
+            return NodeTransformer.visit(self, node)
+
+        searches = tuple(self.replacements)
+        index = getattr(node, "_location_index", None)
+        if index is not None:
+            # Only the queries missing from the index (or at the root itself) need a traversal
+            missing = []
+            for search in searches:
+                entry = index.get(search)
+                if entry is None or entry[1] is None:
+                    missing.append(search)
+                else:
+                    rewrite_at_query = RewriteAtQuery(
+                        list(search), self.replacements[search]
+                    )
+                    rewrite_at_query.visit(node)
+                    self.replaced[search] = rewrite_at_query.replaced
+            searches = missing
+
+        if not searches:
+            return node
+        self._pending = {search: self.replacements[search] for search in searches}
+        self._pending_args = {}
+        for search in searches:
+            self._pending_args.setdefault(search[:-1], []).append(search)
+        try:
+            return NodeTransformer.visit(self, node)
+        finally:
+            self._pending, self._pending_args = None, None
+
+    def generic_visit(self, node):
+        """
+        visits the `AST`, if it's at one of the queries, replace it
+
+        :param node: The AST node
+        :type node: ```AST```
+
+        :returns: Potentially changed AST node
+        :rtype: ```AST```
+        """
+        if hasattr(node, "_location"):
+            search = tuple(node._location)
+            if search in self._pending:
+                self.replaced[search] = True
+                return self._pending.pop(search)
+        pending = len(self._pending)
+        node = NodeTransformer.generic_visit(self, node)
+        if len(self._pending) != pending:
+            # Replaced beneath this node
+            node.__dict__.pop("_fingerprint", None)
+        return node
+
+    def visit_FunctionDef(self, node):
+        """
+        visits the `FunctionDef`, replacing any of its arguments that are at one of the queries
+
+        :param node: FunctionDef
+        :type node: ```FunctionDef```
+
+        :returns: Potentially changed FunctionDef
+        :rtype: ```FunctionDef```
+        """
+        if not hasattr(node, "_location"):
+            return node
+        for search in self._pending_args.get(tuple(node._location), ()):
+            if search in self._pending:
+                rewrite_at_query = RewriteAtQuery(list(search), self._pending[search])
+                rewrite_at_query.visit_FunctionDef(node)
+                if rewrite_at_query.replaced:
+                    self.replaced[search] = True
+                    del self._pending[search]
+        return node
+
+
 def emit_ann_assign(node):
     """
     Produce an `AnnAssign` from the input
@@ -1166,7 +1553,7 @@ def infer_type_and_default(action, default, typ, required):
             default = dumps(default)
         except TypeError:
             # YAML is more permissive though less concise, but `loads` from yaml is used so this works
-            default = safe_dump_all(default)
+            default = getattr(import_module("yaml"), "safe_dump_all")(default)
     elif default is None:
         if "Optional" not in (typ or iter(())) and typ not in frozenset(
             ("Any", "pickle.loads", "loads")
@@ -1332,8 +1719,11 @@ __all__ = [
     "FALLBACK_ARGPARSE_TYP",
     "FALLBACK_TYP",
     "NoneStr",
+    "RewriteAtQueries",
     "RewriteAtQuery",
     "annotate_ancestry",
+    "ast_fingerprint",
+    "cmp_ast",
     "emit_ann_assign",
     "emit_arg",
     "find_ast_type",
@@ -0,0 +1,322 @@
+"""
+Size-bounded on-disk cache for results that are expensive to recompute, e.g., parsed and annotated ASTs.
+
+Caching is opt-in: entries live under `$DOCTRANS_CACHE_DIR`, if set, in one directory per namespace, Python
+implementation & version, and doctrans version. Each namespace is kept under `DOCTRANS_CACHE_MAX_SIZE` bytes by
+evicting the least recently used entries.
+
+Entries are signed with a secret kept outside the cache—in `$DOCTRANS_CACHE_KEY_FILE` (default:
+`$XDG_CONFIG_HOME/doctrans/cache.key` or `~/.config/doctrans/cache.key`), generated readable only by its owner—and
+those whose signature doesn't match are ignored; so an entry planted in a shared or restored cache directory is
+never read back (and unpickled).
+"""
+
+import hmac
+from contextlib import contextmanager
+from hashlib import sha256
+from os import (
+    O_CREAT,
+    O_EXCL,
+    O_WRONLY,
+    environ,
+    fstat,
+    makedirs,
+    open as os_open,
+    path,
+    remove,
+    replace,
+    scandir,
+    stat,
+    utime,
+)
+from platform import python_implementation
+from secrets import token_bytes
+from sys import version_info
+from tempfile import mkstemp
+
+from doctrans import __version__
+
+try:
+    from os import getuid
+except ImportError:  # Windows, where files aren't owned by a uid
+    getuid = None
+
+CACHE_DIR = environ.get("DOCTRANS_CACHE_DIR", "")
+CACHE_MAX_SIZE = int(environ.get("DOCTRANS_CACHE_MAX_SIZE", 256 * 1024 * 1024))
+CACHE_KEY_FILE = environ.get(
+    "DOCTRANS_CACHE_KEY_FILE",
+    path.join(
+        environ.get("XDG_CONFIG_HOME", path.join(path.expanduser("~"), ".config")),
+        "doctrans",
+        "cache.key",
+    ),
+)
+
+# Size of an entry's signature, which precedes its value
+_SIGNATURE_SIZE = sha256().digest_size
+
+_caches = {}
+
+
+class DiskCache(object):
+    """
+    Maps hex keys to bytes, as one file per entry. Writes are atomic, so concurrent processes may share a cache.
+    With a secret, each entry is signed, and one whose signature doesn't match is treated as missing.
+
+    :ivar directory: Directory the entries live in
+    :ivar max_size: Maximum total size of the entries, in bytes
+    """
+
+    def __init__(self, directory, max_size=CACHE_MAX_SIZE, secret=None):
+        """
+        :param directory: Directory the entries live in
+        :type directory: ```str```
+
+        :param max_size: Maximum total size of the entries, in bytes
+        :type max_size: ```int```
+
+        :param secret: Secret to sign the entries with; None leaves them unsigned
+        :type secret: ```Optional[bytes]```
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self._secret = secret
+        self._size = None
+
+    def _path(self, key):
+        """
+        :param key: Hex key
+        :type key: ```str```
+
+        :returns: Path of the entry for this key
+        :rtype: ```str```
+        """
+        return path.join(self.directory, key)
+
+    def get(self, key):
+        """
+        Get the cached bytes, marking the entry as recently used
+
+        :param key: Hex key
+        :type key: ```str```
+
+        :returns: The cached bytes if found (and, with a secret, signed with it) else None
+        :rtype: ```Optional[bytes]```
+        """
+        filename = self._path(key)
+        try:
+            with open(filename, "rb") as f:
+                value = f.read()
+        except OSError:
+            return None
+        if self._secret is not None:
+            signature, value = value[:_SIGNATURE_SIZE], value[_SIGNATURE_SIZE:]
+            if not hmac.compare_digest(signature, self._sign(key, value)):
+                return None
+        try:
+            utime(filename)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value):
+        """
+        Cache the bytes at this key, evicting least recently used entries if the cache grows past `max_size`
+
+        :param key: Hex key
+        :type key: ```str```
+
+        :param value: Bytes to cache
+        :type value: ```bytes```
+        """
+        if self._secret is not None:
+            value = self._sign(key, value) + value
+        filename = self._path(key)
+        try:
+            replaced_size = stat(filename).st_size
+        except OSError:
+            replaced_size = 0
+        makedirs(self.directory, exist_ok=True)
+        fd, tmp_filename = mkstemp(dir=self.directory, prefix=".", suffix=".tmp")
+        with open(fd, "wb") as f:
+            f.write(value)
+        replace(tmp_filename, filename)
+
+        if self._size is None:
+            self._size = self.size()
+        else:
+            self._size += len(value) - replaced_size
+        if self._size > self.max_size:
+            self.evict()
+
+    def _sign(self, key, value):
+        """
+        :param key: Hex key
+        :type key: ```str```
+
+        :param value: Bytes cached at this key
+        :type value: ```bytes```
+
+        :returns: Signature of the key and value
+        :rtype: ```bytes```
+        """
+        return hmac.new(self._secret, key.encode("ascii") + value, sha256).digest()
+
+    def size(self):
+        """
+        :returns: Total size of the entries, in bytes
+        :rtype: ```int```
+        """
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def evict(self, target_size=None):
+        """
+        Remove the least recently used entries until the cache is within `target_size`
+
+        :param target_size: Size to shrink to, in bytes. Defaults to 80% of `max_size`, so evictions are batched.
+        :type target_size: ```Optional[int]```
+        """
+        target_size = int(self.max_size * 0.8) if target_size is None else target_size
+        entries = sorted(
+            ((entry.stat(), entry.path) for entry in self._entries()),
+            key=lambda stat_path: stat_path[0].st_mtime,
+        )
+        size = sum(stat.st_size for stat, _ in entries)
+        for stat, filename in entries:
+            if size <= target_size:
+                break
+            try:
+                remove(filename)
+            except OSError:
+                continue
+            size -= stat.st_size
+        self._size = size
+
+    def _entries(self):
+        """
+        :returns: The `DirEntry` for every (non-temporary) entry
+        :rtype: ```Iterator[os.DirEntry]```
+        """
+        if not path.isdir(self.directory):
+            return iter(())
+        return (entry for entry in scandir(self.directory) if entry.name[0] != ".")
+
+
+def cache_key(*parts):
+    """
+    Hash the parts into a key, e.g., `cache_key(source, mode)`
+
+    :param parts: Anything with a stable `str`
+    :type parts: ```*parts```
+
+    :returns: Hex key
+    :rtype: ```str```
+    """
+    return sha256("\0".join(map(str, parts)).encode("utf8")).hexdigest()
+
+
+def get_cache(namespace):
+    """
+    Get the `DiskCache` for this namespace, scoped to this Python version and doctrans version
+
+    :param namespace: Namespace, e.g., "ast"
+    :type namespace: ```str```
+
+    :returns: The cache, or None if caching is disabled, or the secret is unusable
+    :rtype: ```Optional[DiskCache]```
+    """
+    if not CACHE_DIR:
+        return None
+    if namespace not in _caches:
+        secret = cache_secret()
+        if secret is None:
+            return None
+        _caches[namespace] = DiskCache(
+            path.join(
+                CACHE_DIR,
+                "{namespace}-{implementation}{major}{minor}-{version}".format(
+                    namespace=namespace,
+                    implementation=python_implementation().lower(),
+                    major=version_info[0],
+                    minor=version_info[1],
+                    version=__version__,
+                ),
+            ),
+            secret=secret,
+        )
+    return _caches[namespace]
+
+
+def cache_secret():
+    """
+    Read the secret that entries are signed with from `CACHE_KEY_FILE`, generating it—readable only by its owner—if
+    it's missing
+
+    :returns: The secret; None if the file is unreadable, empty, or (where there are owners) not owned by this user
+      alone
+    :rtype: ```Optional[bytes]```
+    """
+    try:
+        with open(CACHE_KEY_FILE, "rb") as f:
+            st = fstat(f.fileno())
+            secret = f.read()
+    except FileNotFoundError:
+        secret = token_bytes(32)
+        try:
+            makedirs(path.dirname(CACHE_KEY_FILE), mode=0o700, exist_ok=True)
+            fd = os_open(CACHE_KEY_FILE, O_WRONLY | O_CREAT | O_EXCL, 0o600)
+            with open(fd, "wb") as f:
+                f.write(secret)
+        except FileExistsError:  # Generated concurrently
+            return cache_secret()
+        except OSError:
+            return None
+        return secret
+    except OSError:
+        return None
+    if getuid is not None and (st.st_uid != getuid() or st.st_mode & 0o077):
+        return None
+    return secret or None
+
+
+def set_cache_dir(directory):
+    """
+    Set the root directory of the on-disk caches
+
+    :param directory: Root directory. None or the empty string disables caching.
+    :type directory: ```Optional[str]```
+    """
+    global CACHE_DIR
+    CACHE_DIR = directory or ""
+    _caches.clear()
+
+
+@contextmanager
+def caches_disabled(disabled=True):
+    """
+    Disable the on-disk caches within this context, e.g., for `--no-cache`; restoring them after
+
+    :param disabled: Whether to disable them. If False, this context changes nothing.
+    :type disabled: ```bool```
+    """
+    if not disabled:
+        yield
+        return
+    cache_dir = CACHE_DIR
+    set_cache_dir(None)
+    try:
+        yield
+    finally:
+        set_cache_dir(cache_dir)
+
+
+__all__ = [
+    "CACHE_DIR",
+    "CACHE_KEY_FILE",
+    "DiskCache",
+    "cache_key",
+    "cache_secret",
+    "caches_disabled",
+    "get_cache",
+    "set_cache_dir",
+]
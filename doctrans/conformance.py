@@ -2,16 +2,31 @@
 Given the truth, show others the path
 """
 
+import sys
+from argparse import Namespace
 from ast import ClassDef, FunctionDef, Module
 from collections import OrderedDict
-from os import path
+from contextlib import redirect_stdout
+from copy import deepcopy
+from importlib import import_module
+from io import StringIO
+from multiprocessing import Pool
+from os import cpu_count, path
+from subprocess import check_output
 
-from meta.asttools import cmp_ast
-
-from doctrans import emit, parse
-from doctrans.ast_utils import RewriteAtQuery, find_in_ast, get_function_type
-from doctrans.pure_utils import pluralise, strip_split
+from doctrans import cache, emit, parse
+from doctrans.ast_utils import (
+    RewriteAtQueries,
+    annotate_ancestry,
+    cmp_ast,
+    find_in_ast,
+    get_function_type,
+)
+from doctrans.cache import cache_key
+from doctrans.lockfile import file_hash, ir_hash, load_lock, lock_path, save_lock
+from doctrans.pure_utils import identity, pluralise, strip_split
 from doctrans.source_transformer import ast_parse
+from doctrans.writer import batched_writes, write
 
 
 def _default_options(node, search, type_wanted):
@@ -61,63 +76,822 @@ def _get_name_from_namespace(args, fun_name):
     )
 
 
-def ground_truth(args, truth_file):
+# What to parse the truth with, and emit and expect for each target, by the `sync` argument naming it
+_arg2parse_emit_type = {
+    "argparse_function": (parse.argparse_ast, emit.argparse_function, FunctionDef),
+    "class": (parse.class_, emit.class_, ClassDef),
+    "function": (parse.function, emit.function, FunctionDef),
+}
+
+
+def _parse_truth(args, true_ast):
     """
-    There is but one truth. Conform.
+    Parse the truth into the IR every target is conformed to
 
     :param args: Namespace with the values of the CLI arguments
     :type args: ```Namespace```
 
-    :param truth_file: contains the filename of the one true source
-    :type truth_file: ```str```
+    :param true_ast: Parsed (and annotated) module containing the truth
+    :type true_ast: ```Module```
 
-    :returns: Filenames and whether they were changed
-    :rtype: ```OrderedDict```
+    :returns: The gold IR
+    :rtype: ```dict```
     """
-    arg2parse_emit_type = {
-        "argparse_function": (parse.argparse_ast, emit.argparse_function, FunctionDef),
-        "class": (parse.class_, emit.class_, ClassDef),
-        "function": (parse.function, emit.function, FunctionDef),
-    }
-
-    parse_func, emit_func, type_wanted = arg2parse_emit_type[args.truth]
+    parse_func, emit_func, type_wanted = _arg2parse_emit_type[args.truth]
     search = _get_name_from_namespace(args, args.truth).split(".")
 
-    with open(truth_file, "rt") as f:
-        true_ast = ast_parse(f.read(), filename=truth_file)
-
     original_node = find_in_ast(search, true_ast)
-    gold_ir = parse_func(
+    return parse_func(
         original_node,
         **_default_options(node=original_node, search=search, type_wanted=type_wanted)()
     )
 
-    effect = OrderedDict()
-    # filter(lambda arg: arg != args.truth, arg2parse_emit_type.keys()):
-    for fun_name, (parse_func, emit_func, type_wanted) in arg2parse_emit_type.items():
-        search = list(strip_split(_get_name_from_namespace(args, fun_name), "."))
 
+# Gold IRs by their truth's source, kind, and name; most recently used last. None disables; see `memoize_truths`
+_ir_memo = None
+_ir_memo_maxsize = 0
+
+
+def memoize_truths(maxsize=128):
+    """
+    Keep the gold IRs parsed from truths in memory, e.g., for `sync --watch`; so unchanged truths aren't parsed again.
+    Each call gets its own copy, so callers are free to mutate what they get back.
+
+    :param maxsize: Maximum number of gold IRs to hold onto. 0 disables (and clears) the memo.
+    :type maxsize: ```int```
+    """
+    global _ir_memo, _ir_memo_maxsize
+    _ir_memo, _ir_memo_maxsize = (OrderedDict() if maxsize > 0 else None), maxsize
+
+
+def _truth_ir(args, source, get_ast):
+    """
+    Parse the truth into the gold IR; or copy it from the memo, if it was parsed from the same source before
+
+    :param args: Namespace with the values of the CLI arguments
+    :type args: ```Namespace```
+
+    :param source: Source of the module containing the truth
+    :type source: ```str```
+
+    :param get_ast: Gives the parsed (and annotated) module containing the truth; only called if not memoized
+    :type get_ast: ```Callable[[], Module]```
+
+    :returns: The gold IR
+    :rtype: ```dict```
+    """
+    if _ir_memo is None:
+        return _parse_truth(args, get_ast())
+
+    key = cache_key(args.truth, _get_name_from_namespace(args, args.truth), source)
+    if key in _ir_memo:
+        _ir_memo.move_to_end(key)
+    else:
+        _ir_memo[key] = _parse_truth(args, get_ast())
+        if len(_ir_memo) > _ir_memo_maxsize:
+            _ir_memo.popitem(last=False)
+    return deepcopy(_ir_memo[key])
+
+
+def _file_targets(args):
+    """
+    Group the targets by file. Targets within the same file must be conformed in order, by the same process.
+
+    :param args: Namespace with the values of the CLI arguments
+    :type args: ```Namespace```
+
+    :returns: Resolved filename to its targets: filename, search query, emit function, and type wanted
+    :rtype: ```OrderedDict[str, List[Tuple[str, List[str], Callable[..., AST], Type[AST]]]]```
+    """
+    file_targets = OrderedDict()
+    # filter(lambda arg: arg != args.truth, _arg2parse_emit_type.keys()):
+    for fun_name, (parse_func, emit_func, type_wanted) in _arg2parse_emit_type.items():
         filenames = getattr(args, pluralise(fun_name))
+        if filenames is None:
+            continue
+        search = list(strip_split(_get_name_from_namespace(args, fun_name), "."))
+
         assert isinstance(
             filenames, (list, tuple)
         ), "Expected Union[list, tuple] got {!r}".format(type(filenames).__name__)
 
-        effect.update(
-            map(
-                lambda filename: _conform_filename(
+        for filename in filenames:
+            file_targets.setdefault(
+                path.realpath(path.expanduser(filename)), []
+            ).append((filename, search, emit_func, type_wanted))
+    return file_targets
+
+
+def ground_truth(args, truth_file):
+    """
+    There is but one truth. Conform.
+
+    :param args: Namespace with the values of the CLI arguments
+    :type args: ```Namespace```
+
+    :param truth_file: contains the filename of the one true source
+    :type truth_file: ```str```
+
+    :returns: Filenames and whether they were changed (or, with `args.check`, would be)
+    :rtype: ```OrderedDict```
+    """
+    with open(truth_file, "rt") as f:
+        source = f.read()
+    gold_ir = _truth_ir(args, source, lambda: ast_parse(source, filename=truth_file))
+    all_file_targets = file_targets = _file_targets(args)
+    check, use_lock = getattr(args, "check", False), getattr(args, "lock", False)
+
+    if use_lock:
+        lock_filename, key, gold_ir_hash = _sync_lock_key(args, truth_file, gold_ir)
+        lock = load_lock(lock_filename)
+        unchanged = _unchanged_filenames(
+            lock, lock_filename, key, gold_ir_hash, file_targets
+        )
+        file_targets = OrderedDict(
+            (filename, targets)
+            for filename, targets in file_targets.items()
+            if filename not in unchanged
+        )
+
+    effect = OrderedDict()
+    jobs = min(getattr(args, "jobs", 1) or cpu_count(), len(file_targets))
+    if check:
+        if jobs < 2:
+            effect.update(
+                _check_filename(filename, targets, gold_ir)
+                for filename, targets in file_targets.items()
+            )
+        else:
+            with _worker_pool(jobs, gold_ir) as pool:
+                effect.update(
+                    pool.imap(_check_filename_in_worker, file_targets.items())
+                )
+    elif jobs < 2:
+        for targets in file_targets.values():
+            effect.update(
+                _conform_filename(
                     filename=filename,
                     search=search,
                     emit_func=emit_func,
                     replacement_node_ir=gold_ir,
                     type_wanted=type_wanted,
-                ),
-                filenames,
+                )
+                for filename, search, emit_func, type_wanted in targets
             )
+    else:
+        with _worker_pool(jobs, gold_ir) as pool:
+            for filenames_modified, out in pool.imap(
+                _conform_targets_in_worker, file_targets.values()
+            ):
+                print(out, end="")
+                effect.update(filenames_modified)
+
+    if not use_lock:
+        return effect
+    elif not check:
+        _record_targets(lock, lock_filename, key, gold_ir_hash, all_file_targets)
+        save_lock(lock_filename, lock)
+    # Those skipped are unchanged
+    return OrderedDict(
+        (filename, effect.get(filename, False)) for filename in all_file_targets
+    )
+
+
+def _sync_lock_key(args, truth_file, gold_ir):
+    """
+    Find the lockfile beside the truth, and the key of this truth's record within it
+
+    :param args: Namespace with the values of the CLI arguments
+    :type args: ```Namespace```
+
+    :param truth_file: Resolved filename of the truth
+    :type truth_file: ```str```
+
+    :param gold_ir: The IR of the truth
+    :type gold_ir: ```dict```
+
+    :returns: The lockfile's path, the key of this truth's record, and the hash of the gold IR
+    :rtype: ```Tuple[str, str, str]```
+    """
+    lock_filename = lock_path(truth_file)
+    key = "{}:{}:{}".format(
+        args.truth,
+        path.relpath(truth_file, path.dirname(lock_filename)),
+        _get_name_from_namespace(args, args.truth),
+    )
+    return lock_filename, key, ir_hash(gold_ir)
+
+
+def _targets_hash(targets):
+    """
+    :param targets: filename, search query, emit function, and type wanted; for each target within one file
+    :type targets: ```List[Tuple[str, List[str], Callable[..., AST], Type[AST]]]```
+
+    :returns: Hex hash of what is conformed within the file
+    :rtype: ```str```
+    """
+    return cache_key(
+        *(
+            ".".join(search) + ":" + emit_func.__name__ + ":" + type_wanted.__name__
+            for _, search, emit_func, type_wanted in targets
+        )
+    )
+
+
+def _unchanged_filenames(lock, lock_filename, key, gold_ir_hash, file_targets):
+    """
+    The files that can be skipped: their targets were conformed to this same gold IR, and the file hasn't changed
+    since
+
+    :param lock: The lockfile's content
+    :type lock: ```dict```
+
+    :param lock_filename: The lockfile's path
+    :type lock_filename: ```str```
+
+    :param key: Key of the truth's record within the lockfile
+    :type key: ```str```
+
+    :param gold_ir_hash: Hash of the gold IR
+    :type gold_ir_hash: ```str```
+
+    :param file_targets: Resolved filename to its targets
+    :type file_targets: ```OrderedDict[str, List[Tuple[str, List[str], Callable[..., AST], Type[AST]]]]```
+
+    :returns: Resolved filenames of the files that can be skipped
+    :rtype: ```FrozenSet[str]```
+    """
+    record = lock.get("sync", {}).get(key, {})
+    if record.get("ir") != gold_ir_hash:
+        return frozenset()
+    lock_dir = path.dirname(lock_filename)
+    return frozenset(
+        filename
+        for filename, targets in file_targets.items()
+        if path.isfile(filename)
+        and record["targets"].get(path.relpath(filename, lock_dir))
+        == [_targets_hash(targets), file_hash(filename)]
+    )
+
+
+def _record_targets(lock, lock_filename, key, gold_ir_hash, file_targets):
+    """
+    Record, in the lockfile's content, that the targets were conformed to the gold IR, and the hashes of their files
+
+    :param lock: The lockfile's content, updated in-place
+    :type lock: ```dict```
+
+    :param lock_filename: The lockfile's path
+    :type lock_filename: ```str```
+
+    :param key: Key of the truth's record within the lockfile
+    :type key: ```str```
+
+    :param gold_ir_hash: Hash of the gold IR
+    :type gold_ir_hash: ```str```
+
+    :param file_targets: Resolved filename to its targets
+    :type file_targets: ```OrderedDict[str, List[Tuple[str, List[str], Callable[..., AST], Type[AST]]]]```
+    """
+    lock_dir = path.dirname(lock_filename)
+    records = lock.setdefault("sync", {})
+    # Groups sharing a truth share its record, so add to its targets; unless they were conformed to another IR
+    if records.get(key, {}).get("ir") != gold_ir_hash:
+        records[key] = {"ir": gold_ir_hash, "targets": {}}
+    records[key]["targets"].update(
+        (
+            path.relpath(filename, lock_dir),
+            [_targets_hash(targets), file_hash(filename)],
+        )
+        for filename, targets in file_targets.items()
+    )
+
+
+def load_manifest(filename):
+    """
+    Load the groups to sync from a manifest, e.g., `doctrans.toml` of form:
+
+        [[sync]]
+        truth = "class"
+        class = "config.py"
+        class_name = "ConfigClass"
+        argparse_function = ["cli.py", "other_cli.py"]
+        argparse_function_name = "set_cli_args"
+
+    Each `[[sync]]` group takes the same arguments as `python -m doctrans sync`. Relative paths are relative to the
+    manifest. A manifest ending in `.toml` is read with `tomllib` on Python 3.11+, else with the `toml` package; any
+    other is read as YAML (which includes JSON).
+
+    :param filename: Manifest filename
+    :type filename: ```str```
+
+    :returns: Namespace with the values of the CLI arguments, for each group
+    :rtype: ```List[Namespace]```
+    """
+    if filename.endswith(".toml"):
+        toml = import_module("tomllib" if sys.version_info[:2] > (3, 10) else "toml")
+        with open(filename, "rb" if toml.__name__ == "tomllib" else "rt") as f:
+            manifest = toml.load(f)
+    else:
+        with open(filename, "rt") as f:
+            manifest = getattr(import_module("yaml"), "safe_load")(f)
+
+    assert isinstance(manifest, dict) and isinstance(
+        manifest.get("sync"), list
+    ), "Expected a list of `sync` groups in {!r}".format(filename)
+    manifest_dir = path.dirname(path.realpath(filename))
+
+    def to_namespace(group):
+        """
+        :param group: Group from the manifest, with `sync` CLI argument names as keys
+        :type group: ```dict```
+
+        :returns: Namespace with the values of the CLI arguments
+        :rtype: ```Namespace```
+        """
+        assert (
+            group.get("truth") in _arg2parse_emit_type
+        ), "Expected {} got {!r}".format(
+            " or ".join(map(repr, _arg2parse_emit_type)), group.get("truth")
+        )
+        args = Namespace(truth=group["truth"])
+        for fun_name in _arg2parse_emit_type:
+            for key, resolve in (
+                (fun_name, lambda name: path.join(manifest_dir, path.expanduser(name))),
+                ("{}_name".format(fun_name), identity),
+            ):
+                values = group.get(key)
+                setattr(
+                    args,
+                    pluralise(key),
+                    None
+                    if values is None
+                    else list(
+                        map(resolve, [values] if isinstance(values, str) else values)
+                    ),
+                )
+        assert getattr(args, pluralise(args.truth)), "No {} given for truth".format(
+            args.truth
+        )
+        return args
+
+    return list(map(to_namespace, manifest["sync"]))
+
+
+def changed_paths(paths=None):
+    """
+    The paths changed: those given, with "-" read from stdin, one per line; or, if none are given, those staged in git
+
+    :param paths: Changed paths, and/or "-" to read more from stdin
+    :type paths: ```Optional[List[str]]```
+
+    :returns: Resolved paths changed
+    :rtype: ```FrozenSet[str]```
+
+    :raises OSError: If none are given, and git can't be run
+    :raises CalledProcessError: If none are given, and git fails; e.g., outside a git repository
+    """
+    if not paths:
+        top_level = check_output(
+            ("git", "rev-parse", "--show-toplevel"), universal_newlines=True
+        ).rstrip("\n")
+        paths = [
+            path.join(top_level, name)
+            for name in check_output(
+                ("git", "diff", "--cached", "--name-only", "-z"),
+                universal_newlines=True,
+            ).split("\0")
+            if name
+        ]
+    elif "-" in paths:
+        paths = [name for name in paths if name != "-"] + [
+            line.rstrip("\n") for line in sys.stdin if line.strip()
+        ]
+    return frozenset(path.realpath(path.expanduser(name)) for name in paths)
+
+
+def affected_groups(groups, paths):
+    """
+    The groups any of whose files—truth or target—changed; the only ones whose conformance a change can affect
+
+    :param groups: Namespace with the values of the CLI arguments, for each group
+    :type groups: ```List[Namespace]```
+
+    :param paths: Resolved paths changed; e.g., from `changed_paths`
+    :type paths: ```FrozenSet[str]```
+
+    :returns: The groups affected, in order
+    :rtype: ```List[Namespace]```
+    """
+    return [args for args in groups if not paths.isdisjoint(group_filenames(args))]
+
+
+def group_filenames(args):
+    """
+    :param args: Namespace with the values of the CLI arguments
+    :type args: ```Namespace```
+
+    :returns: Resolved filenames of the group's truth and targets
+    :rtype: ```FrozenSet[str]```
+    """
+    return frozenset(_file_targets(args))
+
+
+def ground_truths(groups, check=False, jobs=1, lock=False):
+    """
+    Sync many truth and target groups, in order. Each file is parsed once, however many groups it is in, and
+    written once—after every group has been applied to it. The files are formatted in parallel, then written.
+
+    :param groups: Namespace with the values of the CLI arguments, for each group; e.g., from `load_manifest`
+    :type groups: ```List[Namespace]```
+
+    :param check: Only report which files would change, writing nothing
+    :type check: ```bool```
+
+    :param jobs: Number of processes to format files with. 0 uses one per CPU.
+    :type jobs: ```int```
+
+    :param lock: Skip the files whose targets were conformed to the same truth, and are unchanged since, as recorded
+      in the `.doctrans.lock` beside each truth; recording them there after
+    :type lock: ```bool```
+
+    :returns: Filenames and whether they were changed (or, with `check`, would be)
+    :rtype: ```OrderedDict```
+    """
+    # Resolved filename to its state; see `_file_state`
+    files = OrderedDict()
+    # Lockfile path to its content, and what to record in them once written
+    locks, records = {}, []
+    effect = OrderedDict()
+    for args in groups:
+        truth_file = path.realpath(
+            path.expanduser(getattr(args, pluralise(args.truth))[0])
         )
+        truth = _file_state(files, truth_file)
+        gold_ir = (
+            _parse_truth(args, truth["ast"])
+            # An earlier group changed the truth, so it no longer matches its source
+            if truth["rewrite"] or truth["replaced"] or truth["append"]
+            else _truth_ir(args, truth["source"], lambda: truth["ast"])
+        )
+        file_targets = _file_targets(args)
+        unchanged = (
+            _load_unchanged(locks, records, args, truth_file, gold_ir, file_targets)
+            if lock
+            else frozenset()
+        )
+        for filename, targets in file_targets.items():
+            if filename in unchanged:
+                effect.setdefault(filename, False)
+                continue
+            _file = _file_state(files, filename)
+            if check:
+                effect[filename] = effect.get(filename) or _drifted(
+                    _file["ast"] if _file["exists"] else None, targets, gold_ir
+                )
+            else:
+                modified = _conform_file(_file, filename, targets, gold_ir)
+                effect[filename] = effect.get(filename, False) or modified
 
+    _write_files(files, jobs)
+    if not check:
+        _save_locks(locks, records)
     return effect
 
 
+def _file_state(files, filename):
+    """
+    The state of a file within `ground_truths`: its source and module, whether it exists, whether to rewrite it
+    whole, the original and replacement of each node replaced (to splice into the source), and nodes to append to it
+
+    :param files: Resolved filename to its state, for those already parsed; added to
+    :type files: ```OrderedDict```
+
+    :param filename: Resolved filename
+    :type filename: ```str```
+
+    :returns: The (lazily parsed) state of this file
+    :rtype: ```dict```
+    """
+    if filename not in files:
+        exists = path.isfile(filename)
+        if exists:
+            with open(filename, "rt") as f:
+                source = f.read()
+            parsed_ast = ast_parse(source, filename=filename)
+        else:
+            source = None
+            parsed_ast = annotate_ancestry(Module(body=[], type_ignores=[]))
+        files[filename] = {
+            "source": source,
+            "ast": parsed_ast,
+            "exists": exists,
+            "rewrite": False,
+            "replaced": [],
+            "append": [],
+        }
+    return files[filename]
+
+
+def _load_unchanged(locks, records, args, truth_file, gold_ir, file_targets):
+    """
+    The group's files that are unchanged since they were conformed to this truth, as recorded in its lockfile; which
+    is loaded if it isn't yet. The group is added to those to record once written.
+
+    :param locks: Lockfile path to its content, for those already loaded; added to
+    :type locks: ```dict```
+
+    :param records: Lockfile path, key, gold IR hash, and targets; for each group to record. Appended to.
+    :type records: ```List[Tuple[str, str, str, OrderedDict]]```
+
+    :param args: Namespace with the values of the CLI arguments
+    :type args: ```Namespace```
+
+    :param truth_file: Resolved filename of the truth
+    :type truth_file: ```str```
+
+    :param gold_ir: The IR of the truth
+    :type gold_ir: ```dict```
+
+    :param file_targets: Resolved filename to its targets, as from `_file_targets`
+    :type file_targets: ```OrderedDict```
+
+    :returns: Resolved filenames to skip
+    :rtype: ```FrozenSet[str]```
+    """
+    lock_filename, key, gold_ir_hash = _sync_lock_key(args, truth_file, gold_ir)
+    if lock_filename not in locks:
+        locks[lock_filename] = load_lock(lock_filename)
+    records.append((lock_filename, key, gold_ir_hash, file_targets))
+    return _unchanged_filenames(
+        locks[lock_filename], lock_filename, key, gold_ir_hash, file_targets
+    )
+
+
+def _save_locks(locks, records):
+    """
+    Record the groups' files as conformed, then save each lockfile
+
+    :param locks: Lockfile path to its content
+    :type locks: ```dict```
+
+    :param records: Lockfile path, key, gold IR hash, and targets; for each group to record
+    :type records: ```List[Tuple[str, str, str, OrderedDict]]```
+    """
+    for lock_filename, key, gold_ir_hash, file_targets in records:
+        _record_targets(
+            locks[lock_filename], lock_filename, key, gold_ir_hash, file_targets
+        )
+    for lock_filename, _lock in locks.items():
+        save_lock(lock_filename, _lock)
+
+
+def _conform_file(_file, filename, targets, gold_ir):
+    """
+    Conform the targets within one file to the gold IR, in-memory; recording what to write in its state
+
+    :param _file: State of the file, as within `ground_truths`
+    :type _file: ```dict```
+
+    :param filename: Resolved filename
+    :type filename: ```str```
+
+    :param targets: filename, search query, emit function, and type wanted; for each target within the file
+    :type targets: ```List[Tuple[str, List[str], Callable[..., AST], Type[AST]]]```
+
+    :param gold_ir: The IR of the truth
+    :type gold_ir: ```dict```
+
+    :returns: Whether the file was modified
+    :rtype: ```bool```
+    """
+    if not _file["exists"]:
+        # As when `sync`ing to a nonexistent file
+        _file["ast"].body.extend(
+            emit_func(
+                gold_ir,
+                emit_default_doc=False,
+                **_default_options(node=None, search=search, type_wanted=type_wanted)()
+            )
+            for _, search, emit_func, type_wanted in targets
+        )
+        _file["exists"] = _file["rewrite"] = True
+        modified = True
+    else:
+        # Every target within the file, in one pass
+        replaced, append = _conform_parsed(filename, _file["ast"], targets, gold_ir)
+        for original_node, replacement_node in replaced:
+            _replace_pending(_file, original_node, replacement_node)
+        _file["ast"].body.extend(append)
+        _file["append"].extend(append)
+        modified = bool(replaced or append)
+    if modified:
+        # Reindex, so later groups can find what was added
+        annotate_ancestry(_file["ast"])
+    return modified
+
+
+def _write_files(files, jobs):
+    """
+    Write each file conformed by `ground_truths`, formatting them in parallel
+
+    :param files: Resolved filename to its state, as within `ground_truths`
+    :type files: ```OrderedDict```
+
+    :param jobs: Number of processes to format files with. 0 uses one per CPU.
+    :type jobs: ```int```
+    """
+    with batched_writes(jobs):
+        for filename, _file in files.items():
+            if _file["rewrite"]:
+                emit.file(_file["ast"], filename, mode="wt", skip_black=False)
+            elif _file["replaced"]:
+                _write_conformed(
+                    filename,
+                    _file["source"],
+                    _file["ast"],
+                    _file["replaced"],
+                    _file["append"],
+                )
+            elif _file["append"]:
+                emit.file(
+                    Module(body=_file["append"], type_ignores=[]),
+                    filename,
+                    mode="a",
+                    skip_black=False,
+                )
+
+
+def _replace_pending(_file, original_node, replacement_node):
+    """
+    Record, for the file's final write, that a node was replaced. A node that was itself added by an earlier group
+    (as a replacement or to append) is swapped for its replacement there, instead.
+
+    :param _file: State of the file, as within `ground_truths`
+    :type _file: ```dict```
+
+    :param original_node: Node that was replaced
+    :type original_node: ```AST```
+
+    :param replacement_node: Node that replaced it
+    :type replacement_node: ```AST```
+    """
+    for pending in _file["replaced"]:
+        if pending[1] is original_node:
+            pending[1] = replacement_node
+            return
+    for idx, node in enumerate(_file["append"]):
+        if node is original_node:
+            _file["append"][idx] = replacement_node
+            return
+    _file["replaced"].append([original_node, replacement_node])
+
+
+def _drifted(parsed_ast, targets, gold_ir):
+    """
+    Whether conforming any target within one module to the gold IR would modify it. Stops at the first target not
+    found; else replaces all that differ, in-memory, in one pass.
+
+    :param parsed_ast: Parsed (and annotated) module, which may be modified in-place; None if its file does not exist
+    :type parsed_ast: ```Optional[Module]```
+
+    :param targets: filename, search query, emit function, and type wanted; for each target within the module
+    :type targets: ```List[Tuple[str, List[str], Callable[..., AST], Type[AST]]]```
+
+    :param gold_ir: The IR of the truth
+    :type gold_ir: ```dict```
+
+    :returns: Whether conforming the module would modify it
+    :rtype: ```bool```
+    """
+    if parsed_ast is None:
+        return True
+
+    replacements = OrderedDict()
+    for _, search, emit_func, type_wanted in targets:
+        original_node = find_in_ast(search, parsed_ast)
+        if original_node is None:
+            return True
+        replacement_node = emit_func(
+            gold_ir,
+            **_default_options(
+                node=original_node, search=search, type_wanted=type_wanted
+            )()
+        )
+        if not cmp_ast(original_node, replacement_node):
+            replacements[tuple(search)] = replacement_node
+    # Not every differing node is replaced, so see whether any would be, in-memory
+    rewrite_at_queries = RewriteAtQueries(replacements)
+    rewrite_at_queries.visit(parsed_ast)
+    return any(rewrite_at_queries.replaced.values())
+
+
+def _check_filename(filename, targets, gold_ir):
+    """
+    Whether conforming the given file to the gold IR would modify it. Writes nothing.
+
+    :param filename: Resolved filename
+    :type filename: ```str```
+
+    :param targets: filename, search query, emit function, and type wanted; for each target within the file
+    :type targets: ```List[Tuple[str, List[str], Callable[..., AST], Type[AST]]]```
+
+    :param gold_ir: The IR of the truth
+    :type gold_ir: ```dict```
+
+    :returns: filename, whether the file would be modified
+    :rtype: ```Tuple[str, bool]```
+    """
+    if not path.isfile(filename):
+        return filename, True
+    with open(filename, "rt") as f:
+        parsed_ast = ast_parse(f.read(), filename=filename)
+    return filename, _drifted(parsed_ast, targets, gold_ir)
+
+
+# The gold IR within a `ground_truth` worker process; see `_init_worker`
+_gold_ir = None
+
+
+def _worker_pool(jobs, gold_ir):
+    """
+    Start a pool of `ground_truth` worker processes. The gold IR is shipped to each worker once, rather than with
+    every file; as are the formatter and cache directory in use, which a spawned worker (the default on macOS and
+    Windows) wouldn't otherwise inherit.
+
+    :param jobs: Number of processes
+    :type jobs: ```int```
+
+    :param gold_ir: The IR of the truth, that every target is conformed to
+    :type gold_ir: ```dict```
+
+    :returns: The pool
+    :rtype: ```multiprocessing.pool.Pool```
+    """
+    return Pool(
+        jobs,
+        initializer=_init_worker,
+        initargs=(gold_ir, emit.FORMATTER, cache.CACHE_DIR),
+    )
+
+
+def _init_worker(gold_ir, formatter, cache_dir):
+    """
+    Initialise a `ground_truth` worker process
+
+    :param gold_ir: The IR of the truth, that every target is conformed to
+    :type gold_ir: ```dict```
+
+    :param formatter: Formatter to use; see `emit.FORMATTER`
+    :type formatter: ```Literal['black', 'builtin']```
+
+    :param cache_dir: Root directory of the on-disk caches; empty when they are disabled
+    :type cache_dir: ```str```
+    """
+    global _gold_ir
+    _gold_ir = gold_ir
+    emit.set_formatter(formatter)
+    cache.set_cache_dir(cache_dir)
+
+
+def _conform_targets_in_worker(targets):
+    """
+    Conform, in order, every target within one file to the gold IR, capturing what is printed
+
+    :param targets: filename, search query, emit function, and type wanted; for each target within one file
+    :type targets: ```List[Tuple[str, List[str], Callable[..., AST], Type[AST]]]```
+
+    :returns: filenames and whether they were modified, stdout
+    :rtype: ```Tuple[List[Tuple[str, bool]], str]```
+    """
+    out = StringIO()
+    with redirect_stdout(out):
+        filenames_modified = [
+            _conform_filename(
+                filename=filename,
+                search=search,
+                emit_func=emit_func,
+                replacement_node_ir=_gold_ir,
+                type_wanted=type_wanted,
+            )
+            for filename, search, emit_func, type_wanted in targets
+        ]
+    return filenames_modified, out.getvalue()
+
+
+def _check_filename_in_worker(filename_targets):
+    """
+    Whether conforming one file to the gold IR would modify it, from within a `ground_truth` worker process
+
+    :param filename_targets: Resolved filename, and its targets
+    :type filename_targets: ```Tuple[str, List[Tuple[str, List[str], Callable[..., AST], Type[AST]]]]```
+
+    :returns: filename, whether the file would be modified
+    :rtype: ```Tuple[str, bool]```
+    """
+    return _check_filename(*filename_targets, gold_ir=_gold_ir)
+
+
 def _conform_filename(
     filename,
     search,
@@ -158,40 +932,148 @@ def _conform_filename(
         return filename, True
 
     with open(filename, "rt") as f:
-        parsed_ast = ast_parse(f.read(), filename=filename)
+        source = f.read()
+    parsed_ast = ast_parse(source, filename=filename)
     assert isinstance(parsed_ast, Module)
 
-    original_node = find_in_ast(search, parsed_ast)
-    replacement_node = emit_func(
+    replaced, append = _conform_parsed(
+        filename,
+        parsed_ast,
+        [(filename, search, emit_func, type_wanted)],
         replacement_node_ir,
-        **_default_options(node=original_node, search=search, type_wanted=type_wanted)()
     )
-    if original_node is None:
-        emit.file(replacement_node, filename=filename, mode="a", skip_black=False)
+    if append:
+        emit.file(append[0], filename=filename, mode="a", skip_black=False)
         return filename, True
-    assert len(search) > 0
+    if replaced:
+        _write_conformed(filename, source, parsed_ast, replaced)
+    return filename, bool(replaced)
 
-    assert type(replacement_node) == type_wanted, "Expected {!r} got {!r}".format(
-        type_wanted, type(replacement_node).__name__
-    )
 
-    replaced = False
-    if not cmp_ast(original_node, replacement_node):
-        rewrite_at_query = RewriteAtQuery(
-            search=search,
-            replacement_node=replacement_node,
+def _conform_parsed(filename, parsed_ast, targets, replacement_node_ir):
+    """
+    Conform the nodes at the targets within the parsed module to the `intermediate_repr`, in-place; replacing all
+    that differ in one pass
+
+    :param filename: Location of file
+    :type filename: ```str```
+
+    :param parsed_ast: Parsed (and annotated) module
+    :type parsed_ast: ```Module```
+
+    :param targets: filename, search query, emit function, and type wanted; for each target within the module
+    :type targets: ```List[Tuple[str, List[str], Callable[..., AST], Type[AST]]]```
+
+    :param replacement_node_ir: Replace what is found with the contents of this param
+    :type replacement_node_ir: ```dict```
+
+    :returns: the original node and what replaced it, for each replaced; the nodes to append to the module, for
+      each target where nothing was found
+    :rtype: ```Tuple[List[Tuple[AST, AST]], List[AST]]```
+    """
+    originals, replacements, append = {}, OrderedDict(), []
+    for _, search, emit_func, type_wanted in targets:
+        original_node = find_in_ast(search, parsed_ast)
+        replacement_node = emit_func(
+            replacement_node_ir,
+            **_default_options(
+                node=original_node, search=search, type_wanted=type_wanted
+            )()
         )
-        rewrite_at_query.visit(parsed_ast)
+        if original_node is None:
+            append.append(replacement_node)
+            continue
+        assert len(search) > 0
 
-        print(
-            "modified" if rewrite_at_query.replaced else "unchanged", filename, sep="\t"
+        assert type(replacement_node) == type_wanted, "Expected {!r} got {!r}".format(
+            type_wanted, type(replacement_node).__name__
         )
-        if rewrite_at_query.replaced:
-            emit.file(parsed_ast, filename, mode="wt", skip_black=False)
+        if not cmp_ast(original_node, replacement_node):
+            originals[tuple(search)] = original_node
+            replacements[tuple(search)] = replacement_node
+
+    rewrite_at_queries = RewriteAtQueries(replacements)
+    rewrite_at_queries.visit(parsed_ast)
+    for replaced in rewrite_at_queries.replaced.values():
+        print("modified" if replaced else "unchanged", filename, sep="\t")
+
+    return [
+        (originals[search], replacements[search])
+        for search, replaced in rewrite_at_queries.replaced.items()
+        if replaced
+    ], append
 
-        replaced = rewrite_at_query.replaced
 
-    return filename, replaced
+def _write_conformed(filename, source, parsed_ast, replaced, append=()):
+    """
+    Write the conformed module: splice just the replaced nodes into its source, then append what is new.
+    If they can't be spliced, emit the whole module (which already includes what is new).
+
+    :param filename: Location of file
+    :type filename: ```str```
+
+    :param source: Source the module was parsed from
+    :type source: ```str```
+
+    :param parsed_ast: Conformed module
+    :type parsed_ast: ```Module```
+
+    :param replaced: Original node, and what replaced it, for each replaced
+    :type replaced: ```List[Tuple[AST, AST]]```
+
+    :param append: Nodes appended to the module
+    :type append: ```List[AST]```
+    """
+    write(
+        filename,
+        "wt",
+        _conformed_source,
+        source,
+        parsed_ast,
+        list(replaced),
+        list(append),
+        emit.FORMATTER,
+    )
+
+
+def _conformed_source(source, parsed_ast, replaced, append, formatter):
+    """
+    The source of the conformed module; see `_write_conformed`
+
+    :param source: Source the module was parsed from
+    :type source: ```str```
+
+    :param parsed_ast: Conformed module
+    :type parsed_ast: ```Module```
+
+    :param replaced: Original node, and what replaced it, for each replaced
+    :type replaced: ```List[Tuple[AST, AST]]```
+
+    :param append: Nodes appended to the module
+    :type append: ```List[AST]```
+
+    :param formatter: Formatter to use
+    :type formatter: ```Literal['black', 'builtin']```
+
+    :returns: The new source
+    :rtype: ```str```
+    """
+    spliced = emit.splice(source, replaced, skip_black=False, formatter=formatter)
+    if spliced is None:
+        return emit.to_formatted_code(parsed_ast, formatter=formatter)
+    elif append:
+        spliced += emit.to_formatted_code(
+            Module(body=append, type_ignores=[]), formatter=formatter
+        )
+    return spliced
 
 
-__all__ = ["ground_truth"]
+__all__ = [
+    "affected_groups",
+    "changed_paths",
+    "ground_truth",
+    "ground_truths",
+    "group_filenames",
+    "load_manifest",
+    "memoize_truths",
+]
@@ -0,0 +1,271 @@
+"""
+Persistent daemon serving `sync`, `sync_properties`, and `gen` from one warm process over a Unix socket.
+
+Start with `python -m doctrans serve`, then use the thin client—which doesn't import the parsers or emitters—with
+`python -m doctrans.daemon sync ...`. When no daemon is listening, the client runs the command in-process.
+
+The socket lives in a directory only its user can write to—`$XDG_RUNTIME_DIR`, else a private one in the temp
+dir—and neither the client nor the daemon uses a socket (or directory) another user owns; so no one else can pose
+as the daemon, e.g., to report a passing check.
+"""
+
+import json
+import socket
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+from os import chdir, environ, getcwd, lstat, makedirs, path, remove, stat
+from socketserver import StreamRequestHandler
+from stat import S_ISSOCK, S_ISVTX
+from tempfile import gettempdir
+from traceback import print_exc
+
+try:
+    from os import getuid
+except ImportError:  # Windows, where files aren't owned by a uid
+    getuid = None
+
+
+def default_socket():
+    """
+    :returns: Path of the daemon's socket: `$DOCTRANS_SOCKET`, else in `$XDG_RUNTIME_DIR`, else in a directory of
+      the temp dir private to this user
+    :rtype: ```str```
+    """
+    if environ.get("DOCTRANS_SOCKET"):
+        return environ["DOCTRANS_SOCKET"]
+    elif environ.get("XDG_RUNTIME_DIR"):
+        return path.join(environ["XDG_RUNTIME_DIR"], "doctrans.sock")
+    return path.join(
+        gettempdir(),
+        "doctrans-{}".format(
+            environ.get("USER", "user") if getuid is None else getuid()
+        ),
+        "doctrans.sock",
+    )
+
+
+DEFAULT_SOCKET = default_socket()
+
+# Commands the daemon will run on behalf of a client
+SERVED_COMMANDS = frozenset(("sync", "sync_properties", "gen"))
+
+
+def run_in_process(cli_argv, cwd=None):
+    """
+    Run the CLI in this process, capturing its output
+
+    :param cli_argv: CLI arguments, as given to `doctrans.__main__.main`
+    :type cli_argv: ```List[str]```
+
+    :param cwd: Directory to run from. Defaults to the current working directory.
+    :type cwd: ```Optional[str]```
+
+    :returns: exit code, stdout, stderr
+    :rtype: ```Tuple[int, str, str]```
+    """
+    from doctrans.__main__ import main
+
+    out, err, previous_cwd = StringIO(), StringIO(), getcwd()
+    exit_code = 0
+    with redirect_stdout(out), redirect_stderr(err):
+        try:
+            chdir(cwd or previous_cwd)
+            main(cli_argv=cli_argv)
+        except SystemExit as e:
+            exit_code = (
+                e.code if isinstance(e.code, int) else 0 if e.code is None else 1
+            )
+        except Exception:
+            print_exc()
+            exit_code = 1
+        finally:
+            chdir(previous_cwd)
+    return exit_code, out.getvalue(), err.getvalue()
+
+
+class DoctransRequestHandler(StreamRequestHandler):
+    """
+    Handles one JSON request line of form `{"argv": List[str], "cwd": str}`,
+    replying with one JSON line of form `{"exit_code": int, "stdout": str, "stderr": str}`
+    """
+
+    def handle(self):
+        """
+        Run the request's CLI arguments within this (warm) process, and reply with the result
+        """
+        request = json.loads(self.rfile.readline().decode("utf8"))
+        cli_argv = request["argv"]
+        if not cli_argv or cli_argv[0] not in SERVED_COMMANDS:
+            exit_code, out, err = (
+                2,
+                "",
+                "doctrans serve: expected one of {} got {!r}\n".format(
+                    ", ".join(sorted(SERVED_COMMANDS)), cli_argv[:1]
+                ),
+            )
+        else:
+            exit_code, out, err = run_in_process(cli_argv, cwd=request.get("cwd"))
+        self.wfile.write(
+            "{}\n".format(
+                json.dumps({"exit_code": exit_code, "stdout": out, "stderr": err})
+            ).encode("utf8")
+        )
+
+
+def check_socket(socket_path):
+    """
+    Check that only this user could be listening on the socket: its directory is theirs, and others can't write to
+    it (unless it's sticky, so they can't replace what's there); and anything already at the path is a socket of
+    theirs
+
+    :param socket_path: Path to the Unix socket
+    :type socket_path: ```str```
+
+    :returns: Whether the socket exists
+    :rtype: ```bool```
+
+    :raises PermissionError: If another user could be listening on the socket
+    """
+    if getuid is None:
+        return path.exists(socket_path)
+    directory = path.dirname(path.abspath(socket_path))
+    try:
+        st = stat(directory)
+    except FileNotFoundError:
+        return False
+    if st.st_uid not in (0, getuid()) or (
+        st.st_mode & 0o022 and not st.st_mode & S_ISVTX
+    ):
+        raise PermissionError(
+            "Refusing {!r}: others can write to its directory".format(socket_path)
+        )
+    try:
+        st = lstat(socket_path)
+    except FileNotFoundError:
+        return False
+    if not S_ISSOCK(st.st_mode) or st.st_uid != getuid():
+        raise PermissionError(
+            "Refusing {!r}: it isn't a socket of yours".format(socket_path)
+        )
+    return True
+
+
+def make_server(socket_path=DEFAULT_SOCKET):
+    """
+    Create the daemon's server, warming up this process by importing the parsers, emitters, and formatter
+
+    :param socket_path: Path to the Unix socket to listen on. Its directory is created, private to this user, if
+      missing; and any stale socket of this user's there is removed.
+    :type socket_path: ```str```
+
+    :returns: Server, ready for `serve_forever`
+    :rtype: ```socketserver.UnixStreamServer```
+
+    :raises PermissionError: If another user could be listening on the socket; see `check_socket`
+    """
+    from socketserver import UnixStreamServer
+
+    import black  # noqa: F401
+
+    import doctrans.gen  # noqa: F401
+    import doctrans.sync_properties  # noqa: F401
+    from doctrans.conformance import memoize_truths
+    from doctrans.source_transformer import memoize_ast_parse
+
+    makedirs(path.dirname(path.abspath(socket_path)), mode=0o700, exist_ok=True)
+    if check_socket(socket_path):
+        remove(socket_path)
+
+    memoize_ast_parse()
+    memoize_truths()
+    return UnixStreamServer(socket_path, DoctransRequestHandler)
+
+
+def serve(socket_path=DEFAULT_SOCKET):
+    """
+    Serve `sync`, `sync_properties`, and `gen` requests until interrupted
+
+    :param socket_path: Path to the Unix socket to listen on
+    :type socket_path: ```str```
+    """
+    server = make_server(socket_path)
+    print("doctrans serving on", socket_path, file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            if check_socket(socket_path):
+                remove(socket_path)
+        except PermissionError:
+            pass
+
+
+def request(cli_argv, socket_path=DEFAULT_SOCKET):
+    """
+    Run the CLI arguments on the daemon, falling back to running them in-process when no daemon is listening
+
+    :param cli_argv: CLI arguments, as given to `doctrans.__main__.main`
+    :type cli_argv: ```List[str]```
+
+    :param socket_path: Path to the Unix socket the daemon listens on
+    :type socket_path: ```str```
+
+    :returns: exit code, stdout, stderr; exit code 2, without running anything, if another user could be listening on
+      the socket
+    :rtype: ```Tuple[int, str, str]```
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return run_in_process(cli_argv)
+    try:
+        if not check_socket(socket_path):
+            return run_in_process(cli_argv)
+    except PermissionError as e:
+        return 2, "", "doctrans.daemon: {}\n".format(e)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return run_in_process(cli_argv)
+        with sock.makefile("rwb") as f:
+            f.write(
+                "{}\n".format(
+                    json.dumps({"argv": list(cli_argv), "cwd": getcwd()})
+                ).encode("utf8")
+            )
+            f.flush()
+            response = json.loads(f.readline().decode("utf8"))
+    return response["exit_code"], response["stdout"], response["stderr"]
+
+
+def main(cli_argv=None):
+    """
+    Thin client entrypoint: `python -m doctrans.daemon <command> [<args>]`
+
+    :param cli_argv: CLI arguments. If None uses `sys.argv`.
+    :type cli_argv: ```Optional[List[str]]```
+
+    :returns: exit code
+    :rtype: ```int```
+    """
+    exit_code, out, err = request(sys.argv[1:] if cli_argv is None else cli_argv)
+    print(out, end="")
+    print(err, end="", file=sys.stderr)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+__all__ = [
+    "DEFAULT_SOCKET",
+    "check_socket",
+    "default_socket",
+    "make_server",
+    "request",
+    "run_in_process",
+    "serve",
+]
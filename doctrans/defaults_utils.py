@@ -8,10 +8,11 @@ from contextlib import suppress
 from copy import deepcopy
 from functools import partial
 from itertools import takewhile
-from operator import contains, eq
+from operator import contains
 
 from doctrans.pure_utils import (
     PY_GTE_3_9,
+    casefold_eq,
     count_iter_items,
     location_within,
     none_types,
@@ -110,7 +111,7 @@ def extract_default(
             if isinstance(default_search_announce, str)
             else default_search_announce
         ),
-        cmp=lambda a, b: eq(*map(str.casefold, (a, b))),
+        cmp=casefold_eq,
     )
     if _start_idx == -1:
         return line, None
@@ -9,13 +9,14 @@ Translates from the [numpydoc docstring format](https://numpydoc.readthedocs.io/
 Translates from [Google's docstring format](https://google.github.io/styleguide/pyguide.html)
 """
 import ast
+import re
 from ast import AST
 from collections import OrderedDict
 from copy import deepcopy
 from enum import Enum
-from functools import partial
-from itertools import takewhile
-from operator import attrgetter, contains, eq, le
+from functools import lru_cache, partial
+from operator import attrgetter, contains
+from os import environ
 from typing import Dict, List, Tuple
 
 from doctrans.ast_utils import NoneStr, get_value
@@ -23,9 +24,9 @@ from doctrans.defaults_utils import _remove_default_from_param, needs_quoting
 from doctrans.docstring_utils import ARG_TOKENS, RETURN_TOKENS, TOKENS
 from doctrans.emit import to_code
 from doctrans.emitter_utils import interpolate_defaults
+from doctrans.ir import Param
 from doctrans.pure_utils import (
     code_quoted,
-    count_iter_items,
     location_within,
     none_types,
     paren_wrap_code,
@@ -47,6 +48,9 @@ class Style(Enum):
     auto = 255
 
 
+DOCSTRING_CACHE_SIZE = int(environ.get("DOCTRANS_DOCSTRING_CACHE_SIZE", 1024))
+
+
 def parse_docstring(
     docstring,
     infer_type=False,
@@ -57,6 +61,74 @@ def parse_docstring(
 ):
     """Parse the docstring into its components.
 
+    Results are memoized (see `set_docstring_cache_size`; `parse_docstring.cache_info()` gives hits and misses),
+    with each caller given its own copy.
+
+    :param docstring: the docstring
+    :type docstring: ```Optional[str]```
+
+    :param default_search_announce: Default text(s) to look for. If None, uses default specified in default_utils.
+    :type default_search_announce: ```Optional[Union[str, Iterable[str]]]```
+
+    :param infer_type: Whether to try inferring the typ (from the default)
+    :type infer_type: ```bool```
+
+    :param word_wrap: Whether to word-wrap. Set `DOCTRANS_LINE_LENGTH` to configure length.
+    :type word_wrap: ```bool```
+
+    :param emit_default_prop: Whether to include the default dictionary property.
+    :type emit_default_prop: ```bool```
+
+    :param emit_default_doc: Whether help/docstring should include 'With default' text
+    :type emit_default_doc: ```bool```
+
+    :returns: a dictionary of form
+        {  "name": Optional[str],
+           "type": Optional[str],
+           "doc": Optional[str],
+           "params": OrderedDict[str, {'typ': str, 'doc': Optional[str], 'default': Any}]
+           "returns": Optional[OrderedDict[Literal['return_type'],
+                                           {'typ': str, 'doc': Optional[str], 'default': Any}),)]] }
+    :rtype: ```dict```
+    """
+    # The result is memoized, so give each caller its own copy to mutate
+    return deepcopy(
+        _parse_docstring_cached(
+            docstring,
+            infer_type,
+            default_search_announce
+            if isinstance(default_search_announce, (str, type(None)))
+            else tuple(default_search_announce),
+            word_wrap,
+            emit_default_prop,
+            emit_default_doc,
+        )
+    )
+
+
+def set_docstring_cache_size(maxsize=DOCSTRING_CACHE_SIZE):
+    """
+    Resize (and clear) the memo used by `parse_docstring`.
+    See `parse_docstring.cache_info()` for its hits, misses, and size.
+
+    :param maxsize: Maximum number of parsed docstrings to hold onto. None for unbounded; 0 disables.
+    :type maxsize: ```Optional[int]```
+    """
+    global _parse_docstring_cached
+    _parse_docstring_cached = lru_cache(maxsize=maxsize)(_parse_docstring)
+
+
+def _parse_docstring(
+    docstring,
+    infer_type,
+    default_search_announce,
+    word_wrap,
+    emit_default_prop,
+    emit_default_doc,
+):
+    """
+    Uncached implementation of `parse_docstring`
+
     :param docstring: the docstring
     :type docstring: ```Optional[str]```
 
@@ -155,6 +227,11 @@ def parse_docstring(
     return ir
 
 
+set_docstring_cache_size()
+parse_docstring.cache_info = lambda: _parse_docstring_cached.cache_info()
+parse_docstring.cache_clear = lambda: _parse_docstring_cached.cache_clear()
+
+
 def _scan_phase(docstring, style=Style.rest):
     """
     Scanner phase. Lexical analysis; to some degree…
@@ -216,73 +293,46 @@ def _scan_phase_numpydoc_and_google(docstring, arg_tokens, return_tokens, style)
 
     # Scan all lines so that that each element in `stacker` refers to one 'unit'
     stacker, docstring_lines = [], docstring.splitlines()
-    first_indent = count_iter_items(takewhile(str.isspace, docstring_lines[0]))
-    for line_no, line in enumerate(docstring_lines):
-        indent = count_iter_items(takewhile(str.isspace, line))
-
+    indents = tuple(len(line) - len(line.lstrip()) for line in docstring_lines)
+    first_indent = indents[0] if indents else 0
+    for line_no, indent in enumerate(indents):
         if indent == first_indent:
-            stacker.append([line])
+            stacker.append([docstring_lines[line_no]])
+        elif indent > first_indent:
+            stacker[-1].append(docstring_lines[line_no])
         else:
-            if indent < first_indent:
-                scanned[namespace] = scanned.get(namespace, []) + deepcopy(stacker)
-                stacker.clear()
-                if len(docstring_lines) > line_no + 3 and any(
-                    filter(rpartial(eq, docstring_lines[line_no + 1]), return_tokens)
-                    # return_token = return_tokens[0].splitlines()
-                    # filter(rpartial(eq, docstring_lines[line_no + 1]), return_tokens)
+            scanned[namespace], stacker = stacker, []
+            if len(docstring_lines) > line_no + 3 and (
+                docstring_lines[line_no + 1] in return_tokens
+            ):
+                # Return token, then a line (e.g., the type), then its indented block
+                return_start = line_no + 3
+                return_end = _indented_until(
+                    indents, return_start, indents[return_start]
+                )
+                scanned[return_tokens[0]] = docstring_lines[line_no + 2 : return_end]
+                scanned_afterward = docstring_lines[return_end:]
+            else:
+                scanned_afterward = docstring_lines[line_no + 1 :]
+                if (
+                    len(scanned_afterward) > 1
+                    and scanned_afterward[0] == return_tokens[0]
                 ):
-                    return_indent = count_iter_items(
-                        takewhile(str.isspace, docstring_lines[line_no + 3])
-                    )
-                    next_smallest_indent = count_iter_items(
-                        takewhile(
-                            partial(le, return_indent),
-                            map(
-                                lambda l: count_iter_items(takewhile(str.isspace, l)),
-                                docstring_lines[line_no + 3 :],
-                            ),
-                        )
+                    return_end = _indented_until(
+                        indents, line_no + 3, indents[line_no + 2]
                     )
                     scanned[return_tokens[0]] = docstring_lines[
-                        line_no + 2 : line_no + 3 + next_smallest_indent
-                    ]
-                    scanned_afterward = docstring_lines[
-                        line_no + 3 + next_smallest_indent :
+                        line_no + 2 : return_end
                     ]
-                else:
-                    scanned_afterward = docstring_lines[line_no + 1 :]
-                    if (
-                        len(scanned_afterward) > 1
-                        and scanned_afterward[0] == return_tokens[0]
-                    ):
-                        return_indent = count_iter_items(
-                            takewhile(str.isspace, scanned_afterward[1])
-                        )
-                        next_smallest_indent = count_iter_items(
-                            takewhile(
-                                partial(le, return_indent),
-                                map(
-                                    lambda l: count_iter_items(
-                                        takewhile(str.isspace, l)
-                                    ),
-                                    scanned_afterward[2:],
-                                ),
-                            )
-                        )
-                        scanned[return_tokens[0]] = scanned_afterward[
-                            1 : next_smallest_indent + 2
-                        ]
-                        scanned_afterward = (
-                            None
-                            if next_smallest_indent == 0
-                            else scanned_afterward[next_smallest_indent + 2 :]
-                        )
-
-                if scanned_afterward:
-                    scanned["scanned_afterward"] = scanned_afterward
-                break
-            else:
-                stacker[-1].append(line)
+                    scanned_afterward = (
+                        None
+                        if return_end == line_no + 3
+                        else docstring_lines[return_end:]
+                    )
+
+            if scanned_afterward:
+                scanned["scanned_afterward"] = scanned_afterward
+            break
 
     # Split out return, if present and not already set
     if not scanned.get(return_tokens[0], False):
@@ -296,6 +346,28 @@ def _scan_phase_numpydoc_and_google(docstring, arg_tokens, return_tokens, style)
     return scanned
 
 
+def _indented_until(indents, start, min_indent):
+    """
+    Find where the block of lines, indented at least `min_indent`, that begins at `start` ends
+
+    :param indents: Indentation of each line
+    :type indents: ```Tuple[int]```
+
+    :param start: Line number to start from
+    :type start: ```int```
+
+    :param min_indent: Minimum indentation for a line to be within the block
+    :type min_indent: ```int```
+
+    :returns: Line number of the first line after the block
+    :rtype: ```int```
+    """
+    end = start
+    while end < len(indents) and indents[end] >= min_indent:
+        end += 1
+    return end
+
+
 def _return_parse_phase_numpydoc_and_google(return_tokens, scanned, stacker, style):
     """
     numpydoc and google scanner phase for return. Lexical analysis; to some degree…
@@ -354,28 +426,21 @@ def _scan_phase_rest(docstring, arg_tokens, return_tokens):
     :rtype: ```List[Tuple[bool, str]]```
     """
 
-    rev_known_tokens_t = tuple(map(tuple, map(reversed, arg_tokens + return_tokens)))
+    known_tokens = arg_tokens + return_tokens
     scanned: List[Tuple[bool, str]] = []
-    stack: List[str] = []
-
-    for ch in docstring:
-        stack.append(ch)
-
-        stack_rev = stack[::-1]
+    start = 0
 
-        for token in rev_known_tokens_t:
-            token_len = len(token)
-            if tuple(stack_rev[:token_len]) == token:
-                scanned.append((bool(len(scanned)), "".join(stack[:-token_len])))
-                stack = stack[len(scanned[-1][1]) :][:token_len]
-                continue
+    # Each segment runs from one token up to (not including) the next. Whichever token ends first wins
+    for match in _tokens_pattern(known_tokens).finditer(docstring):
+        scanned.append((bool(scanned), docstring[start : match.start()]))
+        start = match.start()
 
-    if stack:
-        final = "".join(stack)
+    final = docstring[start:]
+    if final:
         scanned.append(
             (
                 bool(scanned and scanned[-1][0])
-                or any(map(final.startswith, arg_tokens + return_tokens)),
+                or any(map(final.startswith, known_tokens)),
                 final,
             )
         )
@@ -383,6 +448,20 @@ def _scan_phase_rest(docstring, arg_tokens, return_tokens):
     return scanned
 
 
+@lru_cache(maxsize=None)
+def _tokens_pattern(tokens):
+    """
+    Compile a pattern matching any of the tokens, trying the shortest first
+
+    :param tokens: Valid tokens like `":param"`
+    :type tokens: ```Tuple[str]```
+
+    :returns: Compiled pattern
+    :rtype: ```re.Pattern```
+    """
+    return re.compile("|".join(map(re.escape, sorted(tokens, key=len))))
+
+
 def _parse_phase(
     intermediate_repr,
     scanned,
@@ -599,19 +678,17 @@ def _parse_phase_numpydoc_and_google(
             :param scan: Scanned input
             :type scan: ```List[str]```
 
-            :returns: dict with keys: 'name', 'typ', 'doc'
-            :rtype: ```dict```
+            :returns: Name, `Param` with keys: 'typ', 'doc'
+            :rtype: ```Optional[Tuple[str, Param]]```
             """
             name, _, typ = scan[0].partition(":")
             if not name:
                 return None
-            cur = {"name": name.rstrip()}
+            cur = Param()
             if typ:
-                cur.update(
-                    {"typ": typ.lstrip(), "doc": "\n".join(map(str.lstrip, scan[1:]))}
-                )
+                cur.update(typ=typ.lstrip(), doc="\n".join(map(str.lstrip, scan[1:])))
             # elif name.endswith("kwargs"): cur["typ"] = "dict"
-            return cur
+            return name.rstrip(), cur
 
     else:
 
@@ -625,8 +702,8 @@ def _parse_phase_numpydoc_and_google(
             :param partitioned: Prep-partitioned `scan`, if given doesn't partition on `scan`, just uses this
             :type partitioned: ```Optional[Tuple[str, str, str]]```
 
-            :returns: dict of shape {'name': ..., 'typ': ..., 'doc': ..., 'default': ..., 'required': ... }
-            :rtype: ```dict```
+            :returns: Name, `Param` with keys: 'typ', 'doc'
+            :rtype: ```Tuple[str, Param]```
             """
             offset = next(idx for idx, ch in enumerate(scan[0]) if ch == ":")
             s = scan[0][:offset].lstrip()
@@ -634,7 +711,7 @@ def _parse_phase_numpydoc_and_google(
             name = name.rstrip()
             typ = (delim + typ).rstrip()
             # if not name: return None
-            cur = {"name": name}
+            cur = Param()
             if typ:
                 assert typ.startswith("(") and typ.endswith(
                     ")"
@@ -654,7 +731,7 @@ def _parse_phase_numpydoc_and_google(
                 # else:
             # elif name.endswith("kwargs"): cur["typ"] = "dict"
             cur["doc"] = "\n".join([scan[0][offset + 1 :].lstrip()] + scan[1:]).strip()
-            return cur
+            return name, cur
 
     scanned_params = scanned[arg_tokens[0]]
 
@@ -719,10 +796,7 @@ def _parse_phase_numpydoc_and_google(
                     ),
                     map(
                         _interpolate_defaults_and_force_future_default,
-                        map(
-                            lambda d: (d.pop("name"), d),
-                            filter(None, map(_parse, scanned_params)),
-                        ),
+                        filter(None, map(_parse, scanned_params)),
                     ),
                 ),
             ),
@@ -733,28 +807,26 @@ def _parse_phase_numpydoc_and_google(
                             (
                                 "return_type",
                                 (
-                                    {
-                                        "typ": scanned[return_tokens[0]][0][
-                                            :-1
-                                        ].lstrip(),
-                                        "doc": scanned[return_tokens[0]][1].lstrip(),
-                                    }
+                                    Param(
+                                        typ=scanned[return_tokens[0]][0][:-1].lstrip(),
+                                        doc=scanned[return_tokens[0]][1].lstrip(),
+                                    )
                                     if len(scanned[return_tokens[0]]) == 2
                                     and isinstance(scanned[return_tokens[0]][1], str)
-                                    else {}
+                                    else Param()
                                     if isinstance(scanned[return_tokens[0]][0], str)
                                     and scanned[return_tokens[0]][0].isspace()
-                                    else {
-                                        "doc": scanned[return_tokens[0]][0].lstrip()
+                                    else Param(
+                                        doc=scanned[return_tokens[0]][0].lstrip()
                                         if isinstance(scanned[return_tokens[0]][0], str)
                                         else scanned[return_tokens[0]][0]
-                                    }
+                                    )
                                 )
                                 if style is Style.google
-                                else {
-                                    "typ": scanned[return_tokens[0]][0][0],
-                                    "doc": scanned[return_tokens[0]][0][1].lstrip(),
-                                },
+                                else Param(
+                                    typ=scanned[return_tokens[0]][0][0],
+                                    doc=scanned[return_tokens[0]][0][1].lstrip(),
+                                ),
                             ),
                             infer_type=infer_type,
                             word_wrap=word_wrap,
@@ -811,15 +883,17 @@ def _parse_phase_rest(
     """
     param = [
         None,
-        {},
-    ]  # First elem is name and second elem is dict with keys: 'typ', 'doc', 'default'
+        Param(),
+    ]  # First elem is name and second elem is `Param` with keys: 'typ', 'doc', 'default'
     for is_token, line in scanned:
         if is_token is True:
             if any(map(line.startswith, return_tokens)):
                 nxt_colon = line.find(":", 1)
                 val = line[nxt_colon + 1 :].strip()
                 if intermediate_repr["returns"] is None:
-                    intermediate_repr["returns"] = OrderedDict((("return_type", {}),))
+                    intermediate_repr["returns"] = OrderedDict(
+                        (("return_type", Param()),)
+                    )
                 intermediate_repr["returns"]["return_type"].update(
                     interpolate_defaults(
                         (
@@ -838,7 +912,7 @@ def _parse_phase_rest(
                 if param[0] is not None and not param[0] == name:
                     if not param[0][0] == "*":
                         intermediate_repr["params"][param[0]] = param[1]
-                    param = [None, {}]
+                    param = [None, Param()]
 
                 val = line[nxt_colon + 1 :].strip()
 
@@ -893,4 +967,4 @@ def _set_param_values(input_str, val, sw=":type"):
     )
 
 
-__all__ = ["parse_docstring"]
+__all__ = ["parse_docstring", "set_docstring_cache_size"]
@@ -17,13 +17,15 @@ from ast import (
     arguments,
 )
 from collections import OrderedDict
+from contextlib import contextmanager
 from functools import partial
+from io import StringIO
 from itertools import chain
+from operator import itemgetter
 from textwrap import indent
 
-from black import Mode, format_str
-
 from doctrans.ast_utils import (
+    ast_fingerprint,
     get_value,
     maybe_type_comment,
     param2argparse_param,
@@ -31,6 +33,7 @@ from doctrans.ast_utils import (
     set_arg,
     set_value,
 )
+from doctrans.cache import cache_key, get_cache
 from doctrans.docstring_utils import ARG_TOKENS, RETURN_TOKENS, emit_param_str
 from doctrans.emitter_utils import (
     RewriteName,
@@ -38,6 +41,7 @@ from doctrans.emitter_utils import (
     get_internal_body,
     to_docstring,
 )
+from doctrans.formatter import FORMAT_VERSION, LINE_LENGTH, format_code
 from doctrans.pure_utils import (
     PY3_8,
     code_quoted,
@@ -49,6 +53,7 @@ from doctrans.pure_utils import (
     tab,
 )
 from doctrans.source_transformer import to_code
+from doctrans.writer import write
 
 
 def argparse_function(
@@ -528,9 +533,9 @@ def docstring(
     )
 
 
-def file(node, filename, mode="a", skip_black=False):
+def file(node, filename, mode="a", skip_black=False, formatter=None):
     """
-    Convert AST to a file
+    Convert AST to a file. Within `writer.batched_writes`, it's formatted and written at the end of that.
 
     :param node: AST node
     :type node: ```Union[Module, ClassDef, FunctionDef]```
@@ -541,27 +546,293 @@ def file(node, filename, mode="a", skip_black=False):
     :param mode: Mode to open the file in, defaults to append
     :type mode: ```str```
 
-    :param skip_black: Skip formatting with black
+    :param skip_black: Skip formatting
     :type skip_black: ```bool```
 
+    :param formatter: Formatter to use, defaults to `FORMATTER`. See `to_formatted_code`.
+    :type formatter: ```Optional[Literal['black', 'builtin']]```
+
     :returns: None
     :rtype: ```NoneType```
     """
     if isinstance(node, (ClassDef, FunctionDef)):
         node = Module(body=[node], type_ignores=[], stmt=None)
-    src = to_code(node)
-    if not skip_black:
-        src = format_str(
-            src,
-            mode=Mode(
-                target_versions=set(),
-                line_length=119,
-                is_pyi=False,
-                string_normalization=False,
-            ),
+    write(filename, mode, to_formatted_code, node, skip_black, formatter or FORMATTER)
+
+
+# Bump when what `to_formatted_code` produces for the same AST changes, invalidating cached emissions
+EMIT_CACHE_VERSION = 1
+
+# Formatter used when none is given: "black", or "builtin" for `doctrans.formatter`—falling back to black
+FORMATTER = "black"
+
+FORMATTERS = "black", "builtin"
+
+_black_version = None
+
+
+def _check_formatter(formatter):
+    """
+    :param formatter: Formatter name
+    :type formatter: ```str```
+
+    :raises ValueError: If the formatter isn't one of `FORMATTERS`
+    """
+    if formatter not in FORMATTERS:
+        raise ValueError(
+            "Expected formatter of {} got {!r}".format(
+                " or ".join(map(repr, FORMATTERS)), formatter
+            )
+        )
+
+
+def set_formatter(formatter):
+    """
+    Set the formatter used when none is given
+
+    :param formatter: Formatter to use
+    :type formatter: ```Literal['black', 'builtin']```
+    """
+    global FORMATTER
+
+    _check_formatter(formatter)
+    FORMATTER = formatter
+
+
+@contextmanager
+def using_formatter(formatter):
+    """
+    Format with this formatter, unless another is given, within the context
+
+    :param formatter: Formatter to use; None leaves `FORMATTER` as it is
+    :type formatter: ```Optional[Literal['black', 'builtin']]```
+    """
+    if formatter is None:
+        yield
+        return
+    previous = FORMATTER
+    set_formatter(formatter)
+    try:
+        yield
+    finally:
+        set_formatter(previous)
+
+
+def to_formatted_code(node, skip_black=False, formatter=None):
+    """
+    Convert the AST to Python source, formatted with black. The same AST always gives the same source, so it is
+    cached on-disk—keyed by the AST's structure (itself determined by the IR, emitter, and emitter options), the
+    formatter's version, and doctrans' version—skipping both `to_code` and black when nothing has changed.
+
+    :param node: AST node
+    :type node: ```AST```
+
+    :param skip_black: Skip formatting
+    :type skip_black: ```bool```
+
+    :param formatter: Formatter to use, defaults to `FORMATTER`. "builtin" lays out the code doctrans emits
+      directly, as black would, and falls back to black for anything else.
+    :type formatter: ```Optional[Literal['black', 'builtin']]```
+
+    :returns: Python source
+    :rtype: ```str```
+    """
+    global _black_version
+
+    formatter = formatter or FORMATTER
+    _check_formatter(formatter)
+
+    disk_cache = get_cache("emit")
+    if disk_cache is None:
+        return _to_formatted_code(node, skip_black, formatter)
+
+    if not skip_black and _black_version is None:
+        _black_version = _get_black_version()
+    # What black doesn't lay out, the built-in formatter falls back to black for
+    key = cache_key(
+        EMIT_CACHE_VERSION,
+        ast_fingerprint(node).hex(),
+        "" if skip_black else _black_version,
+        FORMAT_VERSION if formatter == "builtin" and not skip_black else "",
+    )
+    cached = disk_cache.get(key)
+    if cached is not None:
+        return cached.decode("utf8")
+    src = _to_formatted_code(node, skip_black, formatter)
+    disk_cache.set(key, src.encode("utf8"))
+    return src
+
+
+def _to_formatted_code(node, skip_black, formatter):
+    """
+    Convert the AST to Python source, and format it, without caching
+
+    :param node: AST node
+    :type node: ```AST```
+
+    :param skip_black: Skip formatting
+    :type skip_black: ```bool```
+
+    :param formatter: Formatter to use
+    :type formatter: ```Literal['black', 'builtin']```
+
+    :returns: Python source
+    :rtype: ```str```
+    """
+    if skip_black:
+        return to_code(node)
+    src = format_code(node) if formatter == "builtin" else None
+    return _format(to_code(node)) if src is None else src
+
+
+def _get_black_version():
+    """
+    Get black's version, without importing black
+
+    :returns: black's version
+    :rtype: ```str```
+    """
+    try:
+        from importlib.metadata import version
+    except ImportError:  # Python < 3.8
+        from pkg_resources import get_distribution
+
+        return get_distribution("black").version
+    return version("black")
+
+
+def _format(src):
+    """
+    Format the Python source with black
+
+    :param src: Python source
+    :type src: ```str```
+
+    :returns: Formatted Python source
+    :rtype: ```str```
+    """
+    # Imported here as `black` is slow to import and not needed on most code paths
+    from black import Mode, format_str
+
+    return format_str(
+        src,
+        mode=Mode(
+            target_versions=set(),
+            line_length=LINE_LENGTH,
+            is_pyi=False,
+            string_normalization=False,
+        ),
+    )
+
+
+def splice(source, replacements, skip_black=False, formatter=None):
+    """
+    Replace the source of each original node with that of its replacement, leaving the rest of the source—its
+    formatting and comments—as it was. Only the replacements are unparsed (and formatted), so the time taken
+    scales with the size of the change rather than that of the source.
+
+    :param source: Python source that the original nodes were parsed from
+    :type source: ```str```
+
+    :param replacements: Original statement (with positions from parsing `source`) and the node to replace it with
+    :type replacements: ```Iterable[Tuple[AST, AST]]```
+
+    :param skip_black: Skip formatting
+    :type skip_black: ```bool```
+
+    :param formatter: Formatter to use, defaults to `FORMATTER`. See `to_formatted_code`.
+    :type formatter: ```Optional[Literal['black', 'builtin']]```
+
+    :returns: The new source. None if any original can't be spliced, e.g., it has no `end_lineno` (Python < 3.8),
+      shares a line with other code, or overlaps another; emit the whole module then.
+    :rtype: ```Optional[str]```
+    """
+    # Split only where `ast` counts lines; `str.splitlines` also splits on, e.g., '\x0c' and '\u2028'
+    lines = StringIO(source, newline="").readlines()
+    spans = []
+    for original_node, replacement_node in replacements:
+        span = _line_span(lines, original_node)
+        if span is None:
+            return None
+        spans.append(span + (original_node, replacement_node))
+
+    end_of_next = len(lines)
+    for start, end, prefix, comment, original_node, replacement_node in sorted(
+        spans, key=itemgetter(0, 1), reverse=True
+    ):
+        if end > end_of_next:
+            return None
+        snippet = (
+            to_formatted_code(
+                replacement_node, skip_black=skip_black, formatter=formatter
+            ).strip("\n")
+            + "\n"
+        )
+        # A trailing comment is kept only where it still trails the statement it did; else it's dropped
+        if (
+            comment
+            and snippet.count("\n") == 1
+            and original_node.lineno == original_node.end_lineno
+            and _defined_name(original_node) is not None
+            and _defined_name(original_node) == _defined_name(replacement_node)
+        ):
+            snippet = "{}  {}\n".format(snippet.rstrip("\n"), comment)
+        lines[start:end] = [indent(snippet, prefix)]
+        end_of_next = start
+    return "".join(lines)
+
+
+def _line_span(lines, node):
+    """
+    The lines spanned by the statement, including its decorators, if it spans them wholly
+
+    :param lines: Lines of the source the node was parsed from, with their line endings
+    :type lines: ```List[str]```
+
+    :param node: AST statement
+    :type node: ```AST```
+
+    :returns: Index of the first line, index after the last line, the indentation, and any comment trailing the
+      statement; else None
+    :rtype: ```Optional[Tuple[int, int, str, str]]```
+    """
+    end_lineno = getattr(node, "end_lineno", None)
+    if end_lineno is None or end_lineno > len(lines):
+        return None
+    start = (
+        min(
+            [node.lineno]
+            + [decorator.lineno for decorator in getattr(node, "decorator_list", ())]
+        )
+        - 1
+    )
+    prefix = lines[node.lineno - 1].encode("utf8")[: node.col_offset].decode("utf8")
+    after = lines[end_lineno - 1].encode("utf8")[node.end_col_offset :].decode("utf8")
+    after = after.strip()
+    if (
+        prefix.strip()
+        or (after and not after.startswith("#"))
+        or any(
+            line.strip() and not line.startswith(prefix)
+            for line in lines[start : node.lineno]
         )
-    with open(filename, mode) as f:
-        f.write(src)
+    ):
+        return None
+    return start, end_lineno, prefix, after
+
+
+def _defined_name(node):
+    """
+    :param node: AST statement
+    :type node: ```AST```
+
+    :returns: The name the statement defines or assigns to; None if it's neither, or assigns to something else
+    :rtype: ```Optional[str]```
+    """
+    targets = getattr(node, "targets", None) or [getattr(node, "target", None)]
+    return getattr(node, "name", None) or (
+        targets[0].id if len(targets) == 1 and isinstance(targets[0], Name) else None
+    )
 
 
 def function(
@@ -748,4 +1019,17 @@ def function(
     )
 
 
-__all__ = ["argparse_function", "class_", "docstring", "file", "function"]
+__all__ = [
+    "EMIT_CACHE_VERSION",
+    "FORMATTER",
+    "FORMATTERS",
+    "argparse_function",
+    "class_",
+    "docstring",
+    "file",
+    "function",
+    "set_formatter",
+    "splice",
+    "to_formatted_code",
+    "using_formatter",
+]
@@ -3,6 +3,7 @@ Functions which produce intermediate_repr from various different inputs
 """
 import ast
 from ast import Attribute, Expr, FunctionDef, Load, Name, Return, arguments
+from collections.abc import Mapping
 from functools import partial
 from textwrap import indent
 from typing import Any
@@ -17,6 +18,7 @@ from doctrans.ast_utils import (
 )
 from doctrans.defaults_utils import extract_default, set_default_doc
 from doctrans.docstring_utils import emit_param_str
+from doctrans.ir import Param
 from doctrans.pure_utils import (
     fill,
     identity,
@@ -103,8 +105,8 @@ def parse_out_param(expr, require_default=False, emit_default_doc=True):
     :param emit_default_doc: Whether help/docstring should include 'With default' text
     :type emit_default_doc: ```bool```
 
-    :returns: Name, dict with keys: 'typ', 'doc', 'default'
-    :rtype: ```Tuple[str, dict]```
+    :returns: Name, `Param` with keys: 'typ', 'doc', 'default'
+    :rtype: ```Tuple[str, Param]```
     """
     required = get_value(
         get_value(
@@ -208,9 +210,10 @@ def parse_out_param(expr, require_default=False, emit_default_doc=True):
     # if "str" in typ or "Literal" in typ and (typ.count("'") > 1 or typ.count('"') > 1):
     #    default = quote(default)
 
-    return name, dict(
-        doc=doc, typ=typ, **({} if default is None else {"default": default})
-    )
+    param = Param(typ=typ, doc=doc)
+    if default is not None:
+        param["default"] = default
+    return name, param
 
 
 def interpolate_defaults(
@@ -283,16 +286,24 @@ def _parse_return(e, intermediate_repr, function_def, emit_default_doc):
     :param emit_default_doc: Whether help/docstring should include 'With default' text
     :type emit_default_doc: ```bool```
 
-    :returns: Name, dict with keys: 'typ', 'doc', 'default'
-    :rtype: ```Tuple[str, dict]```
+    :returns: Name, `Param` with keys: 'typ', 'doc', 'default'
+    :rtype: ```Tuple[str, Param]```
     """
     assert isinstance(e, Return)
 
     return set_default_doc(
         (
             "return_type",
-            {
-                "doc": extract_default(
+            Param(
+                typ=to_code(
+                    get_value(
+                        ast.parse(intermediate_repr["returns"]["return_type"]["typ"])
+                        .body[0]
+                        .value.slice
+                    ).elts[1]
+                ).rstrip(),
+                # 'Tuple[ArgumentParser, {typ}]'.format(typ=intermediate_repr['returns']['typ'])
+                doc=extract_default(
                     next(
                         line.partition(",")[2].lstrip()
                         for line in get_value(function_def.body[0].value).split("\n")
@@ -300,16 +311,8 @@ def _parse_return(e, intermediate_repr, function_def, emit_default_doc):
                     ),
                     emit_default_doc=emit_default_doc,
                 )[0],
-                "default": to_code(e.value.elts[1]).rstrip("\n"),
-                "typ": to_code(
-                    get_value(
-                        ast.parse(intermediate_repr["returns"]["return_type"]["typ"])
-                        .body[0]
-                        .value.slice
-                    ).elts[1]
-                ).rstrip()
-                # 'Tuple[ArgumentParser, {typ}]'.format(typ=intermediate_repr['returns']['typ'])
-            },
+                default=to_code(e.value.elts[1]).rstrip("\n"),
+            ),
         ),
         emit_default_doc=emit_default_doc,
     )
@@ -635,7 +638,7 @@ def _make_call_meth(body, return_type, param_names, docstring_format, word_wrap)
     #     else None
     # )
     if body_len:
-        if isinstance(body, dict):
+        if isinstance(body, Mapping):
             body = list(
                 filter(
                     None,
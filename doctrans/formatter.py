@@ -0,0 +1,879 @@
+"""
+Built-in formatter for the code doctrans emits: classes of annotated assignments, functions, and argparse
+`add_argument` calls. Lays these out as black does—line length 119, no string normalisation—without black's
+parsing and formatting passes. Gives None for anything it doesn't recognise, for the caller to format with black.
+"""
+
+from ast import (
+    AnnAssign,
+    Assert,
+    Assign,
+    Attribute,
+    AugAssign,
+    Break,
+    Call,
+    ClassDef,
+    Constant,
+    Continue,
+    Delete,
+    ExceptHandler,
+    Expr,
+    For,
+    FunctionDef,
+    Global,
+    If,
+    Import,
+    ImportFrom,
+    Lambda,
+    List,
+    Load,
+    Name,
+    Nonlocal,
+    Pass,
+    Pow,
+    Raise,
+    Return,
+    Slice,
+    Starred,
+    Store,
+    Subscript,
+    Try,
+    Tuple,
+    While,
+    With,
+    keyword,
+    walk,
+)
+
+from doctrans.ast_utils import get_value
+from doctrans.pure_utils import PY_GTE_3_9
+
+LINE_LENGTH = 119
+
+# Bump when what `format_code` produces for the same AST changes, invalidating cached emissions
+FORMAT_VERSION = 4
+
+# Compound statements whose blocks are formatted; any other is left to black
+_FLOW = For, If, Try, While, With
+
+# Simple statements that may be longer than a line, and are split as black splits them
+_SPLITTABLE = AnnAssign, Assign, Expr, Return
+
+# Simple statements that are always formatted as one line
+_SIMPLE = (
+    Assert,
+    AugAssign,
+    Break,
+    Continue,
+    Delete,
+    Global,
+    Import,
+    ImportFrom,
+    Nonlocal,
+    Pass,
+    Raise,
+)
+
+# Nodes of syntax from Python 3.6 or later, as black sees it; see `_check_older_syntax`
+_NEWER_SYNTAX = frozenset(
+    (
+        "AsyncFor",
+        "AsyncFunctionDef",
+        "AsyncWith",
+        "Await",
+        "FormattedValue",
+        "JoinedStr",
+        "Match",
+        "NamedExpr",
+        "TryStar",
+    )
+)
+
+# Placeholder for the value of an assignment, to unparse what precedes it
+_PLACEHOLDER = "_doctrans_formatter_placeholder_"
+
+# Lines longer than this are wrapped by astor, which `to_code` uses before Python 3.9; see `_astor_parenthesises`
+_ASTOR_LINE_LENGTH = 79
+
+
+class _Unformattable(Exception):
+    """The node isn't one this formatter lays out as black does"""
+
+
+def format_code(node, line_length=LINE_LENGTH):
+    """
+    Convert the AST to Python source, laid out as black would format it
+
+    :param node: AST node
+    :type node: ```AST```
+
+    :param line_length: Maximum line length
+    :type line_length: ```int```
+
+    :returns: Python source if every node within is one this formatter recognises, and its code fits within the
+      line length, else None
+    :rtype: ```Optional[str]```
+    """
+    body = node.body if hasattr(node, "type_ignores") else [node]
+    try:
+        _check_older_syntax(node)
+        lines = _block(body, 0, "module", line_length)
+    except _Unformattable:
+        return None
+    return "".join(map("{}\n".format, lines))
+
+
+def _block(body, depth, parent, line_length):
+    """
+    Lay out the statements of one block, with black's blank lines between them
+
+    :param body: Statements
+    :type body: ```List[stmt]```
+
+    :param depth: Indentation level
+    :type depth: ```int```
+
+    :param parent: What the block is within: "module", "class", "def", or "flow"
+    :type parent: ```str```
+
+    :param line_length: Maximum line length
+    :type line_length: ```int```
+
+    :returns: Lines, without line endings
+    :rtype: ```List[str]```
+    """
+    lines = []
+    for i, node in enumerate(body):
+        if i:
+            lines += [""] * _blank_lines(body[i - 1], node, i, depth, parent)
+        elif isinstance(node, (ClassDef, FunctionDef)) and parent == "flow":
+            lines.append("")
+        if i == 0 and parent == "module" and _is_docstring(node):
+            # black only reformats the docstrings of classes and functions
+            lines += _triple_quoted(get_value(node.value)).split("\n")
+        elif i == 0 and parent != "flow" and _is_docstring(node):
+            lines += _docstring(get_value(node.value), depth, line_length)
+        else:
+            lines += _statement(node, depth, line_length)
+    return lines
+
+
+def _blank_lines(previous, node, index, depth, parent):
+    """
+    Number of blank lines black puts between two consecutive statements of a block
+
+    :param previous: The earlier statement
+    :type previous: ```stmt```
+
+    :param node: The later statement
+    :type node: ```stmt```
+
+    :param index: Index of the later statement within its block
+    :type index: ```int```
+
+    :param depth: Indentation level
+    :type depth: ```int```
+
+    :param parent: What the block is within: "module", "class", "def", or "flow"
+    :type parent: ```str```
+
+    :returns: Number of blank lines
+    :rtype: ```int```
+    """
+    if isinstance(node, (ClassDef, FunctionDef)) or _ends_with_def(previous):
+        return 1 if depth else 2
+    elif index == 1 and parent in ("module", "class") and _is_docstring(previous):
+        return 1
+    return int(
+        isinstance(previous, (Import, ImportFrom))
+        and not isinstance(node, (Import, ImportFrom))
+    )
+
+
+def _ends_with_def(node):
+    """
+    Whether the last line of the statement is within a class or function, so black separates what follows
+
+    :param node: AST statement
+    :type node: ```stmt```
+
+    :returns: Whether the statement ends within a class or function
+    :rtype: ```bool```
+    """
+    while not isinstance(node, (ClassDef, FunctionDef)):
+        body = _last_block(node)
+        if not body:
+            return False
+        node = body[-1]
+    return True
+
+
+def _last_block(node):
+    """
+    :param node: AST statement
+    :type node: ```stmt```
+
+    :returns: The statements of the last block of the compound statement, else None
+    :rtype: ```Optional[List[stmt]]```
+    """
+    if isinstance(node, Try):
+        return node.finalbody or node.orelse or node.handlers[-1].body
+    return getattr(node, "orelse", None) or getattr(node, "body", None)
+
+
+def _is_docstring(node):
+    """
+    :param node: AST statement
+    :type node: ```stmt```
+
+    :returns: Whether the statement is a string expression, i.e., a docstring when it's first in a block
+    :rtype: ```bool```
+    """
+    return isinstance(node, Expr) and isinstance(get_value(node.value), str)
+
+
+def _docstring(docstring, depth, line_length):
+    """
+    Lay out the docstring as black does: indented to match, stripped of trailing whitespace, in triple quotes
+
+    :param docstring: The docstring
+    :type docstring: ```str```
+
+    :param depth: Indentation level
+    :type depth: ```int```
+
+    :param line_length: Maximum line length
+    :type line_length: ```int```
+
+    :returns: Lines, without line endings
+    :rtype: ```List[str]```
+    """
+    if docstring.splitlines() != docstring.rstrip("\n").split("\n"):
+        raise _Unformattable("docstring that black splits differently")
+    _check_unescaped(docstring)
+    indent = " " * 4 * depth
+    started_empty = not docstring
+    if "\n" in docstring:
+        lines = docstring.split("\n")
+        margin = min(
+            (len(line) - len(line.lstrip()) for line in lines[1:] if line.strip()),
+            default=None,
+        )
+        docstring = "\n".join(
+            [lines[0].strip()]
+            + (
+                []
+                if margin is None
+                else [
+                    (
+                        indent + line[margin:].rstrip()
+                        if line.strip() or i == len(lines) - 2
+                        else ""
+                    )
+                    for i, line in enumerate(lines[1:])
+                ]
+            )
+        )
+    else:
+        docstring = docstring.strip()
+
+    if docstring:
+        if docstring[0] == '"':
+            docstring = " " + docstring
+        if docstring[-1] == '"':
+            docstring += " "
+    elif not started_empty:
+        docstring = " "
+
+    lines = docstring.splitlines()
+    if (
+        len(lines) > 1
+        and len(lines[-1]) + 3 > line_length
+        and len(indent) + 3 <= line_length
+    ):
+        docstring += "\n" + indent
+    return '{}"""{}"""'.format(indent, docstring).split("\n")
+
+
+def _triple_quoted(string):
+    """
+    :param string: String
+    :type string: ```str```
+
+    :returns: The string as a triple-quoted literal, without escapes
+    :rtype: ```str```
+    """
+    _check_unescaped(string)
+    if string.endswith('"'):
+        raise _Unformattable("string ending in a quote")
+    return '"""{}"""'.format(string)
+
+
+def _check_unescaped(string):
+    """
+    Check that the string can be written between triple quotes as it is
+
+    :param string: String
+    :type string: ```str```
+    """
+    if any(char in string for char in "\\\t\r") or '"""' in string:
+        raise _Unformattable("string that needs escaping")
+
+
+def _statement(node, depth, line_length):
+    """
+    Lay out one statement, with any block(s) within it
+
+    :param node: AST statement
+    :type node: ```stmt```
+
+    :param depth: Indentation level
+    :type depth: ```int```
+
+    :param line_length: Maximum line length
+    :type line_length: ```int```
+
+    :returns: Lines, without line endings
+    :rtype: ```List[str]```
+    """
+    indent = " " * 4 * depth
+    if isinstance(node, (ClassDef, FunctionDef)):
+        if _is_stub(node.body):
+            raise _Unformattable("black puts stub bodies on the `def` line")
+        lines = [
+            _fits("{}@{}".format(indent, _unparse(decorator)), line_length)
+            for decorator in node.decorator_list
+        ]
+        if isinstance(node, FunctionDef):
+            lines += _def_lines(node, indent, line_length)
+        else:
+            lines.append(_fits(indent + _header(node), line_length))
+        return lines + _block(
+            node.body,
+            depth + 1,
+            "def" if isinstance(node, FunctionDef) else "class",
+            line_length,
+        )
+    elif isinstance(node, _FLOW):
+        return _flow_lines(node, depth, line_length)
+    elif not isinstance(node, _SPLITTABLE + _SIMPLE):
+        raise _Unformattable(type(node).__name__)
+    _check_normalised(node)
+    line = indent + _unparse(node)
+    if (
+        not PY_GTE_3_9
+        and len(line) > _ASTOR_LINE_LENGTH
+        and (
+            isinstance(getattr(node, "value", None), Tuple)
+            or isinstance(node, Assign)
+            and len(node.targets) > 1
+        )
+        and _astor_parenthesises(node, depth)
+    ):
+        raise _Unformattable("tuple or chained assignment that astor parenthesises")
+    elif _is_short(line, line_length):
+        return [line]
+    elif not isinstance(node, _SPLITTABLE):
+        raise _Unformattable("long line")
+    # What black does with a line it can't make fit varies, so any such is left to it
+    return [
+        _fits(split_line, line_length)
+        for split_line in _split_statement(node, indent, line_length)
+    ]
+
+
+def _astor_parenthesises(node, depth):
+    """
+    Whether astor, wrapping the statement's line as `to_code` does before Python 3.9, puts parentheses into it. black
+    keeps those around a tuple or an assignment target, though it drops those around a lone value
+
+    :param node: AST statement
+    :type node: ```stmt```
+
+    :param depth: Indentation level
+    :type depth: ```int```
+
+    :returns: Whether the wrapped statement differs from the unwrapped, other than in whitespace
+    :rtype: ```bool```
+    """
+    from astor import to_source
+
+    nested = node
+    for _ in range(depth):
+        nested = If(test=Name("_", Load()), body=[nested], orelse=[])
+    return "".join(to_source(nested).split()) != "if_:" * depth + "".join(
+        _unparse(node).split()
+    )
+
+
+def _flow_lines(node, depth, line_length):
+    """
+    Lay out an `if`, `for`, `while`, `with`, or `try` statement, with its blocks
+
+    :param node: AST statement
+    :type node: ```Union[For, If, Try, While, With]```
+
+    :param depth: Indentation level
+    :type depth: ```int```
+
+    :param line_length: Maximum line length
+    :type line_length: ```int```
+
+    :returns: Lines, without line endings
+    :rtype: ```List[str]```
+    """
+    indent = " " * 4 * depth
+    clauses = [(_header(node), node.body)]
+    if isinstance(node, Try):
+        clauses += [(_header(handler), handler.body) for handler in node.handlers]
+        clauses += [("else:", node.orelse), ("finally:", node.finalbody)]
+    elif isinstance(node, If):
+        while len(node.orelse) == 1 and isinstance(node.orelse[0], If):
+            node = node.orelse[0]
+            clauses.append(("el" + _header(node), node.body))
+        clauses.append(("else:", node.orelse))
+    else:
+        clauses.append(("else:", getattr(node, "orelse", None)))
+
+    lines, previous = [], None
+    for header, body in clauses:
+        if not body:
+            continue
+        elif previous is not None and _ends_with_def(previous[-1]):
+            lines.append("")
+        lines.append(_fits(indent + header, line_length))
+        lines += _block(body, depth + 1, "flow", line_length)
+        previous = body
+    return lines
+
+
+def _header(node):
+    """
+    Unparse the line that opens the block(s) of a compound statement
+
+    :param node: AST statement, or `except` handler
+    :type node: ```Union[stmt, ExceptHandler]```
+
+    :returns: The line, e.g., "for a in b:"
+    :rtype: ```str```
+    """
+    if isinstance(node, Try):
+        return "try:"
+    fields = {field: getattr(node, field, None) for field in node._fields}
+    fields.update(
+        (field, [Pass()] if field == "body" else [])
+        for field in ("body", "orelse", "decorator_list")
+        if field in fields
+    )
+    node = type(node)(**fields)
+    _check_normalised(node)
+    if isinstance(node, ExceptHandler):
+        source = _unparse(Try(body=[Pass()], handlers=[node], orelse=[], finalbody=[]))
+        prefix = "try:\n    pass\n"
+    else:
+        source, prefix = _unparse(node), ""
+    header, _, rest = source[len(prefix) :].partition("\n")
+    if not source.startswith(prefix) or rest != "    pass":
+        raise _Unformattable("header spanning lines")
+    return header
+
+
+def _def_lines(node, indent, line_length):
+    """
+    Lay out the `def` line, splitting its parameters over lines as black does if it's too long
+
+    :param node: AST function
+    :type node: ```FunctionDef```
+
+    :param indent: Indentation
+    :type indent: ```str```
+
+    :param line_length: Maximum line length
+    :type line_length: ```int```
+
+    :returns: Lines, without line endings
+    :rtype: ```List[str]```
+    """
+    posonlyargs, args, defaults, vararg, kwonlyargs, kw_defaults, kwarg = (
+        getattr(node.args, field, None) or ([] if field.endswith("s") else None)
+        for field in (
+            "posonlyargs",
+            "args",
+            "defaults",
+            "vararg",
+            "kwonlyargs",
+            "kw_defaults",
+            "kwarg",
+        )
+    )
+    positional = posonlyargs + args
+    params = list(
+        map(
+            _param,
+            positional,
+            [None] * (len(positional) - len(defaults)) + defaults,
+        )
+    )
+    if posonlyargs:
+        params.insert(len(posonlyargs), "/")
+    if vararg is not None:
+        params.append("*" + _param(vararg))
+    elif kwonlyargs:
+        params.append("*")
+    params += list(map(_param, kwonlyargs, kw_defaults))
+    if kwarg is not None:
+        params.append("**" + _param(kwarg))
+    head = "def {}(".format(node.name)
+    tail = "){}:".format(
+        ""
+        if getattr(node, "returns", None) is None
+        else " -> " + _unparse(node.returns)
+    )
+
+    line = indent + head + ", ".join(params) + tail
+    if _is_short(line, line_length):
+        return [line]
+    elif len(params) == 1 and (vararg or kwarg):
+        raise _Unformattable("lone `*args` or `**kwargs` that's too long")
+    inner = indent + " " * 4
+    hugged = inner + ", ".join(params)
+    if len(params) > 1 and _is_short(hugged, line_length):
+        body = [hugged]
+    else:
+        body = [_fits(inner + param + ",", line_length) for param in params]
+        if vararg or kwarg or kwonlyargs or posonlyargs:
+            # See `_uses_newer_syntax`
+            body[-1] = body[-1][:-1]
+    return (
+        [_fits(indent + head, line_length)] + body + [_fits(indent + tail, line_length)]
+    )
+
+
+def _param(arg, default=None):
+    """
+    :param arg: AST parameter
+    :type arg: ```arg```
+
+    :param default: Its default, if any
+    :type default: ```Optional[expr]```
+
+    :returns: The parameter as black writes it, e.g., "a: int = 5"
+    :rtype: ```str```
+    """
+    param, annotation = arg.arg, getattr(arg, "annotation", None)
+    if annotation is not None:
+        param += ": " + _item(annotation)
+    if default is not None:
+        param += "{}{}".format(" = " if annotation is not None else "=", _item(default))
+    return param
+
+
+def _split_statement(node, indent, line_length):
+    """
+    Split a statement that's too long at the brackets of its value, as black does
+
+    :param node: AST statement
+    :type node: ```Union[AnnAssign, Assign, Expr, Return]```
+
+    :param indent: Indentation
+    :type indent: ```str```
+
+    :param line_length: Maximum line length
+    :type line_length: ```int```
+
+    :returns: Lines, without line endings
+    :rtype: ```List[str]```
+    """
+    value = node.value
+    if isinstance(node, Assign) and len(node.targets) > 1 or value is None:
+        raise _Unformattable("chained or bare assignment")
+    elif (
+        isinstance(value, Call)
+        or isinstance(value, Tuple)
+        and not isinstance(node, Expr)
+    ):
+        pass
+    elif isinstance(node, Expr) or not isinstance(value, (Constant, List, Name)):
+        raise _Unformattable("long line without brackets to split at")
+    line = _unparse(type(node)(**dict(vars(node), value=Name(_PLACEHOLDER))))
+    head = line[: line.rindex(_PLACEHOLDER)]
+    if not isinstance(value, (Constant, Name)):
+        return _split_brackets(indent, head, value, "", line_length)
+
+    # black wraps the value in parentheses if that makes it fit, or if what's before it has brackets of its own
+    line = _unparse(node)
+    if any(char in head for char in "'\"") or not line.startswith(head):
+        raise _Unformattable("string before the value")
+    wrapped = [
+        _fits(indent + head + "(", line_length - 1),
+        indent + " " * 4 + line[len(head) :],
+        indent + ")",
+    ]
+    if any(char in head for char in "([{") or _is_short(wrapped[1], line_length):
+        return wrapped
+    raise _Unformattable("long line that doesn't fit when wrapped")
+
+
+def _split_brackets(indent, head, node, tail, line_length):
+    """
+    Split an expression over lines at its outermost brackets: the contents on one line if they fit, else one item
+    per line with a trailing comma, each item split in turn
+
+    :param indent: Indentation
+    :type indent: ```str```
+
+    :param head: Code before the expression on its first line
+    :type head: ```str```
+
+    :param node: AST expression, ending in brackets
+    :type node: ```Union[Call, List, Tuple]```
+
+    :param tail: Code after the expression on its last line
+    :type tail: ```str```
+
+    :param line_length: Maximum line length
+    :type line_length: ```int```
+
+    :returns: Lines, without line endings
+    :rtype: ```List[str]```
+    """
+    if isinstance(node, Call):
+        if not _is_dotted_name(node.func):
+            raise _Unformattable("call of an expression")
+        opening, closing = _unparse(node.func) + "(", ")"
+        items = node.args + node.keywords
+    else:
+        opening, closing = "[]" if isinstance(node, List) else "()"
+        items = node.elts
+    if not items:
+        raise _Unformattable("empty brackets")
+
+    inner = indent + " " * 4
+    rendered = list(map(_item, items))
+    lines = [_fits(indent + head + opening, line_length)]
+    if len(items) == 1 and not isinstance(node, Tuple):
+        # Without a comma there's nothing to split at inside the brackets
+        lines += _split_item(inner, items[0], rendered[0], "", line_length)
+    elif isinstance(node, Call) and _is_short(inner + ", ".join(rendered), line_length):
+        lines.append(inner + ", ".join(rendered))
+    else:
+        for item, item_rendered in zip(items, rendered):
+            lines += _split_item(inner, item, item_rendered, ",", line_length)
+        if isinstance(node, Call) and any(
+            isinstance(item, Starred) or isinstance(item, keyword) and item.arg is None
+            for item in items
+        ):
+            # See `_uses_newer_syntax`
+            lines[-1] = lines[-1][:-1]
+    lines.append(_fits(indent + closing + tail, line_length))
+    return lines
+
+
+def _split_item(indent, node, rendered, tail, line_length):
+    """
+    Lay out one item within brackets on its own line, split at its own brackets if it's too long
+
+    :param indent: Indentation
+    :type indent: ```str```
+
+    :param node: AST expression or keyword argument
+    :type node: ```Union[expr, keyword]```
+
+    :param rendered: The item, unparsed
+    :type rendered: ```str```
+
+    :param tail: Code after the item, e.g., ","
+    :type tail: ```str```
+
+    :param line_length: Maximum line length
+    :type line_length: ```int```
+
+    :returns: Lines, without line endings
+    :rtype: ```List[str]```
+    """
+    line = indent + rendered + tail
+    head = ""
+    if isinstance(node, keyword) and node.arg is not None:
+        head, node = node.arg + "=", node.value
+    if _is_short(line, line_length) or _is_atom(node):
+        return [line]
+    elif isinstance(node, (Call, List, Tuple)):
+        return _split_brackets(indent, head, node, tail, line_length)
+    raise _Unformattable("long item without brackets to split at")
+
+
+def _is_atom(node):
+    """
+    :param node: AST expression
+    :type node: ```expr```
+
+    :returns: Whether black can't split the expression over lines, e.g., as it's a string or name
+    :rtype: ```bool```
+    """
+    return isinstance(node, Constant) or _is_dotted_name(node)
+
+
+def _is_dotted_name(node):
+    """
+    :param node: AST expression
+    :type node: ```expr```
+
+    :returns: Whether the expression is a name, or attributes thereof, e.g., `argument_parser.add_argument`
+    :rtype: ```bool```
+    """
+    while isinstance(node, Attribute):
+        node = node.value
+    return isinstance(node, Name)
+
+
+def _is_stub(body):
+    """
+    :param body: Statements of a class or function
+    :type body: ```List[stmt]```
+
+    :returns: Whether the body is just `...`, which black puts on the `def` or `class` line
+    :rtype: ```bool```
+    """
+    return (
+        len(body) == 1
+        and isinstance(body[0], Expr)
+        and get_value(body[0].value) is Ellipsis
+    )
+
+
+def _check_normalised(node):
+    """
+    Check that black leaves the unparsed node as it is, where it fits on a line
+
+    :param node: AST node
+    :type node: ```AST```
+    """
+    for child in walk(node):
+        if isinstance(child, Constant) and "\\" in repr(child.value):
+            raise _Unformattable("string with escapes, which black may split")
+        elif isinstance(child, Tuple) and isinstance(child.ctx, Store):
+            raise _Unformattable("tuple target, which may be parenthesised")
+        elif isinstance(child, Tuple) and len(child.elts) == 1:
+            raise _Unformattable("one-element tuple, which astor doesn't parenthesise")
+        elif isinstance(child, Pow):
+            raise _Unformattable("black hugs simple power operands")
+        elif isinstance(child, Slice) and not all(
+            bound is None or isinstance(bound, (Constant, Name))
+            for bound in (child.lower, child.upper, child.step)
+        ):
+            raise _Unformattable("black spaces complex slices")
+        elif isinstance(child, Lambda) and not PY_GTE_3_9:
+            raise _Unformattable("astor puts a space before a lambda's colon")
+        elif (
+            isinstance(child, For)
+            and not PY_GTE_3_9
+            and not isinstance(
+                child.iter, (Attribute, Call, Constant, List, Name, Subscript)
+            )
+        ):
+            raise _Unformattable("astor parenthesises a `for` loop's iterable")
+
+
+def _check_older_syntax(node):
+    """
+    Check that the code only uses syntax from before Python 3.6. black infers the Python versions to target from
+    the syntax used, and only puts a comma after `*args`, `**kwargs`, or a bare `*` it splits onto its own line
+    when every version it infers supports one. For older syntax that's never, which is how this formatter lays
+    them out.
+
+    :param node: AST node
+    :type node: ```AST```
+    """
+    for child in walk(node):
+        if type(child).__name__ in _NEWER_SYNTAX or getattr(child, "posonlyargs", None):
+            raise _Unformattable("syntax from Python 3.6 or later")
+        elif isinstance(child, ImportFrom) and child.module == "__future__":
+            raise _Unformattable("`__future__` import")
+        elif isinstance(child, (ClassDef, FunctionDef)) and not all(
+            _is_dotted_name(
+                decorator.func if isinstance(decorator, Call) else decorator
+            )
+            for decorator in child.decorator_list
+        ):
+            raise _Unformattable("relaxed decorator")
+        elif isinstance(child, (Subscript, Return)) and any(
+            isinstance(grandchild, Starred) for grandchild in walk(child)
+        ):
+            raise _Unformattable("unpacking in subscript or return")
+
+
+def _fits(line, line_length):
+    """
+    :param line: Line of code
+    :type line: ```str```
+
+    :param line_length: Maximum line length
+    :type line_length: ```int```
+
+    :returns: The line, if it fits
+    :rtype: ```str```
+    """
+    if not _is_short(line, line_length):
+        raise _Unformattable("long line")
+    return line
+
+
+def _is_short(line, line_length):
+    """
+    :param line: Line of code
+    :type line: ```str```
+
+    :param line_length: Maximum line length
+    :type line_length: ```int```
+
+    :returns: Whether the line fits; as for black, never when it contains a multiline string
+    :rtype: ```bool```
+    """
+    return len(line) <= line_length and "\n" not in line
+
+
+def _item(node):
+    """
+    Unparse an expression as an item between commas, e.g., an argument
+
+    :param node: AST expression or keyword argument
+    :type node: ```Union[expr, keyword]```
+
+    :returns: Python source
+    :rtype: ```str```
+    """
+    call = Call(
+        func=Name("f"),
+        args=[] if isinstance(node, keyword) else [node],
+        keywords=[node] if isinstance(node, keyword) else [],
+    )
+    _check_normalised(call)
+    return _unparse(call)[2:-1]
+
+
+def _unparse(node):
+    """
+    Unparse the node, without wrapping long lines; only multiline strings span lines
+
+    :param node: AST node
+    :type node: ```AST```
+
+    :returns: Python source, without leading or trailing line endings
+    :rtype: ```str```
+    """
+    if PY_GTE_3_9:
+        from ast import unparse
+
+        source = unparse(node)
+    else:
+        from astor import to_source
+
+        source = to_source(node, pretty_source="".join)
+    try:
+        source.encode("ascii")
+    except UnicodeEncodeError:
+        raise _Unformattable("non-ASCII code")
+    return source.strip("\n")
+
+
+__all__ = ["FORMAT_VERSION", "LINE_LENGTH", "format_code"]
@@ -3,16 +3,40 @@ Functionality to generate classes, functions, and/or argparse functions from the
 """
 
 import ast
-from ast import Assign, FunctionDef, Import, ImportFrom, Module, Name, Store
-from inspect import getfile, isfunction
-from itertools import chain
+from ast import (
+    AST,
+    Assign,
+    ClassDef,
+    Expr,
+    FunctionDef,
+    Import,
+    ImportFrom,
+    List,
+    Load,
+    Module,
+    Name,
+    Store,
+)
+from inspect import getfile, getsource, isfunction
+from itertools import chain, filterfalse
+from multiprocessing import get_all_start_methods, get_context
 from operator import itemgetter
-from os import path
+from os import cpu_count, path
 
-from doctrans import emit, parse
-from doctrans.ast_utils import get_at_root, maybe_type_comment, set_value
-from doctrans.pure_utils import get_module
+from doctrans import __version__, emit, parse
+from doctrans.ast_utils import (
+    ast_fingerprint,
+    cmp_ast,
+    get_at_root,
+    get_value,
+    maybe_type_comment,
+    set_value,
+)
+from doctrans.cache import cache_key
+from doctrans.lockfile import load_lock, lock_path, save_lock
+from doctrans.pure_utils import get_module, rpartial
 from doctrans.source_transformer import to_code
+from doctrans.writer import write
 
 
 def gen(
@@ -25,6 +49,9 @@ def gen(
     emit_call=False,
     emit_default_doc=True,
     decorator_list=None,
+    check=False,
+    jobs=1,
+    incremental=False,
 ):
     """
     Generate classes, functions, and/or argparse functions from the input mapping
@@ -56,14 +83,30 @@ def gen(
 
     :param decorator_list: List of decorators
     :type decorator_list: ```Optional[Union[List[Str], List[]]]```
+
+    :param check: Only report whether `output_filename` is missing or differs from what would be generated,
+      writing nothing
+    :type check: ```bool```
+
+    :param jobs: Number of processes to parse and emit the symbols with. 0 uses one per CPU. Where processes can't
+      be forked (e.g., Windows) the symbols are parsed and emitted in this process.
+    :type jobs: ```int```
+
+    :param incremental: Update `output_filename` in-place, regenerating only the symbols whose source (or options)
+      changed since the hashes recorded in its directory's `.doctrans.lock`; keeping the rest as they are
+    :type incremental: ```bool```
+
+    :returns: With `check`, whether `output_filename` would change; else None
+    :rtype: ```Optional[bool]```
     """
     extra_symbols = {}
+    prepend_body = [] if prepend is None else ast.parse(prepend).body
     if imports_from_file is None:
-        imports = ""
+        imports = []
     else:
         if prepend:
             prepend_imports = get_at_root(
-                ast.parse(prepend.strip()), (Import, ImportFrom)
+                Module(body=prepend_body, type_ignores=[]), (Import, ImportFrom)
             )
 
             # def rewrite_typings(node):
@@ -132,9 +175,7 @@ def gen(
             else getfile(get_module(imports_from_file, extra_symbols=extra_symbols)),
             "rt",
         ) as f:
-            imports = "".join(
-                map(to_code, get_at_root(ast.parse(f.read()), (Import, ImportFrom)))
-            )
+            imports = get_at_root(ast.parse(f.read()), (Import, ImportFrom))
 
     module_path, _, symbol_name = input_mapping.rpartition(".")
     input_mapping = getattr(
@@ -144,103 +185,337 @@ def gen(
         input_mapping.items() if hasattr(input_mapping, "items") else input_mapping
     )
 
-    global__all__ = []
-    content = "{prepend}{imports}\n{functions_and_classes}\n{__all}".format(
-        prepend="" if prepend is None else prepend,
-        imports=imports,  # TODO: Optimize imports programmatically (akin to `autoflake --remove-all-unused-imports`)
-        functions_and_classes="\n\n".join(
-            print("Generating: {!r}".format(name))
-            or global__all__.append(name_tpl.format(name=name))
-            or to_code(
-                getattr(
-                    emit,
-                    type_.replace("class", "class_").replace(
-                        "argparse", "argparse_function"
-                    ),
-                )(
-                    (
-                        lambda is_func: getattr(
-                            parse,
-                            "function" if is_func else "class_",
-                        )(
-                            obj,
-                            **{} if is_func else {"merge_inner_function": "__init__"}
-                        )
-                    )(
-                        isinstance(obj, FunctionDef) or isfunction(obj)
-                    ),  # TODO: Figure out if it's a function or argparse function
-                    emit_default_doc=emit_default_doc,
-                    **(
-                        lambda _name: {
-                            "class": {
-                                "class_name": _name,
-                                "decorator_list": decorator_list,
-                                "emit_call": emit_call,
-                            },
-                            "function": {
-                                "function_name": _name,
-                            },
-                            "argparse": {"function_name": _name},
-                        }[type_]
-                    )(name_tpl.format(name=name))
-                )
-            )
-            for name, obj in input_mapping_it
-        ),
-        __all=to_code(
-            Assign(
-                targets=[Name("__all__", Store())],
-                value=ast.parse(  # `TypeError: Type List cannot be instantiated; use list() instead`
-                    str(
-                        list(
-                            map(
-                                lambda s: s.rstrip("\n").strip("'").strip('"'),
-                                map(to_code, map(set_value, global__all__)),
-                            )
-                        )
-                    )
-                )
-                .body[0]
-                .value,
-                expr=None,
-                lineno=None,
-                **maybe_type_comment
-            )
-        ),
-    )
+    symbols = tuple(input_mapping_it)
+    global__all__ = [name_tpl.format(name=name) for name, _ in symbols]
+    options = name_tpl, type_, emit_call, emit_default_doc, decorator_list
 
-    parsed_ast = ast.parse(content)
-    # TODO: Shebang line first, then docstring, then imports
-    doc_str = ast.get_docstring(parsed_ast)
-    whole = tuple(
-        map(
-            lambda node: (node, None)
-            if isinstance(node, (Import, ImportFrom))
-            else (None, node),
-            parsed_ast.body,
+    functions_and_classes = [None] * len(symbols)
+    if incremental:
+        lock_filename = lock_path(output_filename)
+        lock = load_lock(lock_filename)
+        options_hash = cache_key(__version__, *options)
+        hashes = list(map(_symbol_hash, map(itemgetter(1), symbols)))
+        existing_source, existing_ast = _reuse_unchanged(
+            output_filename,
+            lock.get("gen", {}).get(path.basename(output_filename), {}),
+            options_hash,
+            global__all__,
+            hashes,
+            functions_and_classes,
         )
-    )
 
-    parsed_ast.body = list(
-        filter(
-            None,
+    for idx, node in _gen_symbols(
+        symbols,
+        [idx for idx, node in enumerate(functions_and_classes) if node is None],
+        options,
+        jobs,
+    ):
+        functions_and_classes[idx] = node
+
+    # TODO: Shebang line first, then docstring, then imports
+    doc_str = (
+        prepend_body[:1]
+        if prepend_body
+        and isinstance(prepend_body[0], Expr)
+        and isinstance(get_value(prepend_body[0].value), str)
+        else []
+    )
+    # TODO: Optimize imports programmatically (akin to `autoflake --remove-all-unused-imports`)
+    body = prepend_body[len(doc_str) :] + imports
+    parsed_ast = Module(
+        body=list(
             chain.from_iterable(
                 (
-                    parsed_ast.body[:1] if doc_str else iter(()),
+                    doc_str,
                     sorted(
-                        map(itemgetter(0), whole),
+                        filter(rpartial(isinstance, (Import, ImportFrom)), body),
                         key=lambda import_from: getattr(import_from, "module", None)
                         == "__future__",
                         reverse=True,
                     ),
-                    map(itemgetter(1), whole[1:] if doc_str else whole),
-                ),
-            ),
+                    filterfalse(rpartial(isinstance, (Import, ImportFrom)), body),
+                    functions_and_classes,
+                    (
+                        Assign(
+                            targets=[Name("__all__", Store())],
+                            value=List(
+                                ctx=Load(),
+                                elts=list(map(set_value, global__all__)),
+                                expr=None,
+                            ),
+                            expr=None,
+                            lineno=None,
+                            **maybe_type_comment
+                        ),
+                    ),
+                )
+            )
+        ),
+        type_ignores=[],
+        stmt=None,
+    )
+
+    if incremental and existing_ast is not None:
+        if check:
+            return (
+                _incremental_source(existing_source, existing_ast, parsed_ast)
+                != existing_source
+            )
+        write(
+            output_filename,
+            "wt",
+            _incremental_source,
+            existing_source,
+            existing_ast,
+            parsed_ast,
         )
+    elif check:
+        if not path.isfile(output_filename):
+            return True
+        with open(output_filename, "rt") as f:
+            return f.read() != to_code(parsed_ast)
+    else:
+        # Unparsed once, as a whole, rather than symbol by symbol
+        emit.file(parsed_ast, output_filename, mode="a", skip_black=True)
+
+    if incremental:
+        lock.setdefault("gen", {})[path.basename(output_filename)] = {
+            "options": options_hash,
+            "symbols": dict(zip(global__all__, hashes)),
+        }
+        save_lock(lock_filename, lock)
+
+
+def _gen_symbols(symbols, indices, options, jobs):
+    """
+    Parse and emit the symbols at these indices of the input mapping, with a pool of processes if `jobs` > 1
+
+    :param symbols: Name and symbol, for each in the input mapping
+    :type symbols: ```Tuple[Tuple[str, Any], ...]```
+
+    :param indices: Indices of the symbols to generate, in order
+    :type indices: ```List[int]```
+
+    :param options: The arguments to `_gen_symbol` that follow the name and symbol
+    :type options: ```Tuple[Any, ...]```
+
+    :param jobs: Number of processes to parse and emit the symbols with. 0 uses one per CPU. Where processes can't
+      be forked (e.g., Windows) the symbols are parsed and emitted in this process.
+    :type jobs: ```int```
+
+    :returns: Index and emitted symbol, for each index, in order
+    :rtype: ```Iterator[Tuple[int, Union[ClassDef, FunctionDef]]]```
+    """
+    jobs = min(jobs or cpu_count(), len(indices))
+    if jobs < 2 or "fork" not in get_all_start_methods():
+        for idx in indices:
+            _report_progress(symbols[idx][0])
+            yield idx, _gen_symbol(*symbols[idx], *options)
+        return
+
+    # Forked—whatever the platform's default start method—so that each worker inherits this process' memory: the
+    # symbols (often live objects, which needn't pickle) and the `prepend`ed imports `gen` put into `globals()`.
+    # A spawned worker would be sent pickles of the symbols, and start without those imports.
+    with get_context("fork").Pool(
+        jobs, initializer=_init_worker, initargs=(symbols, options)
+    ) as pool:
+        for idx, node in zip(indices, pool.imap(_gen_symbol_in_worker, indices)):
+            _report_progress(symbols[idx][0])
+            yield idx, node
+
+
+def _symbol_hash(obj):
+    """
+    Hash the source of a symbol of the input mapping
+
+    :param obj: The symbol, e.g., a class, function, or `FunctionDef`
+    :type obj: ```Any```
+
+    :returns: Hex hash of its source; None if it has none to hash, so it's always regenerated
+    :rtype: ```Optional[str]```
+    """
+    if isinstance(obj, AST):
+        return ast_fingerprint(obj).hex()
+    try:
+        return cache_key(getsource(obj))
+    except (OSError, TypeError):
+        return None
+
+
+def _reuse_unchanged(
+    output_filename, previous, options_hash, names, hashes, functions_and_classes
+):
+    """
+    Keep the symbols whose hash (and the options) are unchanged since recorded, as they are in the existing output
+
+    :param output_filename: Output file to update
+    :type output_filename: ```str```
+
+    :param previous: What the lockfile recorded for the output: the hash of its options, and of each symbol
+    :type previous: ```dict```
+
+    :param options_hash: Hash of the options now
+    :type options_hash: ```str```
+
+    :param names: Name of each symbol, as generated
+    :type names: ```List[str]```
+
+    :param hashes: Hash of each symbol now; None if it can't be hashed
+    :type hashes: ```List[Optional[str]]```
+
+    :param functions_and_classes: Generated node for each symbol; those kept are set in-place
+    :type functions_and_classes: ```List[Optional[Union[ClassDef, FunctionDef]]]```
+
+    :returns: The source of the existing output, and its module; None and None if it doesn't exist
+    :rtype: ```Tuple[Optional[str], Optional[Module]]```
+    """
+    if not path.isfile(output_filename):
+        return None, None
+    with open(output_filename, "rt") as f:
+        existing_source = f.read()
+    existing_ast = ast.parse(existing_source, filename=output_filename)
+    if previous.get("options") == options_hash:
+        existing_nodes = {
+            node.name: node
+            for node in existing_ast.body
+            if isinstance(node, (ClassDef, FunctionDef))
+        }
+        recorded = previous.get("symbols", {})
+        for idx, (symbol_name, symbol_hash) in enumerate(zip(names, hashes)):
+            if symbol_hash is not None and recorded.get(symbol_name) == symbol_hash:
+                functions_and_classes[idx] = existing_nodes.get(symbol_name)
+    return existing_source, existing_ast
+
+
+def _incremental_source(source, existing_ast, parsed_ast):
+    """
+    The source of the regenerated module: only the statements that differ from those of the existing module are
+    spliced into its source. If they can't be—e.g., symbols were added or removed—the whole module is emitted.
+
+    :param source: Source of the existing module
+    :type source: ```str```
+
+    :param existing_ast: The existing module, parsed from `source`
+    :type existing_ast: ```Module```
+
+    :param parsed_ast: The regenerated module, sharing the statements kept from `existing_ast`
+    :type parsed_ast: ```Module```
+
+    :returns: The new source
+    :rtype: ```str```
+    """
+    spliced = None
+    if len(existing_ast.body) == len(parsed_ast.body):
+        spliced = emit.splice(
+            source,
+            [
+                (original_node, replacement_node)
+                for original_node, replacement_node in zip(
+                    existing_ast.body, parsed_ast.body
+                )
+                if original_node is not replacement_node
+                and not cmp_ast(original_node, replacement_node)
+            ],
+            skip_black=True,
+        )
+    return to_code(parsed_ast) if spliced is None else spliced
+
+
+def _report_progress(name):
+    """
+    Report that the symbol was generated. Called in mapping order, from the process running `gen`.
+
+    :param name: Name of the symbol, within the input mapping
+    :type name: ```str```
+    """
+    print("Generating: {!r}".format(name))
+
+
+def _gen_symbol(
+    name, obj, name_tpl, type_, emit_call, emit_default_doc, decorator_list
+):
+    """
+    Parse one symbol of the input mapping, and emit it as the type wanted
+
+    :param name: Name of the symbol, within the input mapping
+    :type name: ```str```
+
+    :param obj: The symbol, e.g., a class, function, or `FunctionDef`
+    :type obj: ```Any```
+
+    :param name_tpl: Template for the name, e.g., `{name}Config`.
+    :type name_tpl: ```str```
+
+    :param type_: What type to generate.
+    :type type_: ```Literal["argparse", "class", "function"]```
+
+    :param emit_call: Whether to emit a `__call__` method from the `_internal` IR subdict
+    :type emit_call: ```bool```
+
+    :param emit_default_doc: Whether help/docstring should include 'With default' text
+    :type emit_default_doc: ```bool```
+
+    :param decorator_list: List of decorators
+    :type decorator_list: ```Optional[Union[List[Str], List[]]]```
+
+    :returns: The emitted symbol
+    :rtype: ```Union[ClassDef, FunctionDef]```
+    """
+    # TODO: Figure out if it's a function or argparse function
+    intermediate_repr = (
+        parse.function(obj)
+        if isinstance(obj, FunctionDef) or isfunction(obj)
+        else parse.class_(obj, merge_inner_function="__init__")
     )
+    symbol_name = name_tpl.format(name=name)
+    return getattr(
+        emit,
+        type_.replace("class", "class_").replace("argparse", "argparse_function"),
+    )(
+        intermediate_repr,
+        emit_default_doc=emit_default_doc,
+        **{
+            "class": {
+                "class_name": symbol_name,
+                "decorator_list": decorator_list,
+                "emit_call": emit_call,
+            },
+            "function": {"function_name": symbol_name},
+            "argparse": {"function_name": symbol_name},
+        }[type_]
+    )
+
+
+# The symbols and options within a `gen` worker process; see `_init_worker`
+_symbols = None
+_options = None
+
+
+def _init_worker(symbols, options):
+    """
+    Initialise a `gen` worker process
+
+    :param symbols: Name and symbol, for each in the input mapping
+    :type symbols: ```Tuple[Tuple[str, Any], ...]```
 
-    with open(output_filename, "a") as f:
-        f.write(to_code(parsed_ast))
+    :param options: The arguments to `_gen_symbol` that follow the name and symbol
+    :type options: ```Tuple[Any, ...]```
+    """
+    global _symbols, _options
+    _symbols, _options = symbols, options
+
+
+def _gen_symbol_in_worker(index):
+    """
+    Parse and emit one symbol of the input mapping, from within a `gen` worker process
+
+    :param index: Index of the symbol within the input mapping
+    :type index: ```int```
+
+    :returns: The emitted symbol
+    :rtype: ```Union[ClassDef, FunctionDef]```
+    """
+    return _gen_symbol(*_symbols[index], *_options)
 
 
 __all__ = ["gen"]
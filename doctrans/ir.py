@@ -0,0 +1,164 @@
+"""
+Compact types for the intermediate_repr. Each param (and the return type) is a `Param`: a mapping—so it is read,
+updated, and compared exactly as the dict it replaces—that holds 'typ', 'doc', and 'default' in slots, not a hash
+table; a fraction of a dict's size, which adds up across the params of a large index.
+
+The parsers build `Param`s directly. Being no `dict`, a `Param` isn't serialised by `json` as is: pass `default=dict`,
+as in `json.dumps(intermediate_repr, default=dict)`.
+"""
+
+from collections.abc import MutableMapping
+
+# The keys stored in slots; in the order they are iterated in
+PARAM_FIELDS = "typ", "doc", "default"
+
+
+class Param(MutableMapping):
+    """
+    Param of the intermediate_repr, with keys: 'typ', 'doc', 'default'; and, rarely, others.
+    An unset key is missing, as from a dict.
+    """
+
+    __slots__ = PARAM_FIELDS + ("_extra",)
+
+    def __init__(self, *args, **kwargs):
+        """
+        :param args: Mapping or iterable of key and value pairs, as to `dict`
+        :type args: ```Union[Mapping[str, Any], Iterable[Tuple[str, Any]]]```
+
+        :param kwargs: Keys and values
+        :type kwargs: ```Any```
+        """
+        self.update(*args, **kwargs)
+
+    def __getitem__(self, key):
+        """
+        :param key: Key, e.g., 'typ'
+        :type key: ```str```
+
+        :returns: Its value
+        :rtype: ```Any```
+        """
+        try:
+            return getattr(self, key) if key in PARAM_FIELDS else self._extra[key]
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        """
+        :param key: Key, e.g., 'typ'
+        :type key: ```str```
+
+        :param value: Its value
+        :type value: ```Any```
+        """
+        if key in PARAM_FIELDS:
+            setattr(self, key, value)
+        else:
+            try:
+                self._extra[key] = value
+            except AttributeError:
+                self._extra = {key: value}
+
+    def __contains__(self, key):
+        """
+        :param key: Key, e.g., 'typ'
+        :type key: ```str```
+
+        :returns: Whether the key is set
+        :rtype: ```bool```
+        """
+        return (
+            hasattr(self, key)
+            if key in PARAM_FIELDS
+            else key in getattr(self, "_extra", ())
+        )
+
+    def __delitem__(self, key):
+        """
+        :param key: Key, e.g., 'typ'
+        :type key: ```str```
+        """
+        try:
+            if key in PARAM_FIELDS:
+                delattr(self, key)
+            else:
+                del self._extra[key]
+        except AttributeError:
+            raise KeyError(key)
+
+    def __iter__(self):
+        """
+        :returns: The keys set; those in `PARAM_FIELDS` first, in its order
+        :rtype: ```Iterator[str]```
+        """
+        for key in PARAM_FIELDS:
+            if hasattr(self, key):
+                yield key
+        if hasattr(self, "_extra"):
+            yield from self._extra
+
+    def __len__(self):
+        """
+        :returns: Number of keys set
+        :rtype: ```int```
+        """
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        """
+        :returns: Representation, akin to the dict it replaces
+        :rtype: ```str```
+        """
+        return "{}({!r})".format(type(self).__name__, dict(self))
+
+    def __getstate__(self):
+        """
+        :returns: The keys and values set, to pickle (with any protocol) and copy
+        :rtype: ```dict```
+        """
+        return dict(self)
+
+    def __setstate__(self, state):
+        """
+        :param state: The keys and values set, as from `__getstate__`
+        :type state: ```dict```
+        """
+        self.update(state)
+
+    def copy(self):
+        """
+        :returns: Shallow copy
+        :rtype: ```Param```
+        """
+        return type(self)(self)
+
+
+def compact(intermediate_repr):
+    """
+    Make each param of the intermediate_repr, and its return type, a `Param`; as for an IR built by hand, or loaded
+    from JSON. (The parsers give `Param`s already.)
+
+    :param intermediate_repr: a dictionary of form
+        {  "name": Optional[str],
+           "type": Optional[str],
+           "doc": Optional[str],
+           "params": OrderedDict[str, {'typ': str, 'doc': Optional[str], 'default': Any}]
+           "returns": Optional[OrderedDict[Literal['return_type'],
+                                           {'typ': str, 'doc': Optional[str], 'default': Any}),)]] }
+    :type intermediate_repr: ```dict```
+
+    :returns: The same intermediate_repr, updated in-place
+    :rtype: ```dict```
+    """
+    for key in "params", "returns":
+        params = intermediate_repr.get(key)
+        if params:
+            intermediate_repr[key] = type(params)(
+                (name, Param(param) if type(param) is dict else param)
+                for name, param in params.items()
+            )
+    return intermediate_repr
+
+
+__all__ = ["PARAM_FIELDS", "Param", "compact"]
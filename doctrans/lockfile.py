@@ -0,0 +1,142 @@
+"""
+The lockfile, `.doctrans.lock`: JSON recording hashes of what was generated and synced, so later runs can skip what
+hasn't changed since. One lives in each directory written to (by `gen`), or holding a truth (for `sync`).
+"""
+
+import json
+from ast import AST
+from collections import OrderedDict
+from collections.abc import Mapping
+from os import path
+
+from doctrans import __version__
+from doctrans.ast_utils import ast_fingerprint
+from doctrans.cache import cache_key
+from doctrans.writer import write
+
+LOCK_FILENAME = ".doctrans.lock"
+
+# Bump when the layout of the lockfile changes, invalidating those already written
+LOCK_VERSION = 1
+
+
+def lock_path(filename):
+    """
+    :param filename: File that was written to
+    :type filename: ```str```
+
+    :returns: Path of the lockfile recording what was written to the file
+    :rtype: ```str```
+    """
+    return path.join(path.dirname(path.realpath(filename)), LOCK_FILENAME)
+
+
+def load_lock(lock_filename):
+    """
+    Load the lockfile
+
+    :param lock_filename: Path of the lockfile
+    :type lock_filename: ```str```
+
+    :returns: The lockfile's content; empty if it is missing, unreadable, or of another `LOCK_VERSION`
+    :rtype: ```dict```
+    """
+    try:
+        with open(lock_filename, "rt") as f:
+            lock = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return (
+        lock if isinstance(lock, dict) and lock.get("version") == LOCK_VERSION else {}
+    )
+
+
+def save_lock(lock_filename, lock):
+    """
+    Save the lockfile, atomically
+
+    :param lock_filename: Path of the lockfile
+    :type lock_filename: ```str```
+
+    :param lock: The lockfile's content
+    :type lock: ```dict```
+    """
+    write(lock_filename, "wt", _dumps, dict(lock, version=LOCK_VERSION))
+
+
+def file_hash(filename):
+    """
+    :param filename: File to hash
+    :type filename: ```str```
+
+    :returns: Hex hash of the file's content; None if it doesn't exist
+    :rtype: ```Optional[str]```
+    """
+    try:
+        with open(filename, "rb") as f:
+            return cache_key(f.read())
+    except OSError:
+        return None
+
+
+def ir_hash(intermediate_repr):
+    """
+    Hash the IR, and doctrans' version (as what is emitted from it depends on that)
+
+    :param intermediate_repr: The IR
+    :type intermediate_repr: ```dict```
+
+    :returns: Hex hash of the IR, equal for equal IRs
+    :rtype: ```str```
+    """
+    return cache_key(__version__, _stable_repr(intermediate_repr))
+
+
+def _stable_repr(value):
+    """
+    :param value: Part of an IR
+    :type value: ```Any```
+
+    :returns: A `repr` of the value that is the same in every process; so AST nodes are fingerprinted. Keys are
+      sorted, as mappings that are equal needn't have been filled in the same order; but not an `OrderedDict`'s (e.g.,
+      the params), whose order is part of its equality, and of what's emitted from it.
+    :rtype: ```str```
+    """
+    if isinstance(value, Mapping):
+        return "{{{}}}".format(
+            ", ".join(
+                "{!r}: {}".format(key, _stable_repr(val))
+                for key, val in (
+                    value.items()
+                    if isinstance(value, OrderedDict)
+                    else sorted(value.items(), key=lambda item: repr(item[0]))
+                )
+            )
+        )
+    elif isinstance(value, (list, tuple)):
+        return "[{}]".format(", ".join(map(_stable_repr, value)))
+    elif isinstance(value, AST):
+        return ast_fingerprint(value).hex()
+    return repr(value)
+
+
+def _dumps(lock):
+    """
+    :param lock: The lockfile's content
+    :type lock: ```dict```
+
+    :returns: The lockfile's content as JSON, stably ordered to diff well
+    :rtype: ```str```
+    """
+    return "{}\n".format(json.dumps(lock, indent=2, sort_keys=True))
+
+
+__all__ = [
+    "LOCK_FILENAME",
+    "LOCK_VERSION",
+    "file_hash",
+    "ir_hash",
+    "load_lock",
+    "lock_path",
+    "save_lock",
+]
@@ -40,6 +40,7 @@ from doctrans.ast_utils import (
 )
 from doctrans.docstring_parsers import _set_name_and_type, parse_docstring
 from doctrans.emitter_utils import _parse_return, parse_out_param
+from doctrans.ir import Param
 from doctrans.parser_utils import (
     _inspect_process_ir_param,
     _interpolate_return,
@@ -152,23 +153,21 @@ def class_(
     for e in body:
         if isinstance(e, AnnAssign):
             typ = to_code(e.annotation).rstrip("\n")
-            val = (
-                lambda v: {"default": NoneStr}
+            default = (
+                lambda v: NoneStr
                 if v is None
-                else {
-                    "default": v
-                    if type(v).__name__ in simple_types
-                    else (
-                        lambda value: {
-                            "{}": {} if isinstance(v, Dict) else set(),
-                            "[]": [],
-                            "()": (),
-                        }.get(value, parse_to_scalar(value))
-                    )(to_code(v).rstrip("\n"))
-                }
+                else v
+                if type(v).__name__ in simple_types
+                else (
+                    lambda value: {
+                        "{}": {} if isinstance(v, Dict) else set(),
+                        "[]": [],
+                        "()": (),
+                    }.get(value, parse_to_scalar(value))
+                )(to_code(v).rstrip("\n"))
             )(get_value(get_value(e)))
-            # if 'str' in typ and val: val["default"] = val["default"].strip("'")  # Unquote?
-            typ_default = dict(typ=typ, **val)
+            # if 'str' in typ and default: default = default.strip("'")  # Unquote?
+            typ_default = Param(typ=typ, default=default)
 
             for key in "params", "returns":
                 if e.target.id in (intermediate_repr[key] or iter(())):
@@ -194,7 +193,7 @@ def class_(
                                 else (
                                     intermediate_repr["params"],
                                     target.id,
-                                    {"default": val},
+                                    Param(default=val),
                                 )
                             )
                         ),
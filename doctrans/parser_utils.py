@@ -10,6 +10,7 @@ from itertools import chain
 from operator import itemgetter
 
 from doctrans.ast_utils import get_value
+from doctrans.ir import Param
 from doctrans.pure_utils import lstrip_namespace, none_types, rpartial
 from doctrans.source_transformer import to_code
 
@@ -198,7 +199,7 @@ def _interpolate_return(function_def, intermediate_repr):
     )
     if return_ast is not None and return_ast.value is not None:
         if intermediate_repr.get("returns") is None:
-            intermediate_repr["returns"] = OrderedDict((("return_type", {}),))
+            intermediate_repr["returns"] = OrderedDict((("return_type", Param()),))
 
         if (
             "typ" in intermediate_repr["returns"]["return_type"]
@@ -219,7 +220,7 @@ def _interpolate_return(function_def, intermediate_repr):
         )(to_code(return_ast.value).rstrip("\n"))
     if hasattr(function_def, "returns") and function_def.returns is not None:
         if intermediate_repr.get("returns") is None:
-            intermediate_repr["returns"] = OrderedDict((("return_type", {}),))
+            intermediate_repr["returns"] = OrderedDict((("return_type", Param()),))
         intermediate_repr["returns"]["return_type"]["typ"] = to_code(
             function_def.returns
         ).rstrip("\n")
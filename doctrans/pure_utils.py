@@ -1,10 +1,11 @@
 """
 Pure utils for pure functions. For the same input will always produce the same input_str.
 """
+import re
 import typing
 from ast import Name, Str
 from collections import deque
-from functools import partial
+from functools import lru_cache, partial
 from importlib import import_module
 from inspect import getmodule
 from itertools import chain, count, zip_longest
@@ -423,6 +424,22 @@ def blockwise(t, size=2, fillvalue=None):
     return zip_longest(*[iter(t)] * abs(size), fillvalue=fillvalue)
 
 
+def casefold_eq(a, b):
+    """
+    Whether the strings are equal, ignoring case
+
+    :param a: A string
+    :type a: ```str```
+
+    :param b: Another string
+    :type b: ```str```
+
+    :returns: Whether `a` and `b` are equal, ignoring case
+    :rtype: ```bool```
+    """
+    return a.casefold() == b.casefold()
+
+
 def location_within(container, iterable, cmp=eq):
     """
     Finds element within iterable within container
@@ -434,12 +451,28 @@ def location_within(container, iterable, cmp=eq):
     :param iterable: The iterable, can be constructed
     :type iterable: ```Any```
 
-    :param cmp: Comparator to check input against
+    :param cmp: Comparator to check input against. `eq` and `casefold_eq` take a fast path for `str` containers.
     :type cmp: ```Callable[[str, str], bool]```
 
     :returns: (Start index iff found else -1, End index iff found else -1, subset iff found else None)
     :rtype: ```Tuple[int, int, Optional[Any]]```
     """
+    if isinstance(container, str) and (cmp is eq or cmp is casefold_eq):
+        iterable = tuple(iterable)
+        if not iterable:
+            return -1, -1, None
+        elif all(map(rpartial(isinstance, str), iterable)):
+            match = _location_within_pattern(iterable, cmp is casefold_eq).match(
+                container
+            )
+            if match is None:
+                return -1, -1, None
+            return (
+                match.start(match.lastindex),
+                match.end(),
+                iterable[match.lastindex - 1],
+            )
+
     if not hasattr(container, "__len__"):
         container = tuple(container)
     container_len = len(container)
@@ -460,17 +493,69 @@ def location_within(container, iterable, cmp=eq):
     return -1, -1, None
 
 
-BUILTIN_TYPES = (
-    frozenset(
-        chain.from_iterable(
-            map(
-                lambda s: (s, "typing.{}".format(s), "_extensions.{}".format(s)),
-                filter(lambda s: s[0].isupper() and not s.isupper(), dir(typing)),
+@lru_cache(maxsize=256)
+def _location_within_pattern(strings, ignore_case):
+    """
+    Compile one pattern finding the first of the strings (in order) found anywhere, at its earliest position.
+    Each alternative is tried across the whole input before the next, matching the generic `location_within` loop.
+
+    :param strings: Strings to look for, in order of preference
+    :type strings: ```Tuple[str]```
+
+    :param ignore_case: Whether to match case-insensitively
+    :type ignore_case: ```bool```
+
+    :returns: Compiled pattern, for use with `match`; the found string's index is `lastindex - 1`
+    :rtype: ```re.Pattern```
+    """
+    return re.compile(
+        "^(?:{})".format(
+            "|".join(map(lambda s: ".*?({})".format(re.escape(s)), strings))
+        ),
+        re.DOTALL | (re.IGNORECASE if ignore_case else 0),
+    )
+
+
+# Built on first access by `__getattr__` (at import before Python 3.7), as `dir(typing)` is slow to walk at import time
+BUILTIN_TYPES: FrozenSet[str]
+
+
+def __getattr__(name):
+    """
+    Lazily compute module attributes that are expensive to build at import time (PEP 562)
+
+    :param name: Attribute name
+    :type name: ```str```
+
+    :returns: The attribute value, cached onto the module after first access
+    :rtype: ```Any```
+    """
+    if name == "BUILTIN_TYPES":
+        builtin_types = (
+            frozenset(
+                chain.from_iterable(
+                    map(
+                        lambda s: (
+                            s,
+                            "typing.{}".format(s),
+                            "_extensions.{}".format(s),
+                        ),
+                        filter(
+                            lambda s: s[0].isupper() and not s.isupper(), dir(typing)
+                        ),
+                    )
+                )
             )
+            | frozenset(("int", "float", "str", "dict", "list", "tuple"))
         )
-    )
-    | frozenset(("int", "float", "str", "dict", "list", "tuple"))
-)
+        globals()[name] = builtin_types
+        return builtin_types
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+if version_info[:2] < (3, 7):
+    # Module `__getattr__` was added in Python 3.7, so before it, the lazy attributes are built here
+    BUILTIN_TYPES = __getattr__("BUILTIN_TYPES")
 
 
 def code_quoted(s):
@@ -568,6 +653,7 @@ __all__ = [
     "PY_GTE_3_9",
     "assert_equal",
     "blockwise",
+    "casefold_eq",
     "count_iter_items",
     "diff",
     "get_module",
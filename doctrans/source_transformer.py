@@ -2,11 +2,14 @@
 Source transformer module. Uses astor on Python < 3.9
 """
 
+import pickle
 from ast import AsyncFunctionDef, ClassDef, FunctionDef, Module, get_docstring, parse
+from collections import OrderedDict
 from importlib import import_module
 from sys import version_info
 
 from doctrans.ast_utils import annotate_ancestry
+from doctrans.cache import cache_key, get_cache
 from doctrans.pure_utils import reindent, tab
 
 
@@ -28,6 +31,26 @@ def to_code(node):
     )(node)
 
 
+# Bump when `annotate_ancestry` or the docstring remit change what `ast_parse` produces, invalidating cached ASTs
+AST_CACHE_VERSION = 2
+
+# Pickled results of `ast_parse`, most recently used last. None disables; see `memoize_ast_parse`
+_ast_memo = None
+_ast_memo_maxsize = 0
+
+
+def memoize_ast_parse(maxsize=512):
+    """
+    Keep the results of `ast_parse` in memory, e.g., for a long-running `doctrans serve` process.
+    Each call gets its own copy (unpickled), so callers are free to mutate what they get back.
+
+    :param maxsize: Maximum number of parsed sources to hold onto. 0 disables (and clears) the memo.
+    :type maxsize: ```int```
+    """
+    global _ast_memo, _ast_memo_maxsize
+    _ast_memo, _ast_memo_maxsize = (OrderedDict() if maxsize > 0 else None), maxsize
+
+
 def ast_parse(
     source,
     filename="<unknown>",
@@ -54,6 +77,55 @@ def ast_parse(
     :param skip_docstring_remit: Don't parse & emit the docstring as a replacement for current docstring
     :type skip_docstring_remit: ```bool```
 
+    :returns: AST node
+    :rtype: node: ```AST```
+    """
+    disk_cache = get_cache("ast")
+    if _ast_memo is None and disk_cache is None:
+        return _ast_parse(source, filename, mode, skip_annotate, skip_docstring_remit)
+
+    # `filename` isn't part of the key as it doesn't change the resulting AST
+    key = cache_key(
+        AST_CACHE_VERSION, source, mode, skip_annotate, skip_docstring_remit
+    )
+    if _ast_memo is not None and key in _ast_memo:
+        _ast_memo.move_to_end(key)
+        pickled = _ast_memo[key]
+    else:
+        pickled = None if disk_cache is None else disk_cache.get(key)
+        if pickled is None:
+            pickled = pickle.dumps(
+                _ast_parse(source, filename, mode, skip_annotate, skip_docstring_remit),
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+            if disk_cache is not None:
+                disk_cache.set(key, pickled)
+        if _ast_memo is not None:
+            _ast_memo[key] = pickled
+            if len(_ast_memo) > _ast_memo_maxsize:
+                _ast_memo.popitem(last=False)
+    return pickle.loads(pickled)
+
+
+def _ast_parse(source, filename, mode, skip_annotate, skip_docstring_remit):
+    """
+    Parse and annotate the source, without consulting the memo
+
+    :param source: Python source
+    :type  source: ```str```
+
+    :param filename: Filename being parsed
+    :type filename: ```str```
+
+    :param mode: 'exec', 'single', or 'eval'
+    :type mode: ```Literal['exec', 'single', 'eval']```
+
+    :param skip_annotate: Don't run `annotate_ancestry`
+    :type skip_annotate: ```bool```
+
+    :param skip_docstring_remit: Don't parse & emit the docstring as a replacement for current docstring
+    :type skip_docstring_remit: ```bool```
+
     :returns: AST node
     :rtype: node: ```AST```
     """
@@ -74,4 +146,4 @@ def ast_parse(
     return parsed_ast
 
 
-__all__ = ["ast_parse", "to_code"]
+__all__ = ["AST_CACHE_VERSION", "ast_parse", "memoize_ast_parse", "to_code"]
@@ -7,7 +7,7 @@ from os import path
 
 from doctrans import emit
 from doctrans.ast_utils import (
-    RewriteAtQuery,
+    RewriteAtQueries,
     annotate_ancestry,
     find_in_ast,
     it2literal,
@@ -23,6 +23,7 @@ def sync_properties(
     output_filename,
     output_params,
     output_param_wrap=None,
+    check=False,
 ):
     """
     Sync one property, inline to a file
@@ -46,6 +47,12 @@ def sync_properties(
 
     :param output_param_wrap: Wrap all input_str params with this. E.g., `Optional[Union[{output_param}, str]]`
     :param output_param_wrap: ```Optional[str]```
+
+    :param check: Only report whether `output_filename` would change, writing nothing
+    :type check: ```bool```
+
+    :returns: With `check`, whether `output_filename` would change; else None
+    :rtype: ```Optional[bool]```
     """
     with open(path.realpath(path.expanduser(input_filename)), "rt") as f:
         input_ast = ast_parse(f.read(), filename=input_filename)
@@ -54,17 +61,25 @@ def sync_properties(
         output_ast = ast_parse(f.read(), filename=output_filename)
 
     assert len(input_params) == len(output_params)
-    for (input_param, output_param) in zip(input_params, output_params):
-        output_ast = sync_property(
-            input_eval,
-            input_param,
-            input_ast,
-            input_filename,
-            output_param,
-            output_param_wrap,
-            output_ast,
-        )
+    # `_rewrite` replaces in-place, so what is there now is unparsed first
+    original_src = to_code(output_ast) if check else None
+    output_ast = _rewrite(
+        output_ast,
+        map(
+            lambda input_output_param: _replacement(
+                input_eval,
+                input_output_param[0],
+                input_ast,
+                input_filename,
+                input_output_param[1],
+                output_param_wrap,
+            ),
+            zip(input_params, output_params),
+        ),
+    )
 
+    if check:
+        return to_code(output_ast) != original_src
     emit.file(output_ast, output_filename, mode="wt", skip_black=False)
 
 
@@ -105,6 +120,54 @@ def sync_property(
     :returns: New AST derived from `output_ast`
     :rtype: ```AST```
     """
+    return _rewrite(
+        output_ast,
+        (
+            _replacement(
+                input_eval,
+                input_param,
+                input_ast,
+                input_filename,
+                output_param,
+                output_param_wrap,
+            ),
+        ),
+    )
+
+
+def _replacement(
+    input_eval,
+    input_param,
+    input_ast,
+    input_filename,
+    output_param,
+    output_param_wrap,
+):
+    """
+    Find (or evaluate) the property to sync, and where it goes
+
+    :param input_eval: Whether to evaluate the `param`, or just leave it
+    :type input_eval: ```bool```
+
+    :param input_param: Location within file of property.
+       Can be top level like `'a'` for `a=5` or with the `.` syntax as in `output_params`.
+    :type input_param: ```List[str]```
+
+    :param input_ast: AST of the input file
+    :type input_ast: ```AST```
+
+    :param input_filename: Filename of the input (used in `eval`)
+    :type input_filename: ```str```
+
+    :param output_param: Parameters to update. E.g., `'A.F'` for `class A: F = None`, `'f.g'` for `def f(g): pass`
+    :type output_param: ```str```
+
+    :param output_param_wrap: Wrap all input_str params with this. E.g., `Optional[Union[{output_param}, str]]`
+    :param output_param_wrap: ```Optional[str]```
+
+    :returns: Search query within the output, node to replace it with
+    :rtype: ```Tuple[List[str], AST]```
+    """
     search = list(strip_split(output_param, "."))
     if input_eval:
         if input_param.count(".") != 0:
@@ -127,7 +190,8 @@ def sync_property(
             expr_target=None,
         )
     else:
-        annotate_ancestry(input_ast)
+        if not hasattr(input_ast, "_location_index"):
+            annotate_ancestry(input_ast)
         assert isinstance(input_ast, ast.Module)
         replacement_node = find_in_ast(list(strip_split(input_param, ".")), input_ast)
 
@@ -147,14 +211,32 @@ def sync_property(
         else:
             raise NotImplementedError(type(replacement_node).__name__)
 
-    rewrite_at_query = RewriteAtQuery(
-        search=search,
-        replacement_node=replacement_node,
-    )
+    return search, replacement_node
+
+
+def _rewrite(output_ast, replacements):
+    """
+    Replace all the properties within `output_ast`, in one traversal
+
+    :param output_ast: AST of the output file
+    :type output_ast: ```AST```
+
+    :param replacements: Search queries within the output, and the nodes to replace them with
+    :type replacements: ```Iterable[Tuple[List[str], AST]]```
 
-    gen_ast = rewrite_at_query.visit(output_ast)
-    assert rewrite_at_query.replaced is True, "Failed to update with {!r}".format(
-        to_code(replacement_node)
+    :returns: New AST derived from `output_ast`
+    :rtype: ```AST```
+    """
+    rewrite_at_queries = RewriteAtQueries(replacements)
+    gen_ast = rewrite_at_queries.visit(output_ast)
+    assert all(
+        rewrite_at_queries.replaced.values()
+    ), "Failed to update with {!r}".format(
+        ", ".join(
+            to_code(rewrite_at_queries.replacements[search])
+            for search, replaced in rewrite_at_queries.replaced.items()
+            if not replaced
+        )
     )
     return gen_ast
 
@@ -2,3 +2,12 @@
 Prefix tests with test_
     to have them run through the unittest discover or `python setup.py test` mechanism
 """
+
+from os import environ
+
+from doctrans.cache import set_cache_dir
+
+# The tests never touch the on-disk cache of the one running them (nor do processes they start); those testing the
+# cache use temporary ones
+environ["DOCTRANS_CACHE_DIR"] = ""
+set_cache_dir(None)
@@ -0,0 +1,49 @@
+"""
+Benchmarks, run directly, e.g., `python -m doctrans.tests.benchmarks.bench_docstring_parsers`.
+Not prefixed with `test_`, so they don't run through the unittest discover or `python setup.py test` mechanism.
+"""
+
+from timeit import Timer
+
+
+def best_time(func, repeat=5):
+    """
+    Time the function, autoranging the number of calls per run
+
+    :param func: Function to time
+    :type func: ```Callable[[], Any]```
+
+    :param repeat: Number of runs to take the fastest of
+    :type repeat: ```int```
+
+    :returns: Fastest time per call, in seconds
+    :rtype: ```float```
+    """
+    timer = Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def print_scaling(name, sizes_times):
+    """
+    Print the time taken at each size, and the time per byte relative to the smallest size (~1.0 is linear)
+
+    :param name: Name of what was benchmarked
+    :type name: ```str```
+
+    :param sizes_times: Size (in bytes) and time taken (in seconds)
+    :type sizes_times: ```List[Tuple[int, float]]```
+    """
+    first_size, first_time = sizes_times[0]
+    print(name)
+    for size, time in sizes_times:
+        print(
+            "{size:>12,d} bytes {time:>12.6f}s {relative:>8.2f}x per byte".format(
+                size=size,
+                time=time,
+                relative=(time / size) / (first_time / first_size),
+            )
+        )
+
+
+__all__ = ["best_time", "print_scaling"]
@@ -0,0 +1,82 @@
+"""
+Benchmarks for deciding whether a target is unchanged: `meta.asttools.cmp_ast`, versus the early-exit `cmp_ast`
+and the (cold and cached) `ast_fingerprint` from `doctrans.ast_utils`
+"""
+
+import pickle
+
+from meta.asttools import cmp_ast as meta_cmp_ast
+
+from doctrans.ast_utils import ast_fingerprint, cmp_ast
+from doctrans.source_transformer import ast_parse
+from doctrans.tests.benchmarks import best_time
+from doctrans.tests.benchmarks.bench_rewrite_at_queries import config_module
+
+
+def fingerprints_equal(pickled0, pickled1):
+    """
+    Fingerprint both modules from cold, and compare
+
+    :param pickled0: Pickled AST
+    :type pickled0: ```bytes```
+
+    :param pickled1: Pickled AST
+    :type pickled1: ```bytes```
+
+    :returns: Whether the fingerprints are equal
+    :rtype: ```bool```
+    """
+    return ast_fingerprint(pickle.loads(pickled0)) == ast_fingerprint(
+        pickle.loads(pickled1)
+    )
+
+
+def bench_cmp_ast(sizes=(25, 100, 400, 1600)):
+    """
+    Benchmark comparing a config class to an equal one, and to one differing in its last property.
+    Cold times include the time to copy both ASTs, which is printed separately.
+
+    :param sizes: Numbers of properties
+    :type sizes: ```Tuple[int, ...]```
+    """
+    print("Comparing a config class to an equal one, and to one differing at the end")
+    for size in sizes:
+        src = config_module(size)
+        node = ast_parse(src, skip_docstring_remit=True)
+        equal = ast_parse(src, skip_docstring_remit=True)
+        differ = ast_parse(
+            src.replace('"value{}"'.format(size - 1), '"changed"'),
+            skip_docstring_remit=True,
+        )
+        pickled, pickled_equal = pickle.dumps(node), pickle.dumps(equal)
+        # Fingerprinted copies, for the cached comparison; the originals are left without fingerprints
+        cached, cached_equal = pickle.loads(pickled), pickle.loads(pickled_equal)
+        assert ast_fingerprint(cached) == ast_fingerprint(cached_equal)
+        print(
+            "{size:>6d} props {copy:>10.6f}s copy"
+            " {meta:>10.6f}s meta cmp_ast {ours:>10.6f}s cmp_ast"
+            " {meta_differ:>10.6f}s meta cmp_ast (differ) {ours_differ:>10.6f}s cmp_ast (differ)"
+            " {cold:>10.6f}s ast_fingerprint (cold) {cached:>10.6f}s cmp_ast (cached)".format(
+                size=size,
+                copy=best_time(
+                    lambda: (pickle.loads(pickled), pickle.loads(pickled_equal))
+                ),
+                meta=best_time(lambda: meta_cmp_ast(node, equal)),
+                ours=best_time(lambda: cmp_ast(node, equal)),
+                meta_differ=best_time(lambda: meta_cmp_ast(node, differ)),
+                ours_differ=best_time(lambda: cmp_ast(node, differ)),
+                cold=best_time(lambda: fingerprints_equal(pickled, pickled_equal)),
+                cached=best_time(lambda: cmp_ast(cached, cached_equal)),
+            )
+        )
+
+
+def main():
+    """ Run every benchmark in this module """
+    bench_cmp_ast()
+
+
+if __name__ == "__main__":
+    main()
+
+__all__ = ["main"]
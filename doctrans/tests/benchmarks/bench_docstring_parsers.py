@@ -0,0 +1,126 @@
+"""
+Benchmarks for the docstring scanners, showing they scale linearly with the length of the docstring
+"""
+
+from doctrans.docstring_parsers import Style, _scan_phase, _scan_phase_rest
+from doctrans.docstring_utils import ARG_TOKENS, RETURN_TOKENS
+from doctrans.tests.benchmarks import best_time, print_scaling
+
+sizes = 1024, 16 * 1024, 256 * 1024, 1024 * 1024
+
+
+def rest_docstring(size):
+    """
+    Make a ReST docstring of (at least) the given size, with many `:param`s and one long description
+
+    :param size: Size in bytes
+    :type size: ```int```
+
+    :returns: ReST docstring
+    :rtype: ```str```
+    """
+    params, i = [], 0
+    while sum(map(len, params)) < size // 2:
+        params.append(
+            ":param a{i}: Some docs about a{i}. Defaults to {i}\n:type a{i}: ```int```\n\n".format(
+                i=i
+            )
+        )
+        i += 1
+    return "{doc}\n\n{params}:returns: Nothing\n:rtype: ```None```\n".format(
+        doc="A long description without any tokens. " * (size // 2 // 40),
+        params="".join(params),
+    )
+
+
+def numpydoc_docstring(size):
+    """
+    Make a numpydoc docstring of (at least) the given size, with many parameters and a return section
+
+    :param size: Size in bytes
+    :type size: ```int```
+
+    :returns: numpydoc docstring
+    :rtype: ```str```
+    """
+    params, i = [], 0
+    while sum(map(len, params)) < size:
+        params.append(
+            "a{i} : int\n    Some docs about a{i}.\n    Defaults to {i}\n".format(i=i)
+        )
+        i += 1
+    return "Doc\n\nParameters\n----------\n{params}\nReturns\n-------\nint\n    z\n".format(
+        params="".join(params)
+    )
+
+
+def google_docstring(size):
+    """
+    Make a Google docstring of (at least) the given size, with many arguments and a return section
+
+    :param size: Size in bytes
+    :type size: ```int```
+
+    :returns: Google docstring
+    :rtype: ```str```
+    """
+    params, i = [], 0
+    while sum(map(len, params)) < size:
+        params.append(
+            "  a{i} (int): Some docs about a{i}.\n    Defaults to {i}\n".format(i=i)
+        )
+        i += 1
+    return "Doc\n\nArgs:\n{params}\nReturns:\n  int: z\n".format(params="".join(params))
+
+
+def bench_scan_phase_numpydoc_and_google():
+    """
+    Benchmark `_scan_phase_numpydoc_and_google` from 1 KB to 1 MB docstrings
+    """
+    for style, make_docstring in (
+        (Style.numpydoc, numpydoc_docstring),
+        (Style.google, google_docstring),
+    ):
+        print_scaling(
+            "_scan_phase_numpydoc_and_google ({})".format(style.name),
+            [
+                (
+                    len(docstring),
+                    best_time(lambda: _scan_phase(docstring, style=style), repeat=3),
+                )
+                for docstring in map(make_docstring, sizes)
+            ],
+        )
+
+
+def bench_scan_phase_rest():
+    """
+    Benchmark `_scan_phase_rest` from 1 KB to 1 MB docstrings
+    """
+    print_scaling(
+        "_scan_phase_rest",
+        [
+            (
+                len(docstring),
+                best_time(
+                    lambda: _scan_phase_rest(
+                        docstring, ARG_TOKENS.rest, RETURN_TOKENS.rest
+                    ),
+                    repeat=3,
+                ),
+            )
+            for docstring in map(rest_docstring, sizes)
+        ],
+    )
+
+
+def main():
+    """ Run every benchmark in this module """
+    bench_scan_phase_rest()
+    bench_scan_phase_numpydoc_and_google()
+
+
+if __name__ == "__main__":
+    main()
+
+__all__ = ["main"]
@@ -0,0 +1,95 @@
+"""
+Benchmarks for formatting what doctrans emits for the `tests/mocks`: unparsing then formatting with black, versus
+laying it out directly with the built-in formatter
+"""
+
+from ast import ClassDef, FunctionDef, Module, fix_missing_locations
+from copy import deepcopy
+from functools import partial
+
+from doctrans import emit
+from doctrans.formatter import format_code
+from doctrans.source_transformer import to_code
+from doctrans.tests.benchmarks import best_time
+from doctrans.tests.mocks import argparse, classes, methods
+from doctrans.tests.mocks.ir import class_google_tf_tensorboard_ir, intermediate_repr
+
+
+def mock_modules():
+    """
+    Make a module of each mock class and function, and of what each emitter emits from the mock IRs
+
+    :returns: Name and module
+    :rtype: ```Iterator[Tuple[str, Module]]```
+    """
+    for mod in argparse, classes, methods:
+        for name in mod.__all__:
+            node = getattr(mod, name)
+            if isinstance(node, (ClassDef, FunctionDef)):
+                yield name, fix_missing_locations(
+                    Module(body=[deepcopy(node)], type_ignores=[])
+                )
+    for name, ir in (
+        ("intermediate_repr", intermediate_repr),
+        ("class_google_tf_tensorboard_ir", class_google_tf_tensorboard_ir),
+    ):
+        for emitter_name, emitter in (
+            ("class_", emit.class_),
+            ("argparse_function", emit.argparse_function),
+            (
+                "function",
+                partial(emit.function, function_name="f", function_type="self"),
+            ),
+        ):
+            yield "{}({})".format(emitter_name, name), fix_missing_locations(
+                Module(body=[emitter(deepcopy(ir))], type_ignores=[])
+            )
+
+
+def bench_formatter():
+    """
+    Benchmark formatting each mock, and all of them, with black and with the built-in formatter
+    """
+    print("Formatting the mocks (builtin falls back to black for those marked *)")
+    emit._format("")  # Import black outside the timings
+    modules = []
+    for name, module in mock_modules():
+        try:
+            black = best_time(lambda: emit._format(to_code(module)), repeat=3)
+        except AttributeError:  # The mock is missing fields that `to_code` needs
+            continue
+        modules.append(module)
+        print(
+            "{name:<60} {black:>10.6f}s black {builtin:>10.6f}s builtin{fallback}".format(
+                name=name,
+                black=black,
+                builtin=best_time(lambda: format_code(module), repeat=3),
+                fallback="" if format_code(module) is not None else " *",
+            )
+        )
+    print(
+        "{name:<60} {black:>10.6f}s black {builtin:>10.6f}s builtin".format(
+            name="all {:d}".format(len(modules)),
+            black=best_time(
+                lambda: [emit._format(to_code(module)) for module in modules], repeat=3
+            ),
+            builtin=best_time(
+                lambda: [
+                    format_code(module) or emit._format(to_code(module))
+                    for module in modules
+                ],
+                repeat=3,
+            ),
+        )
+    )
+
+
+def main():
+    """Run every benchmark in this module"""
+    bench_formatter()
+
+
+if __name__ == "__main__":
+    main()
+
+__all__ = ["main"]
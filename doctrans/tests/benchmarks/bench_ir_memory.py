@@ -0,0 +1,86 @@
+"""
+Benchmarks for the memory an index of many IRs holds: with each param a dict, versus a compact `Param`
+"""
+
+import tracemalloc
+from copy import deepcopy
+from gc import collect
+
+from doctrans.ir import compact
+from doctrans.tests.benchmarks import best_time
+from doctrans.tests.mocks.ir import class_google_tf_tensorboard_ir, intermediate_repr
+
+
+def synthetic_index(size):
+    """
+    Make an index of IRs, as of a large codebase; each with distinct params
+
+    :param size: Number of IRs
+    :type size: ```int```
+
+    :returns: The IRs, with each param a dict
+    :rtype: ```List[dict]```
+    """
+    irs = []
+    for i in range(size):
+        ir = deepcopy(class_google_tf_tensorboard_ir if i % 2 else intermediate_repr)
+        ir["name"] = "Symbol{:d}".format(i)
+        for param in ir["params"].values():
+            param["doc"] = "{} ({:d})".format(param.get("doc") or "", i)
+        irs.append(ir)
+    return irs
+
+
+def allocated(func):
+    """
+    :param func: Function to call, whose result is kept alive while measured
+    :type func: ```Callable[[], Any]```
+
+    :returns: Bytes allocated by the call still held once it returns
+    :rtype: ```int```
+    """
+    collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+    return size
+
+
+def bench_ir_memory(sizes=(1000, 10000)):
+    """
+    Benchmark the memory held by, and time to build, indices of IRs, with dict and with compact params
+
+    :param sizes: Numbers of IRs in each index
+    :type sizes: ```Tuple[int, ...]```
+    """
+    print("Memory held by an index of IRs")
+    for size in sizes:
+        as_dicts = allocated(lambda: synthetic_index(size))
+        compacted = allocated(lambda: list(map(compact, synthetic_index(size))))
+        print(
+            "{size:>8,d} IRs {dicts:>14,d} bytes dict {compact:>14,d} bytes compact {ratio:>6.2f}x".format(
+                size=size, dicts=as_dicts, compact=compacted, ratio=as_dicts / compacted
+            )
+        )
+    irs = synthetic_index(sizes[0])
+    print(
+        "compact {size:,d} IRs {time:>12.6f}s".format(
+            size=sizes[0],
+            time=best_time(lambda: list(map(compact, deepcopy(irs))), repeat=3),
+        )
+    )
+
+
+def main():
+    """Run every benchmark in this module"""
+    bench_ir_memory()
+
+
+if __name__ == "__main__":
+    main()
+
+__all__ = ["main"]
@@ -0,0 +1,107 @@
+"""
+Microbenchmarks for `location_within`, comparing its `str` fast path to the generic comparator path,
+through its callers: `extract_default` and the numpydoc and Google scan phase
+"""
+
+from operator import eq
+
+from doctrans.defaults_utils import extract_default
+from doctrans.docstring_parsers import Style, _scan_phase
+from doctrans.pure_utils import casefold_eq, location_within
+from doctrans.tests.benchmarks import best_time
+from doctrans.tests.benchmarks.bench_docstring_parsers import (
+    google_docstring,
+    numpydoc_docstring,
+)
+
+default_tokens = "defaults to ", "defaults to\n", "Default value is ", "Default:"
+
+doc_lines = (
+    "name of dataset. Defaults to mnist",
+    "Whether to apply AMSGrad variant of this algorithm from the paper. Defaults to False.",
+    "A long description of the learning rate, without any default, that goes on for a while. "
+    * 4,
+)
+
+
+def generic(cmp):
+    """
+    Wrap the comparator so `location_within` can't recognise it, forcing its generic path
+
+    :param cmp: Comparator
+    :type cmp: ```Callable[[str, str], bool]```
+
+    :returns: Equivalent comparator
+    :rtype: ```Callable[[str, str], bool]```
+    """
+    return lambda a, b: cmp(a, b)
+
+
+def bench_location_within():
+    """
+    Benchmark `location_within` on doc lines, as called by `extract_default`
+    """
+    print("location_within (casefold), per doc line")
+    for line in doc_lines:
+        fast = best_time(lambda: location_within(line, default_tokens, casefold_eq))
+        slow = best_time(
+            lambda: location_within(line, default_tokens, generic(casefold_eq))
+        )
+        print(
+            "{length:>6d} chars {fast:>12.9f}s fast {slow:>12.9f}s generic {ratio:>8.1f}x".format(
+                length=len(line), fast=fast, slow=slow, ratio=slow / fast
+            )
+        )
+
+
+def bench_extract_default():
+    """
+    Benchmark `extract_default` on doc lines
+    """
+    print("extract_default, per doc line")
+    for line in doc_lines:
+        print(
+            "{length:>6d} chars {time:>12.9f}s".format(
+                length=len(line),
+                time=best_time(lambda: extract_default(line, emit_default_doc=False)),
+            )
+        )
+
+
+def bench_scan_phase():
+    """
+    Benchmark `location_within` as called by the numpydoc and Google scan phase, then the scan phase itself
+    """
+    print(
+        "location_within (eq), section tokens in a ~16 KB docstring; then _scan_phase"
+    )
+    for style, make_docstring, tokens in (
+        (Style.numpydoc, numpydoc_docstring, ("Parameters\n----------",)),
+        (Style.google, google_docstring, ("Args:",)),
+    ):
+        docstring = "{}\n{}".format("A long description. " * 800, make_docstring(16384))
+        fast = best_time(lambda: location_within(docstring, tokens))
+        slow = best_time(lambda: location_within(docstring, tokens, generic(eq)))
+        print(
+            "{style:>9s} {fast:>12.9f}s fast {slow:>12.9f}s generic {ratio:>8.1f}x;"
+            " _scan_phase {scan:>12.9f}s".format(
+                style=style.name,
+                fast=fast,
+                slow=slow,
+                ratio=slow / fast,
+                scan=best_time(lambda: _scan_phase(docstring, style=style)),
+            )
+        )
+
+
+def main():
+    """ Run every benchmark in this module """
+    bench_location_within()
+    bench_extract_default()
+    bench_scan_phase()
+
+
+if __name__ == "__main__":
+    main()
+
+__all__ = ["main"]
@@ -0,0 +1,136 @@
+"""
+Benchmarks for syncing many properties into one module: one `RewriteAtQuery` traversal per property,
+versus one `RewriteAtQueries` for all of them; with and without the location index from `annotate_ancestry`
+"""
+
+import pickle
+from ast import AnnAssign, Load, Name, Store
+
+from doctrans.ast_utils import RewriteAtQueries, RewriteAtQuery, set_value
+from doctrans.source_transformer import ast_parse
+from doctrans.tests.benchmarks import best_time
+
+
+def config_module(size):
+    """
+    Make the source of a config class with many typed properties
+
+    :param size: Number of properties
+    :type size: ```int```
+
+    :returns: Python source
+    :rtype: ```str```
+    """
+    return "class Config(object):\n{}".format(
+        "".join(
+            '    prop{i}: str = "value{i}"\n    """ doc{i} """\n'.format(i=i)
+            for i in range(size)
+        )
+    )
+
+
+def replacements(size):
+    """
+    Make a replacement for every property of `config_module(size)`
+
+    :param size: Number of properties
+    :type size: ```int```
+
+    :returns: Search query and the node to replace it with
+    :rtype: ```List[Tuple[List[str], AnnAssign]]```
+    """
+    return [
+        (
+            ["Config", "prop{i}".format(i=i)],
+            AnnAssign(
+                annotation=Name("int", Load()),
+                simple=1,
+                target=Name("prop{i}".format(i=i), Store()),
+                value=set_value(i),
+                expr=None,
+                expr_target=None,
+                expr_annotation=None,
+            ),
+        )
+        for i in range(size)
+    ]
+
+
+def one_at_a_time(pickled, _replacements, indexed):
+    """
+    Sync each property with its own `RewriteAtQuery`
+
+    :param pickled: Pickled AST of the config module
+    :type pickled: ```bytes```
+
+    :param _replacements: Search query and the node to replace it with
+    :type _replacements: ```List[Tuple[List[str], AnnAssign]]```
+
+    :param indexed: Whether to keep the location index
+    :type indexed: ```bool```
+    """
+    node = pickle.loads(pickled)
+    if not indexed:
+        del node._location_index
+    for search, replacement_node in _replacements:
+        RewriteAtQuery(search, replacement_node).visit(node)
+
+
+def batched(pickled, _replacements, indexed):
+    """
+    Sync every property with one `RewriteAtQueries`
+
+    :param pickled: Pickled AST of the config module
+    :type pickled: ```bytes```
+
+    :param _replacements: Search query and the node to replace it with
+    :type _replacements: ```List[Tuple[List[str], AnnAssign]]```
+
+    :param indexed: Whether to keep the location index
+    :type indexed: ```bool```
+    """
+    node = pickle.loads(pickled)
+    if not indexed:
+        del node._location_index
+    RewriteAtQueries(_replacements).visit(node)
+
+
+def bench_rewrite(sizes=(25, 50, 100, 200)):
+    """
+    Benchmark syncing every property of a config class, including the time to copy the AST
+
+    :param sizes: Numbers of properties
+    :type sizes: ```Tuple[int, ...]```
+    """
+    print("Syncing every property (includes copying the AST)")
+    for size in sizes:
+        pickled = pickle.dumps(
+            ast_parse(config_module(size), skip_docstring_remit=True)
+        )
+        _replacements = replacements(size)
+        print(
+            "{size:>6d} props {copy:>10.6f}s copy"
+            " {single:>10.6f}s RewriteAtQuery {batch:>10.6f}s RewriteAtQueries"
+            " {single_idx:>10.6f}s RewriteAtQuery (indexed)"
+            " {batch_idx:>10.6f}s RewriteAtQueries (indexed)".format(
+                size=size,
+                copy=best_time(lambda: pickle.loads(pickled)),
+                single=best_time(lambda: one_at_a_time(pickled, _replacements, False)),
+                batch=best_time(lambda: batched(pickled, _replacements, False)),
+                single_idx=best_time(
+                    lambda: one_at_a_time(pickled, _replacements, True)
+                ),
+                batch_idx=best_time(lambda: batched(pickled, _replacements, True)),
+            )
+        )
+
+
+def main():
+    """ Run every benchmark in this module """
+    bench_rewrite()
+
+
+if __name__ == "__main__":
+    main()
+
+__all__ = ["main"]
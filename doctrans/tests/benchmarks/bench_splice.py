@@ -0,0 +1,69 @@
+"""
+Benchmarks for writing one conformed class back into ever larger modules: unparsing and formatting the whole
+module, versus splicing just the class into the source
+"""
+
+import ast
+
+from doctrans import emit
+from doctrans.source_transformer import to_code
+from doctrans.tests.benchmarks import best_time
+
+
+def module_with_class(size):
+    """
+    Make the source of a module with a small config class, followed by many unrelated functions
+
+    :param size: Number of unrelated functions
+    :type size: ```int```
+
+    :returns: Python source
+    :rtype: ```str```
+    """
+    return 'class Config(object):\n    """ Config """\n\n    a: int = 5\n{}'.format(
+        "".join(
+            "\n\ndef f{i}(a, b={i}):\n    return a * b + {i}\n".format(i=i)
+            for i in range(size)
+        )
+    )
+
+
+def bench_splice(sizes=(10, 100, 1000)):
+    """
+    Benchmark writing back a changed config class, as black-formatted source
+
+    :param sizes: Numbers of unrelated functions in the module
+    :type sizes: ```Tuple[int, ...]```
+    """
+    print("Writing back one changed class (formatted with black)")
+    replacement_node = ast.parse(
+        'class Config(object):\n    """ Config """\n\n    a: str = "5"\n'
+    ).body[0]
+    emit._format("")  # Import black outside the timings
+    for size in sizes:
+        source = module_with_class(size)
+        parsed_ast = ast.parse(source)
+        original_node = parsed_ast.body[0]
+        replaced_ast = ast.parse(source)
+        replaced_ast.body[0] = replacement_node
+        print(
+            "{size:>6d} functions {whole:>10.6f}s whole module {spliced:>10.6f}s splice".format(
+                size=size,
+                whole=best_time(lambda: emit._format(to_code(replaced_ast)), repeat=3),
+                spliced=best_time(
+                    lambda: emit.splice(source, ((original_node, replacement_node),)),
+                    repeat=3,
+                ),
+            )
+        )
+
+
+def main():
+    """ Run every benchmark in this module """
+    bench_splice()
+
+
+if __name__ == "__main__":
+    main()
+
+__all__ = ["main"]
@@ -34,9 +34,14 @@ from meta.asttools import cmp_ast
 
 from doctrans.ast_utils import (
     NoneStr,
+    RewriteAtQueries,
     RewriteAtQuery,
     _parse_default_from_ast,
     annotate_ancestry,
+    ast_fingerprint,
+)
+from doctrans.ast_utils import cmp_ast as doctrans_cmp_ast
+from doctrans.ast_utils import (
     emit_ann_assign,
     emit_arg,
     find_ast_type,
@@ -227,6 +232,33 @@ class TestAstUtils(TestCase):
         """ Tests that `find_in_ast` fails correctly in AST """
         self.assertIsNone(find_in_ast(["John Galt"], class_ast))
 
+    def test_find_in_ast_indexed(self) -> None:
+        """
+        Tests that, via the location index, `find_in_ast` finds what `RewriteAtQuery` replaces; including keyword-only
+        arguments and nested nodes, which the walk over an unindexed module doesn't
+        """
+        source = "def f(a, *, b=5):\n    pass\n\n\nif True:\n    c = 6\n"
+        for search, replacement_node in (
+            (["f", "b"], set_arg("b")),
+            (["c"], Expr(set_value(7))),
+        ):
+            parsed_ast = ast_parse(source)
+            found = find_in_ast(search, parsed_ast)
+            self.assertIsNotNone(found)
+            rewrite_at_query = RewriteAtQuery(
+                search=search, replacement_node=replacement_node
+            )
+            rewrite_at_query.visit(parsed_ast)
+            self.assertTrue(rewrite_at_query.replaced)
+            self.assertNotIn(found, ast.walk(parsed_ast))
+
+            unindexed_ast = ast_parse(source)
+            del unindexed_ast._location_index
+            self.assertIsNone(find_in_ast(search, unindexed_ast))
+        self.assertEqual(
+            get_value(find_in_ast(["f", "b"], ast_parse(source)).default), 5
+        )
+
     def test_find_in_ast_no_val(self) -> None:
         """Tests that `find_in_ast` correctly gives AST node from
         `def class C(object): def function_name(self,dataset_name: str,…)`"""
@@ -351,6 +383,164 @@ class TestAstUtils(TestCase):
             ),
         )
 
+    def test_location_index(self) -> None:
+        """
+        Tests that `annotate_ancestry` indexes locations, that `find_in_ast` uses the index,
+        and that `RewriteAtQuery` keeps it valid after replacing
+        """
+        parsed_ast = ast_parse(class_with_method_and_body_types_str)
+        search = "C.function_name.dataset_name".split(".")
+        found = parsed_ast._location_index[tuple(search)][0]
+        self.assertIsInstance(found, arg)
+        self.assertIs(find_in_ast(search, parsed_ast), found)
+        self.assertEqual(get_value(found.default), "~/tensorflow_datasets")
+
+        parsed_ast = ast_parse(class_str)
+        search = "ConfigClass.dataset_name".split(".")
+        replacement_node = AnnAssign(
+            annotation=Name("int", Load()),
+            simple=1,
+            target=Name("dataset_name", Store()),
+            value=set_value(15),
+            expr=None,
+            expr_target=None,
+            expr_annotation=None,
+        )
+        rewrite_at_query = RewriteAtQuery(
+            search=search, replacement_node=replacement_node
+        )
+        rewrite_at_query.visit(parsed_ast)
+        self.assertTrue(rewrite_at_query.replaced)
+        self.assertIs(find_in_ast(search, parsed_ast), replacement_node)
+        self.assertListEqual(replacement_node._location, search)
+        self.assertListEqual(
+            sorted(parsed_ast._location_index),
+            sorted(ast_parse(class_str)._location_index),
+        )
+
+    def test_rewrite_at_queries(self) -> None:
+        """
+        Tests that `RewriteAtQueries` replaces many nodes—function arguments and class properties—in one go,
+        with and without the location index, reporting what it couldn't find
+        """
+        for indexed in True, False:
+            parsed_ast = ast_parse(class_with_method_and_body_types_str)
+            if not indexed:
+                del parsed_ast._location_index
+            rewrite_at_queries = RewriteAtQueries(
+                (
+                    (
+                        "C.function_name.dataset_name".split("."),
+                        AnnAssign(
+                            annotation=Name("int", Load()),
+                            simple=1,
+                            target=Name("dataset_name", Store()),
+                            value=set_value(15),
+                            expr=None,
+                            expr_annotation=None,
+                            expr_target=None,
+                        ),
+                    ),
+                    (["C", "John Galt"], set_arg("John Galt")),
+                )
+            )
+            gen_ast = rewrite_at_queries.visit(parsed_ast)
+            self.assertDictEqual(
+                rewrite_at_queries.replaced,
+                {
+                    ("C", "function_name", "dataset_name"): True,
+                    ("C", "John Galt"): False,
+                },
+            )
+            run_ast_test(
+                self,
+                gen_ast,
+                ast.parse(
+                    class_with_method_and_body_types_str.replace(
+                        'dataset_name: str = "mnist"', "dataset_name: int = 15"
+                    )
+                ),
+            )
+
+    def test_ast_fingerprint(self) -> None:
+        """
+        Tests that `ast_fingerprint` ignores locations and annotations, and tells apart what `cmp_ast` does
+        """
+        parsed_ast = ast_parse(class_with_method_and_body_types_str)
+        self.assertEqual(
+            ast_fingerprint(parsed_ast),
+            ast_fingerprint(ast.parse(class_with_method_and_body_types_str)),
+        )
+        for changed_str in (
+            class_with_method_and_body_types_str.replace('"mnist"', '"mnist2"'),
+            class_with_method_and_body_types_str.replace(
+                'dataset_name: str = "mnist"', "dataset_name: int = 1"
+            ),
+        ):
+            changed_ast = ast.parse(changed_str)
+            self.assertFalse(cmp_ast(parsed_ast, changed_ast))
+            self.assertFalse(doctrans_cmp_ast(parsed_ast, changed_ast))
+            self.assertNotEqual(
+                ast_fingerprint(parsed_ast), ast_fingerprint(changed_ast)
+            )
+        self.assertNotEqual(
+            ast_fingerprint(ast.parse("a = 1")), ast_fingerprint(ast.parse("a = True"))
+        )
+        self.assertNotEqual(
+            ast_fingerprint(ast.parse("a = '1'")), ast_fingerprint(ast.parse("a = 1"))
+        )
+
+    def test_cmp_ast(self) -> None:
+        """
+        Tests that `cmp_ast` agrees with `meta.asttools.cmp_ast`, with and without cached fingerprints
+        """
+        for fingerprinted in False, True:
+            parsed_ast = ast_parse(class_with_method_and_body_types_str)
+            same_ast = ast.parse(class_with_method_and_body_types_str)
+            if fingerprinted:
+                ast_fingerprint(parsed_ast)
+                ast_fingerprint(same_ast)
+            self.assertTrue(cmp_ast(parsed_ast, same_ast))
+            self.assertTrue(doctrans_cmp_ast(parsed_ast, same_ast))
+            self.assertFalse(doctrans_cmp_ast(parsed_ast, parsed_ast.body))
+            self.assertFalse(
+                doctrans_cmp_ast(parsed_ast.body, parsed_ast.body + same_ast.body)
+            )
+
+    def test_ast_fingerprint_forgotten_on_rewrite(self) -> None:
+        """
+        Tests that `RewriteAtQuery` and `RewriteAtQueries` drop the cached fingerprints of what they change,
+        with and without the location index
+        """
+        replacement_str = class_with_method_and_body_types_str.replace(
+            'dataset_name: str = "mnist"', "dataset_name: int = 15"
+        )
+        for rewriter in RewriteAtQuery, RewriteAtQueries:
+            for indexed in True, False:
+                parsed_ast = ast_parse(class_with_method_and_body_types_str)
+                if not indexed:
+                    del parsed_ast._location_index
+                ast_fingerprint(parsed_ast)
+                search = "C.function_name.dataset_name".split(".")
+                replacement_node = AnnAssign(
+                    annotation=Name("int", Load()),
+                    simple=1,
+                    target=Name("dataset_name", Store()),
+                    value=set_value(15),
+                    expr=None,
+                    expr_annotation=None,
+                    expr_target=None,
+                )
+                (
+                    RewriteAtQuery(search, replacement_node)
+                    if rewriter is RewriteAtQuery
+                    else RewriteAtQueries(((search, replacement_node),))
+                ).visit(parsed_ast)
+                self.assertEqual(
+                    ast_fingerprint(parsed_ast),
+                    ast_fingerprint(ast.parse(replacement_str)),
+                )
+
     def test_get_function_type(self) -> None:
         """ Test get_function_type returns the right type """
         self.assertEqual(
@@ -0,0 +1,196 @@
+"""
+Tests for the on-disk cache
+"""
+from contextlib import contextmanager
+from os import chmod, listdir, makedirs, path, stat, utime
+from shutil import copytree
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+import doctrans.cache
+from doctrans import emit, source_transformer
+from doctrans.cache import (
+    DiskCache,
+    cache_key,
+    cache_secret,
+    caches_disabled,
+    get_cache,
+    set_cache_dir,
+)
+from doctrans.source_transformer import ast_parse, to_code
+from doctrans.tests.utils_for_tests import unittest_main
+
+
+@contextmanager
+def temporary_cache():
+    """
+    Cache in a temporary directory, with its secret there too, within the context
+
+    :returns: The temporary directory
+    :rtype: ```str```
+    """
+    cache_dir = doctrans.cache.CACHE_DIR
+    with TemporaryDirectory() as tempdir, patch(
+        "doctrans.cache.CACHE_KEY_FILE", path.join(tempdir, "key", "cache.key")
+    ):
+        try:
+            set_cache_dir(path.join(tempdir, "cache"))
+            yield tempdir
+        finally:
+            set_cache_dir(cache_dir)
+
+
+class TestCache(TestCase):
+    """
+    Tests for the on-disk cache
+    """
+
+    def test_get_set(self) -> None:
+        """
+        Tests that what is set can be gotten, and that missing keys give None
+        """
+        with TemporaryDirectory() as tempdir:
+            disk_cache = DiskCache(path.join(tempdir, "ns"))
+            self.assertIsNone(disk_cache.get(cache_key("a")))
+            disk_cache.set(cache_key("a"), b"value")
+            self.assertEqual(disk_cache.get(cache_key("a")), b"value")
+            self.assertEqual(disk_cache.size(), len(b"value"))
+
+    def test_evict(self) -> None:
+        """
+        Tests that the least recently used entries are evicted once `max_size` is exceeded
+        """
+        with TemporaryDirectory() as tempdir:
+            disk_cache = DiskCache(tempdir, max_size=25)
+            keys = tuple(map(cache_key, range(3)))
+            for mtime, key in enumerate(keys):
+                disk_cache.set(key, b"0123456789")
+                utime(path.join(tempdir, key), (mtime, mtime))
+            self.assertIsNone(disk_cache.get(keys[0]))
+            self.assertListEqual(sorted(listdir(tempdir)), sorted(keys[1:]))
+
+    def test_evict_overwritten(self) -> None:
+        """
+        Tests that overwriting an entry counts only its new size, so nothing is evicted early
+        """
+        with TemporaryDirectory() as tempdir:
+            disk_cache = DiskCache(tempdir, max_size=25)
+            keys = tuple(map(cache_key, range(2)))
+            for key in keys + keys[1:]:
+                disk_cache.set(key, b"0123456789ab")
+            self.assertListEqual(sorted(listdir(tempdir)), sorted(keys))
+
+    def test_signed(self) -> None:
+        """
+        Tests that entries not signed with the cache's secret—planted, or from another's cache—are treated as
+        missing
+        """
+        with TemporaryDirectory() as tempdir:
+            disk_cache = DiskCache(tempdir, secret=b"secret")
+            disk_cache.set(cache_key("a"), b"value")
+            self.assertEqual(disk_cache.get(cache_key("a")), b"value")
+            self.assertIsNone(DiskCache(tempdir, secret=b"another").get(cache_key("a")))
+
+            DiskCache(tempdir).set(cache_key("a"), b"planted")
+            self.assertIsNone(disk_cache.get(cache_key("a")))
+
+    def test_cache_secret(self) -> None:
+        """
+        Tests that the secret is generated readable only by its owner, then reused; and refused once others can read
+        it
+        """
+        with temporary_cache() as tempdir:
+            key_file = path.join(tempdir, "key", "cache.key")
+            secret = cache_secret()
+            self.assertEqual(len(secret), 32)
+            self.assertEqual(stat(key_file).st_mode & 0o777, 0o600)
+            self.assertEqual(cache_secret(), secret)
+
+            chmod(key_file, 0o644)
+            self.assertIsNone(cache_secret())
+            self.assertIsNone(get_cache("ast"))
+
+    def test_restored(self) -> None:
+        """
+        Tests that a cache directory restored elsewhere (e.g., on a fresh CI runner) is used if its secret is restored
+        with it, and ignored if not
+        """
+        with temporary_cache() as tempdir:
+            ast_parse("a: int = 5", filename="a.py")
+            restored_dir = path.join(tempdir, "restored")
+            makedirs(path.join(restored_dir, "key"), mode=0o700)
+            copytree(path.join(tempdir, "cache"), path.join(restored_dir, "cache"))
+            with open(path.join(restored_dir, "key", "cache.key"), "wb") as f:
+                f.write(cache_secret())
+            chmod(path.join(restored_dir, "key", "cache.key"), 0o600)
+
+            for key_file, reused in (
+                (path.join(restored_dir, "key", "cache.key"), True),
+                (path.join(restored_dir, "fresh", "cache.key"), False),
+            ):
+                set_cache_dir(path.join(restored_dir, "cache"))
+                with patch("doctrans.cache.CACHE_KEY_FILE", key_file), patch(
+                    "doctrans.source_transformer._ast_parse",
+                    side_effect=source_transformer._ast_parse,
+                ) as _ast_parse:
+                    ast_parse("a: int = 5", filename="b.py")
+                self.assertEqual(_ast_parse.called, not reused)
+
+    def test_get_cache(self) -> None:
+        """
+        Tests that caches are scoped by namespace & version, and can be disabled; as they are by default
+        """
+        self.assertIsNone(get_cache("ast"))
+        with temporary_cache():
+            self.assertIs(get_cache("ast"), get_cache("ast"))
+            self.assertTrue(
+                path.basename(get_cache("ast").directory).endswith(doctrans.__version__)
+            )
+            set_cache_dir(None)
+            self.assertIsNone(get_cache("ast"))
+
+    def test_ast_parse_cached(self) -> None:
+        """
+        Tests that `ast_parse` reuses the parsed & annotated AST from the on-disk cache
+        """
+        with temporary_cache():
+            parsed = ast_parse("a: int = 5", filename="a.py")
+            with patch(
+                "doctrans.source_transformer._ast_parse",
+                lambda *args: self.fail("Expected the cached AST"),
+            ):
+                cached = ast_parse("a: int = 5", filename="b.py")
+        self.assertEqual(to_code(cached), to_code(parsed))
+        self.assertListEqual(cached.body[0]._location, ["a"])
+
+    def test_to_formatted_code_cached(self) -> None:
+        """
+        Tests that `to_formatted_code` reuses the formatted source from the on-disk cache
+        """
+        with temporary_cache():
+            formatted = emit.to_formatted_code(ast_parse("a =  {'b':5}"))
+            with patch(
+                "doctrans.emit._format",
+                lambda src: self.fail("Expected the cached source"),
+            ):
+                cached = emit.to_formatted_code(ast_parse("a = {'b': 5}"))
+            emit.to_formatted_code(ast_parse("a = {'b': 5}"), skip_black=True)
+            # Unformatted source is cached separately
+            self.assertEqual(len(listdir(get_cache("emit").directory)), 2)
+        self.assertEqual(formatted, "a = {'b': 5}\n")
+        self.assertEqual(cached, formatted)
+
+    def test_caches_disabled(self) -> None:
+        """
+        Tests that `caches_disabled` disables the caches within, and only within, its block
+        """
+        with temporary_cache() as tempdir:
+            with caches_disabled(False):
+                self.assertIsNotNone(get_cache("emit"))
+            with caches_disabled():
+                self.assertIsNone(get_cache("emit"))
+            self.assertEqual(doctrans.cache.CACHE_DIR, path.join(tempdir, "cache"))
+
+
+unittest_main()
@@ -7,7 +7,8 @@ from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
 from doctrans import __version__
-from doctrans.__main__ import _build_parser
+from doctrans.__main__ import _build_parser, main
+from doctrans.cache import get_cache
 from doctrans.pure_utils import PY3_8
 from doctrans.tests.utils_for_tests import run_cli_test, unittest_main
 
@@ -34,6 +35,14 @@ class TestCli(TestCase):
             output_checker=lambda output: output[output.rfind(" ") + 1 :][:-1],
         )
 
+    def test_no_cache(self) -> None:
+        """ Tests that `--no-cache` disables the on-disk caches for the command """
+        with patch(
+            "doctrans.__main__.serve",
+            lambda **kwargs: self.assertIsNone(get_cache("ast")),
+        ):
+            main(["--no-cache", "serve", "--socket", "doctrans.sock"])
+
     def test_name_main(self) -> None:
         """ Test the `if __name__ == '__main___'` block """
 
@@ -1,12 +1,14 @@
 """ Tests for CLI sync subparser (__main__.py) """
 
 import os
+from io import StringIO
 from tempfile import TemporaryDirectory
 from unittest import TestCase
+from unittest.mock import patch
 
-from doctrans import __version__
+from doctrans import __version__, emit
 from doctrans.tests.mocks.argparse import argparse_func_str
-from doctrans.tests.mocks.classes import class_str
+from doctrans.tests.mocks.classes import class_ast_no_default_doc, class_str
 from doctrans.tests.mocks.methods import class_with_method_types_str
 from doctrans.tests.utils_for_tests import run_cli_test, unittest_main
 
@@ -175,7 +177,118 @@ class TestCliSync(TestCase):
             self,
             ["sync", "--wrong"],
             exit_code=2,
-            output="the following arguments are required: --truth\n",
+            output="one of the arguments --truth --manifest is required\n",
+        )
+
+    def test_manifest(self) -> None:
+        """ Tests CLI interface accepts a manifest instead of `--truth` """
+        with TemporaryDirectory() as tempdir:
+            manifest = os.path.join(os.path.realpath(tempdir), "doctrans.yaml")
+            with open(manifest, "wt") as f:
+                f.write("sync: []\n")
+            _, args = run_cli_test(
+                self,
+                ["sync", "--manifest", manifest],
+                exit_code=None,
+                output=None,
+                return_args=True,
+            )
+        self.assertEqual(args.manifest, manifest)
+        self.assertIsNone(args.truth)
+
+    def test_check(self) -> None:
+        """ Tests CLI interface exits non-zero, writing nothing, on drift """
+        with TemporaryDirectory() as tempdir:
+            class_filename = os.path.join(os.path.realpath(tempdir), "class_.py")
+            argparse_filename = os.path.join(os.path.realpath(tempdir), "argparse.py")
+            emit.file(class_ast_no_default_doc, class_filename, mode="wt")
+            with patch("sys.stdout", new_callable=StringIO) as stdout:
+                run_cli_test(
+                    self,
+                    [
+                        "sync",
+                        "--class",
+                        class_filename,
+                        "--class-name",
+                        "ConfigClass",
+                        "--argparse-function",
+                        argparse_filename,
+                        "--argparse-function-name",
+                        "set_cli_args",
+                        "--truth",
+                        "class",
+                        "--check",
+                    ],
+                    exit_code=1,
+                    output="1 file(s) would change\n",
+                    output_checker=lambda output: output,
+                )
+            self.assertEqual(
+                stdout.getvalue(), "drifted\t{}\n".format(argparse_filename)
+            )
+            self.assertFalse(os.path.isfile(argparse_filename))
+
+    def test_changed_only(self) -> None:
+        """ Tests CLI interface syncs only the groups with a changed file """
+        with TemporaryDirectory() as tempdir:
+            class_filename = os.path.join(os.path.realpath(tempdir), "class_.py")
+            argparse_filename = os.path.join(os.path.realpath(tempdir), "argparse.py")
+            emit.file(class_ast_no_default_doc, class_filename, mode="wt")
+            cli_argv = [
+                "sync",
+                "--class",
+                class_filename,
+                "--class-name",
+                "ConfigClass",
+                "--argparse-function",
+                argparse_filename,
+                "--argparse-function-name",
+                "set_cli_args",
+                "--truth",
+                "class",
+                "--check",
+                "--changed-only",
+            ]
+            with patch("sys.stdout", new_callable=StringIO) as stdout:
+                run_cli_test(
+                    self,
+                    cli_argv + [os.path.join(tempdir, "unrelated.py")],
+                    exit_code=None,
+                    output=None,
+                )
+            self.assertEqual(stdout.getvalue(), "")
+
+            with patch("sys.stdout", new_callable=StringIO) as stdout, patch(
+                "sys.stdin", StringIO("unrelated.py\n{}\n".format(class_filename))
+            ):
+                run_cli_test(
+                    self,
+                    cli_argv + ["-"],
+                    exit_code=1,
+                    output="1 file(s) would change\n",
+                    output_checker=lambda output: output,
+                )
+            self.assertEqual(
+                stdout.getvalue(), "drifted\t{}\n".format(argparse_filename)
+            )
+
+    def test_non_existent_manifest_fails(self) -> None:
+        """ Tests nonexistent manifest throws the right error """
+        run_cli_test(
+            self,
+            ["sync", "--manifest", "doctrans_not_here.toml"],
+            exit_code=2,
+            output="--manifest must be an existent file. Got: 'doctrans_not_here.toml'\n",
+        )
+
+    def test_manifest_with_targets_fails(self) -> None:
+        """ Tests that targets given alongside a manifest are rejected, rather than ignored """
+        run_cli_test(
+            self,
+            ["sync", "--manifest", "doctrans.toml", "--class", "class_.py"],
+            exit_code=2,
+            output="--manifest can't be combined with `--argparse-function`, `--class`,"
+            " or `--function` (nor their names); give them in the manifest\n",
         )
 
 
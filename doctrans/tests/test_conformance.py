@@ -1,23 +1,36 @@
 """
 Tests for reeducation
 """
+
 import os
 from argparse import Namespace
-from ast import FunctionDef
+from ast import ClassDef, FunctionDef
 from copy import deepcopy
 from functools import partial
 from io import StringIO
+from multiprocessing import get_context
 from os import path
+from subprocess import check_call
 from tempfile import TemporaryDirectory
 from unittest import TestCase
 from unittest.mock import patch
 
-from doctrans import emit
+from doctrans import cache, emit
+from doctrans.ast_utils import RewriteAtQueries
 from doctrans.conformance import (
     _conform_filename,
     _get_name_from_namespace,
+    _init_worker,
+    _parse_truth,
+    affected_groups,
+    changed_paths,
     ground_truth,
+    ground_truths,
+    load_manifest,
+    memoize_truths,
 )
+from doctrans.lockfile import LOCK_FILENAME, load_lock
+from doctrans.source_transformer import to_code
 from doctrans.tests.mocks.argparse import argparse_func_ast
 from doctrans.tests.mocks.classes import class_ast_no_default_doc
 from doctrans.tests.mocks.ir import intermediate_repr
@@ -156,12 +169,461 @@ class TestConformance(TestCase):
                 (("argparse.py", False), ("classes.py", True), ("methods.py", False)),
             )
 
+    def test_ground_truth_changes_jobs(self) -> None:
+        """ Time for a new master, in parallel. """
+
+        ir = deepcopy(intermediate_repr)
+        ir["returns"]["return_type"]["typ"] = "Tuple[np.ndarray, np.ndarray]"
+
+        with TemporaryDirectory() as tempdir:
+            self.assertTupleEqual(
+                tuple(
+                    map(
+                        lambda filename_unmodified: (
+                            os.path.basename(filename_unmodified[0]),
+                            filename_unmodified[1],
+                        ),
+                        self.ground_truth_tester(
+                            tempdir=tempdir,
+                            _class_ast=emit.class_(ir, emit_default_doc=False),
+                            jobs=3,
+                        )[0].items(),
+                    )
+                ),
+                (("argparse.py", False), ("classes.py", True), ("methods.py", False)),
+            )
+
+    def test_ground_truth_jobs_spawned(self) -> None:
+        """ In parallel, with workers that inherit nothing; as they do on macOS and Windows. """
+
+        ir = deepcopy(intermediate_repr)
+        ir["returns"]["return_type"]["typ"] = "Tuple[np.ndarray, np.ndarray]"
+
+        # The emissions cached; each keyed by the formatter that formatted it
+        cached = {}
+        for formatter, jobs in ("black", 1), ("builtin", 1), ("builtin", 2):
+            with TemporaryDirectory() as tempdir, emit.using_formatter(
+                formatter
+            ), patch.dict(
+                "os.environ",
+                {"DOCTRANS_CACHE_KEY_FILE": path.join(tempdir, "cache.key")},
+            ), patch(
+                "doctrans.cache.CACHE_KEY_FILE", path.join(tempdir, "cache.key")
+            ), patch(
+                "doctrans.conformance.Pool", get_context("spawn").Pool
+            ):
+                cache_dir = path.join(tempdir, "cache")
+                cache.set_cache_dir(cache_dir)
+                try:
+                    self.ground_truth_tester(
+                        tempdir=tempdir,
+                        _class_ast=emit.class_(ir, emit_default_doc=False),
+                        jobs=jobs,
+                    )
+                finally:
+                    cache.set_cache_dir(None)
+                cached[formatter, jobs] = sorted(
+                    path.relpath(path.join(root, filename), cache_dir)
+                    for root, _, filenames in os.walk(cache_dir)
+                    for filename in filenames
+                )
+        self.assertNotEqual(cached["builtin", 1], cached["black", 1])
+        self.assertListEqual(cached["builtin", 2], cached["builtin", 1])
+
+    def test_init_worker(self) -> None:
+        """ A worker formats, and caches, as its parent does. """
+
+        with emit.using_formatter("black"), cache.caches_disabled():
+            try:
+                _init_worker(intermediate_repr, "builtin", "cache_dir")
+                self.assertEqual(emit.FORMATTER, "builtin")
+                self.assertEqual(cache.CACHE_DIR, "cache_dir")
+            finally:
+                cache.set_cache_dir(None)
+
+    def test_ground_truth_changes_spliced(self) -> None:
+        """ Only the new master is rewritten; the old guard stays. """
+
+        ir = deepcopy(intermediate_repr)
+        ir["returns"]["return_type"]["typ"] = "Tuple[np.ndarray, np.ndarray]"
+
+        with TemporaryDirectory() as tempdir:
+            effect, args = self.ground_truth_tester(
+                tempdir=tempdir,
+                _class_ast=emit.class_(ir, emit_default_doc=False),
+            )
+            self.assertTrue(effect[path.realpath(args.classes[0])])
+
+            with open(args.classes[0], "rt") as f:
+                source = f.read()
+            with open(args.classes[0], "wt") as f:
+                f.write("# Written by hand\n\n\n{}".format(source))
+
+            with patch("sys.stdout", new_callable=StringIO):
+                ground_truth(
+                    Namespace(**dict(vars(args), truth="class")), args.classes[0]
+                )
+            with open(args.classes[0], "rt") as f:
+                self.assertEqual(f.read(), "# Written by hand\n\n\n{}".format(source))
+
+            ir = deepcopy(intermediate_repr)
+            ir["returns"]["return_type"]["typ"] = "Tuple[int, int]"
+            with open(args.argparse_functions[0], "rt") as f:
+                argparse_source = f.read()
+            with open(args.classes[0], "at") as f:
+                f.write("\n\n# Also by hand\n")
+            with patch("sys.stdout", new_callable=StringIO):
+                _conform_filename(
+                    filename=args.classes[0],
+                    search=["ConfigClass"],
+                    emit_func=emit.class_,
+                    replacement_node_ir=ir,
+                    type_wanted=ClassDef,
+                )
+            with open(args.classes[0], "rt") as f:
+                conformed = f.read()
+            self.assertTrue(conformed.startswith("# Written by hand\n"))
+            self.assertTrue(conformed.endswith("\n\n# Also by hand\n"))
+            self.assertIn("Tuple[int, int]", conformed)
+            with open(args.argparse_functions[0], "rt") as f:
+                self.assertEqual(f.read(), argparse_source)
+
+    def test_ground_truth_check(self) -> None:
+        """ Check, don't touch. """
+
+        ir = deepcopy(intermediate_repr)
+        ir["returns"]["return_type"]["typ"] = "Tuple[np.ndarray, np.ndarray]"
+
+        for jobs in 1, 3:
+            with TemporaryDirectory() as tempdir:
+                effect, args = self.ground_truth_tester(
+                    tempdir=tempdir,
+                    _class_ast=emit.class_(ir, emit_default_doc=False),
+                    jobs=jobs,
+                    check=True,
+                )
+                self.assertTupleEqual(
+                    tuple(
+                        (os.path.basename(filename), drifted)
+                        for filename, drifted in effect.items()
+                    ),
+                    (
+                        ("argparse.py", False),
+                        ("classes.py", True),
+                        ("methods.py", False),
+                    ),
+                )
+                with open(args.classes[0], "rt") as f:
+                    self.assertIn("Tuple[np.ndarray, np.ndarray]", f.read())
+
+    def test_ground_truth_lock(self) -> None:
+        """ Conformed once, skipped after; until a target changes. """
+
+        ir = deepcopy(intermediate_repr)
+        ir["returns"]["return_type"]["typ"] = "Tuple[np.ndarray, np.ndarray]"
+
+        with TemporaryDirectory() as tempdir:
+            _, args = self.ground_truth_tester(tempdir=tempdir)
+            args = Namespace(**dict(vars(args), lock=True))
+            lock_filename = path.join(path.realpath(tempdir), LOCK_FILENAME)
+
+            with patch("sys.stdout", new_callable=StringIO):
+                effect = ground_truth(args, args.argparse_functions[0])
+            self.assertFalse(any(effect.values()))
+            self.assertTrue(path.isfile(lock_filename))
+
+            conformed = []
+            with patch(
+                "doctrans.conformance._conform_filename",
+                lambda filename, **kwargs: conformed.append(filename)
+                or (filename, False),
+            ):
+                effect = ground_truth(args, args.argparse_functions[0])
+                self.assertListEqual(conformed, [])
+                self.assertFalse(any(effect.values()))
+
+                emit.file(
+                    emit.class_(ir, emit_default_doc=False),
+                    args.classes[0],
+                    mode="wt",
+                )
+                effect = ground_truth(args, args.argparse_functions[0])
+                self.assertListEqual(conformed, [path.realpath(args.classes[0])])
+                self.assertListEqual(
+                    list(map(path.basename, effect)),
+                    ["argparse.py", "classes.py", "methods.py"],
+                )
+
+    def test_memoize_truths(self) -> None:
+        """ A truth unchanged is parsed once. """
+
+        with TemporaryDirectory() as tempdir:
+            _, args = self.ground_truth_tester(tempdir=tempdir)
+            parsed = []
+            memoize_truths()
+            try:
+                with patch("sys.stdout", new_callable=StringIO), patch(
+                    "doctrans.conformance._parse_truth",
+                    lambda *a: parsed.append(a) or _parse_truth(*a),
+                ):
+                    for _ in range(2):
+                        ground_truth(args, args.argparse_functions[0])
+                        ground_truths([args])
+            finally:
+                memoize_truths(0)
+            self.assertEqual(len(parsed), 1)
+
+    def test_load_manifest_toml(self) -> None:
+        """ Tests that a TOML manifest reads as its YAML equivalent """
+        with TemporaryDirectory() as tempdir:
+            tempdir_join = partial(path.join, tempdir)
+            with open(tempdir_join("doctrans.toml"), "wt") as f:
+                f.write(
+                    "[[sync]]\n"
+                    'truth = "argparse_function"\n'
+                    'argparse_function = "argparse.py"\n'
+                    'argparse_function_name = "set_cli_args"\n'
+                    'class = "classes.py"\n'
+                    'class_name = "ConfigClass"\n'
+                    "\n"
+                    "[[sync]]\n"
+                    'truth = "function"\n'
+                    'function = ["methods.py", "more_methods.py"]\n'
+                    'function_name = "C.function_name"\n'
+                )
+            with open(tempdir_join("doctrans.yaml"), "wt") as f:
+                f.write(
+                    "sync:\n"
+                    "  - truth: argparse_function\n"
+                    "    argparse_function: argparse.py\n"
+                    "    argparse_function_name: set_cli_args\n"
+                    "    class: classes.py\n"
+                    "    class_name: ConfigClass\n"
+                    "  - truth: function\n"
+                    "    function: [methods.py, more_methods.py]\n"
+                    "    function_name: C.function_name\n"
+                )
+
+            groups = load_manifest(tempdir_join("doctrans.toml"))
+            self.assertListEqual(groups, load_manifest(tempdir_join("doctrans.yaml")))
+            self.assertListEqual(
+                groups[1].functions,
+                [
+                    path.join(path.realpath(tempdir), "methods.py"),
+                    path.join(path.realpath(tempdir), "more_methods.py"),
+                ],
+            )
+            self.assertIsNone(groups[1].classes)
+
+    def test_ground_truths_manifest(self) -> None:
+        """ Many truths, one reading. """
+
+        ir = deepcopy(intermediate_repr)
+        ir["returns"]["return_type"]["typ"] = "Tuple[np.ndarray, np.ndarray]"
+
+        with TemporaryDirectory() as tempdir:
+            tempdir_join = partial(path.join, tempdir)
+            emit.file(argparse_func_ast, tempdir_join("argparse.py"), mode="wt")
+            emit.file(
+                emit.class_(ir, emit_default_doc=False),
+                tempdir_join("classes.py"),
+                mode="wt",
+            )
+            emit.file(
+                class_with_method_types_ast, tempdir_join("methods.py"), mode="wt"
+            )
+
+            manifest = tempdir_join("doctrans.yaml")
+            with open(manifest, "wt") as f:
+                f.write(
+                    "sync:\n"
+                    "  - truth: argparse_function\n"
+                    "    argparse_function: argparse.py\n"
+                    "    argparse_function_name: set_cli_args\n"
+                    "    class: classes.py\n"
+                    "    class_name: ConfigClass\n"
+                    "  - truth: argparse_function\n"
+                    "    argparse_function: argparse.py\n"
+                    "    argparse_function_name: set_cli_args\n"
+                    "    function: [methods.py, argparse_missing.py]\n"
+                    "    function_name: C.function_name\n"
+                )
+
+            groups = load_manifest(manifest)
+            self.assertEqual(len(groups), 2)
+            self.assertListEqual(
+                groups[0].argparse_functions,
+                [path.join(path.realpath(tempdir), "argparse.py")],
+            )
+            self.assertListEqual(groups[0].class_names, ["ConfigClass"])
+            self.assertIsNone(groups[0].functions)
+
+            with patch("sys.stdout", new_callable=StringIO), patch(
+                "sys.stderr", new_callable=StringIO
+            ):
+                self.assertTupleEqual(
+                    tuple(
+                        (os.path.basename(filename), drifted)
+                        for filename, drifted in ground_truths(
+                            groups, check=True
+                        ).items()
+                    ),
+                    (
+                        ("argparse.py", False),
+                        ("classes.py", True),
+                        ("methods.py", False),
+                        ("argparse_missing.py", True),
+                    ),
+                )
+                self.assertFalse(path.isfile(tempdir_join("argparse_missing.py")))
+                res = ground_truths(groups)
+
+            self.assertTupleEqual(
+                tuple(
+                    map(
+                        lambda filename_unmodified: (
+                            os.path.basename(filename_unmodified[0]),
+                            filename_unmodified[1],
+                        ),
+                        res.items(),
+                    )
+                ),
+                (
+                    ("argparse.py", False),
+                    ("classes.py", True),
+                    ("methods.py", False),
+                    ("argparse_missing.py", True),
+                ),
+            )
+            self.assertTrue(path.isfile(tempdir_join("argparse_missing.py")))
+
+            with patch("sys.stdout", new_callable=StringIO):
+                ground_truths(groups, lock=True)
+            with patch("sys.stdout", new_callable=StringIO) as out:
+                self.assertFalse(any(ground_truths(groups, lock=True).values()))
+            self.assertEqual(out.getvalue(), "")
+            lock = load_lock(path.join(path.realpath(tempdir), LOCK_FILENAME))
+            (record,) = lock["sync"].values()
+            self.assertListEqual(
+                sorted(record["targets"]),
+                ["argparse.py", "argparse_missing.py", "classes.py", "methods.py"],
+            )
+
+    def test_ground_truths_batched(self) -> None:
+        """ Many targets in one file, one pass. """
+
+        ir = deepcopy(intermediate_repr)
+        ir["returns"]["return_type"]["typ"] = "Tuple[np.ndarray, np.ndarray]"
+
+        with TemporaryDirectory() as tempdir:
+            tempdir_join = partial(path.join, tempdir)
+            emit.file(argparse_func_ast, tempdir_join("argparse.py"), mode="wt")
+            # Both the class and the method differ from the truth
+            emit.file(emit.class_(ir, emit_default_doc=False), tempdir_join("both.py"))
+            with open(tempdir_join("both.py"), "at") as f:
+                f.write(
+                    "\n\n{}".format(
+                        to_code(class_with_method_types_ast).replace(
+                            "'mnist'", "'cifar'"
+                        )
+                    )
+                )
+            groups = [
+                Namespace(
+                    argparse_functions=[tempdir_join("argparse.py")],
+                    argparse_function_names=["set_cli_args"],
+                    classes=[tempdir_join("both.py")],
+                    class_names=["ConfigClass"],
+                    functions=[tempdir_join("both.py")],
+                    function_names=["C.function_name"],
+                    truth="argparse_function",
+                )
+            ]
+
+            for check in True, False:
+                with patch("sys.stdout", new_callable=StringIO), patch(
+                    "doctrans.conformance.RewriteAtQueries",
+                    side_effect=RewriteAtQueries,
+                ) as rewrite_at_queries:
+                    effect = ground_truths(groups, check=check)
+                self.assertTrue(effect[path.realpath(tempdir_join("both.py"))])
+                # The truth is a target too, so is rewritten on its own
+                self.assertListEqual(
+                    [
+                        sorted(call_args[0][0])
+                        for call_args in rewrite_at_queries.call_args_list
+                        if ("ConfigClass",) in call_args[0][0]
+                        or ("C", "function_name") in call_args[0][0]
+                    ],
+                    [[("C", "function_name"), ("ConfigClass",)]],
+                )
+
+            with patch("sys.stdout", new_callable=StringIO):
+                self.assertFalse(any(ground_truths(groups, check=True).values()))
+
+    def test_changed_paths(self) -> None:
+        """ What changed: as told, from stdin, or as staged. """
+
+        with TemporaryDirectory() as tempdir:
+            tempdir = path.realpath(tempdir)
+            tempdir_join = partial(path.join, tempdir)
+            self.assertEqual(
+                changed_paths([tempdir_join("a.py")]),
+                frozenset((tempdir_join("a.py"),)),
+            )
+            with patch("sys.stdin", StringIO("{}\n\n".format(tempdir_join("b.py")))):
+                self.assertEqual(
+                    changed_paths([tempdir_join("a.py"), "-"]),
+                    frozenset((tempdir_join("a.py"), tempdir_join("b.py"))),
+                )
+
+            cwd = os.getcwd()
+            os.chdir(tempdir)
+            try:
+                check_call(("git", "init", "-q"))
+                for filename in "a.py", "b.py":
+                    with open(filename, "wt") as f:
+                        f.write("a = 5\n")
+                check_call(("git", "add", "a.py"))
+                os.mkdir("sub")
+                os.chdir("sub")
+                self.assertEqual(changed_paths(), frozenset((tempdir_join("a.py"),)))
+            finally:
+                os.chdir(cwd)
+
+    def test_affected_groups(self) -> None:
+        """ Only the groups touching what changed. """
+
+        with TemporaryDirectory() as tempdir:
+            _, args = self.ground_truth_tester(tempdir=tempdir)
+            other_args = Namespace(
+                **dict(
+                    vars(args), classes=None, functions=None, truth="argparse_function"
+                )
+            )
+            groups = [args, other_args]
+            self.assertListEqual(
+                affected_groups(groups, changed_paths([args.classes[0]])), [args]
+            )
+            self.assertListEqual(
+                affected_groups(groups, changed_paths([args.argparse_functions[0]])),
+                groups,
+            )
+            self.assertListEqual(
+                affected_groups(
+                    groups, changed_paths([path.join(tempdir, "README.md")])
+                ),
+                [],
+            )
+
     @staticmethod
     def ground_truth_tester(
         tempdir,
         _argparse_func_ast=argparse_func_ast,
         _class_ast=class_ast_no_default_doc,
         _class_with_method_ast=class_with_method_types_ast,
+        jobs=1,
+        check=False,
     ):
         """
         Helper for ground_truth tests
@@ -178,6 +640,12 @@ class TestConformance(TestCase):
         :param _class_with_method_ast: AST node
         :type _class_with_method_ast: ```ClassDef```
 
+        :param jobs: Number of processes to conform files with
+        :type jobs: ```int```
+
+        :param check: Only report which files would change, writing nothing
+        :type check: ```bool```
+
         :returns: OrderedDict of filenames and whether they were changed, Args
         :rtype: ```Tuple[OrderedDict, Namespace]```
         """
@@ -199,6 +667,8 @@ class TestConformance(TestCase):
                 "functions": (function,),
                 "function_names": ("C.function_name",),
                 "truth": "argparse_function",
+                "jobs": jobs,
+                "check": check,
             }
         )
 
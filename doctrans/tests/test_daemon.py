@@ -0,0 +1,165 @@
+"""
+Tests for the `doctrans serve` daemon and its thin client
+"""
+import socket
+from os import chmod, mkdir, path
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+
+from doctrans import __version__
+from doctrans.daemon import (
+    check_socket,
+    default_socket,
+    make_server,
+    request,
+    run_in_process,
+)
+from doctrans.source_transformer import memoize_ast_parse
+from doctrans.tests.mocks.argparse import argparse_func_str
+from doctrans.tests.mocks.classes import class_str
+from doctrans.tests.utils_for_tests import unittest_main
+
+
+def sync_argv(tempdir):
+    """
+    Write a class and an argparse function to `tempdir`, returning CLI arguments to sync them
+
+    :param tempdir: Directory to write into
+    :type tempdir: ```str```
+
+    :returns: CLI arguments for `sync`
+    :rtype: ```List[str]```
+    """
+    class_filename = path.join(tempdir, "class_.py")
+    argparse_filename = path.join(tempdir, "argparse_.py")
+    with open(class_filename, "wt") as f:
+        f.write(class_str)
+    with open(argparse_filename, "wt") as f:
+        f.write(argparse_func_str)
+    return [
+        "sync",
+        "--class",
+        class_filename,
+        "--class-name",
+        "ConfigClass",
+        "--argparse-function",
+        argparse_filename,
+        "--argparse-function-name",
+        "set_cli_args",
+        "--truth",
+        "class",
+    ]
+
+
+class TestDaemon(TestCase):
+    """
+    Tests for the `doctrans serve` daemon and its thin client
+    """
+
+    def test_run_in_process(self) -> None:
+        """
+        Tests that `run_in_process` captures output and the exit code
+        """
+        exit_code, out, err = run_in_process(["--version"])
+        self.assertEqual(exit_code, 0)
+        self.assertTrue(out.rstrip().endswith(__version__))
+
+        exit_code, out, err = run_in_process(["gen", "--wrong"])
+        self.assertEqual(exit_code, 2)
+        self.assertIn("the following arguments are required", err)
+
+    def test_request_falls_back_in_process(self) -> None:
+        """
+        Tests that the client runs in-process when no daemon is listening
+        """
+        with TemporaryDirectory() as tempdir:
+            self.assertEqual(
+                request(
+                    ["--version"], socket_path=path.join(tempdir, "nonexistent.sock")
+                )[0],
+                0,
+            )
+
+    def test_default_socket(self) -> None:
+        """
+        Tests that the socket defaults to one in `$XDG_RUNTIME_DIR`, else in a directory of the temp dir
+        """
+        with patch.dict(
+            "os.environ", {"DOCTRANS_SOCKET": "", "XDG_RUNTIME_DIR": "/run/user/5"}
+        ):
+            self.assertEqual(
+                default_socket(), path.join("/run/user/5", "doctrans.sock")
+            )
+        with patch.dict("os.environ", {"DOCTRANS_SOCKET": "", "XDG_RUNTIME_DIR": ""}):
+            self.assertEqual(path.basename(default_socket()), "doctrans.sock")
+            self.assertNotIn(path.dirname(default_socket()), ("", "/tmp"))
+
+    @skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets are unavailable")
+    def test_refuses_unsafe_socket(self) -> None:
+        """
+        Tests that neither the daemon nor the client uses what isn't a socket of this user's, nor a socket in a
+        directory others can write to; leaving what's there as it is
+        """
+        with TemporaryDirectory() as tempdir:
+            socket_path = path.join(tempdir, "d.sock")
+            self.assertFalse(check_socket(socket_path))
+            with open(socket_path, "wt") as f:
+                f.write("not a socket")
+
+            self.assertRaises(PermissionError, make_server, socket_path)
+            exit_code, out, err = request(["--version"], socket_path=socket_path)
+            self.assertEqual(exit_code, 2)
+            self.assertEqual(out, "")
+            self.assertIn("isn't a socket of yours", err)
+            self.assertTrue(path.isfile(socket_path))
+
+            shared_dir = path.join(tempdir, "shared")
+            mkdir(shared_dir)
+            chmod(shared_dir, 0o777)
+            exit_code, _, err = request(
+                ["--version"], socket_path=path.join(shared_dir, "d.sock")
+            )
+            self.assertEqual(exit_code, 2)
+            self.assertIn("others can write to its directory", err)
+
+    @skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets are unavailable")
+    def test_serve(self) -> None:
+        """
+        Tests that the daemon gives the same result as running in-process, and only serves the allowed commands
+        """
+        with TemporaryDirectory() as tempdir:
+            socket_path = path.join(tempdir, "d.sock")
+            server = make_server(socket_path)
+            thread = Thread(target=server.serve_forever)
+            thread.start()
+            try:
+                in_process_dir = path.join(tempdir, "in_process")
+                daemon_dir = path.join(tempdir, "daemon")
+                for directory in in_process_dir, daemon_dir:
+                    mkdir(directory)
+
+                in_process = run_in_process(sync_argv(in_process_dir))
+                served = request(sync_argv(daemon_dir), socket_path=socket_path)
+                self.assertEqual(served[0], in_process[0])
+                self.assertEqual(
+                    served[1].replace(daemon_dir, in_process_dir), in_process[1]
+                )
+                for filename in "class_.py", "argparse_.py":
+                    with open(path.join(in_process_dir, filename), "rt") as f0, open(
+                        path.join(daemon_dir, filename), "rt"
+                    ) as f1:
+                        self.assertEqual(f0.read(), f1.read())
+
+                exit_code, _, err = request(["serve"], socket_path=socket_path)
+                self.assertEqual(exit_code, 2)
+                self.assertIn("expected one of", err)
+            finally:
+                server.shutdown()
+                server.server_close()
+                thread.join()
+                memoize_ast_parse(0)
+
+
+unittest_main()
@@ -17,9 +17,13 @@ class TestEmitterUtils(TestCase):
     def test_parse_out_param(self) -> None:
         """ Test that parse_out_param parses out the right dict """
         self.assertDictEqual(
-            parse_out_param(
-                next(filter(rpartial(isinstance, Expr), argparse_func_ast.body[::-1]))
-            )[1],
+            dict(
+                parse_out_param(
+                    next(
+                        filter(rpartial(isinstance, Expr), argparse_func_ast.body[::-1])
+                    )
+                )[1]
+            ),
             # Last element:
             intermediate_repr["params"]["data_loader_kwargs"],
         )
@@ -28,7 +32,7 @@ class TestEmitterUtils(TestCase):
         """ Test that parse_out_param sets default when required and unset """
 
         self.assertDictEqual(
-            parse_out_param(argparse_add_argument_ast)[1],
+            dict(parse_out_param(argparse_add_argument_ast)[1]),
             {"default": 0, "doc": None, "typ": "int"},
         )
 
@@ -205,6 +205,107 @@ class TestEmitters(TestCase):
                 if os.path.isfile(filename):
                     os.remove(filename)
 
+    def test_splice(self) -> None:
+        """
+        Tests that `splice` replaces only the source of the nodes given—at their indentation, along with their
+        decorators—leaving the rest of the source as it was
+        """
+        source = (
+            "import os  # keep\n"
+            "\n"
+            "\n"
+            "@dec\n"
+            "class A(object):\n"
+            "    x: int = 1\n"
+            "\n"
+            "\n"
+            "class B(object):\n"
+            "    def f(self):\n"
+            "        return   1  # trailing\n"
+            "\n"
+            "    y   =   2\n"
+        )
+        parsed_ast = ast.parse(source)
+        self.assertEqual(
+            emit.splice(
+                source,
+                (
+                    (
+                        parsed_ast.body[1],
+                        ast.parse("@dec\nclass A(object):\n    x: str = 's'").body[0],
+                    ),
+                    (
+                        parsed_ast.body[2].body[0],
+                        ast.parse("def f(self):\n    return 2").body[0],
+                    ),
+                ),
+            ),
+            source.replace("x: int = 1", "x: str = 's'").replace(
+                "return   1  # trailing", "return 2"
+            ),
+        )
+
+    def test_splice_trailing_comment(self) -> None:
+        """
+        Tests that `splice` keeps a trailing comment only on the statement it trailed, dropping it when that's gone
+        """
+        source = (
+            "class C(object):\n"
+            "    dataset_name: int = 5  # trailing\n"
+            "    x: int = 1  # noqa\n"
+        )
+        parsed_ast = ast.parse(source)
+        self.assertEqual(
+            emit.splice(
+                source,
+                (
+                    (parsed_ast.body[0].body[0], ast.parse("K: str = 'np'").body[0]),
+                    (parsed_ast.body[0].body[1], ast.parse("x: str = 's'").body[0]),
+                ),
+            ),
+            source.replace(
+                "dataset_name: int = 5  # trailing", "K: str = 'np'"
+            ).replace("x: int = 1", "x: str = 's'"),
+        )
+
+    def test_splice_line_separators(self) -> None:
+        """
+        Tests that `splice` counts lines as `ast` does; not splitting on form feeds or unicode line separators
+        """
+        source = (
+            "x = 1\n"
+            "\x0c\n"
+            "s = '\u2028'\n"
+            "class A:\n"
+            "    a: int = 5\n"
+            "\n"
+            "y = 2\n"
+        )
+        self.assertEqual(
+            emit.splice(
+                source,
+                (
+                    (
+                        ast.parse(source).body[2],
+                        ast.parse("class A:\n    a: str = 'z'").body[0],
+                    ),
+                ),
+                skip_black=True,
+            ),
+            source.replace("a: int = 5", "a: str = 'z'"),
+        )
+
+    def test_splice_fails(self) -> None:
+        """
+        Tests that `splice` gives up on nodes that share a line with other code
+        """
+        source = "x = 1; y = 2\n"
+        self.assertIsNone(
+            emit.splice(
+                source, ((ast.parse(source).body[0], ast.parse("x = 3").body[0]),)
+            )
+        )
+
     def test_to_function(self) -> None:
         """
         Tests whether `function` produces method from `class_with_method_types_ast` given `docstring_str`
@@ -0,0 +1,232 @@
+"""
+Tests for the built-in formatter
+"""
+
+from ast import ClassDef, FunctionDef, Module, fix_missing_locations, walk
+from copy import deepcopy
+from glob import iglob
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from doctrans import emit
+from doctrans.__main__ import main
+from doctrans.cache import caches_disabled
+from doctrans.formatter import format_code
+from doctrans.source_transformer import ast_parse, to_code
+from doctrans.tests.mocks import argparse, classes, methods
+from doctrans.tests.mocks.ir import class_google_tf_tensorboard_ir, intermediate_repr
+from doctrans.tests.utils_for_tests import unittest_main
+
+
+def _as_module(node):
+    """
+    Wrap the statement in a module, as `emit.file` does
+
+    :param node: AST statement
+    :type node: ```Union[ClassDef, FunctionDef]```
+
+    :returns: Module of just the statement
+    :rtype: ```Module```
+    """
+    return fix_missing_locations(Module(body=[deepcopy(node)], type_ignores=[]))
+
+
+class TestFormatter(TestCase):
+    """
+    Tests for the built-in formatter
+    """
+
+    def test_mocks_formatted_as_black(self) -> None:
+        """
+        Tests that the mock classes, functions, and argparse functions are laid out exactly as black lays them out
+        """
+        for name in (
+            "argparse_func_action_append_ast",
+            "argparse_func_ast",
+            "class_ast",
+            "class_google_tf_tensorboard_ast",
+            "class_squared_hinge_config_ast",
+            "class_with_method_and_body_types_ast",
+            "class_with_method_ast",
+            "class_with_method_types_ast",
+            "class_with_optional_arg_method_ast",
+            "function_adder_ast",
+            "function_default_complex_default_arg_ast",
+        ):
+            node = _as_module(
+                next(
+                    getattr(mod, name)
+                    for mod in (argparse, classes, methods)
+                    if hasattr(mod, name)
+                )
+            )
+            with self.subTest(name=name):
+                src = format_code(node)
+                self.assertIsNotNone(src)
+                self.assertEqual(src, emit._format(to_code(node)))
+
+        # Their descriptions span lines, in strings that black may lay out over lines
+        for name in "argparse_func_torch_nn_l1loss_ast", "argparse_func_with_body_ast":
+            with self.subTest(name=name):
+                self.assertIsNone(format_code(_as_module(getattr(argparse, name))))
+
+    def test_emitted_formatted_as_black(self) -> None:
+        """
+        Tests that what the emitters emit from the IR is laid out exactly as black lays it out; but for a description
+        spanning lines, which is left to black
+        """
+        for ir in intermediate_repr, class_google_tf_tensorboard_ir:
+            for node in (
+                emit.class_(deepcopy(ir)),
+                emit.argparse_function(deepcopy(ir)),
+                emit.function(deepcopy(ir), function_name="f", function_type="self"),
+            ):
+                node = _as_module(node)
+                src = format_code(node)
+                if (
+                    ir is class_google_tf_tensorboard_ir
+                    and node.body[0].name == "set_cli_args"
+                ):
+                    self.assertIsNone(src)
+                else:
+                    self.assertIsNotNone(src)
+                    self.assertEqual(src, emit._format(to_code(node)))
+
+    def test_package_formatted_as_black(self) -> None:
+        """
+        Tests that every class and function of doctrans—its own source, and that of its tests—is either laid out
+        exactly as black lays it out, or left to black
+        """
+        package_dir = path.dirname(path.dirname(path.abspath(__file__)))
+        for filename in iglob(path.join(package_dir, "**", "*.py"), recursive=True):
+            with open(filename, "rt") as f:
+                module = ast_parse(f.read(), skip_docstring_remit=True)
+            for node in walk(module):
+                if not isinstance(node, (ClassDef, FunctionDef)):
+                    continue
+                node = _as_module(node)
+                src = format_code(node)
+                if src is not None:
+                    with self.subTest(filename=filename, name=node.body[0].name):
+                        self.assertEqual(src, emit._format(to_code(node)))
+
+    def test_unrecognised(self) -> None:
+        """
+        Tests that what the formatter doesn't recognise gives None, and is formatted with black instead
+        """
+        for src in (
+            "a = f'{b}'\n",
+            "def f(a):\n    ...\n",
+            "a = b ** 2\n",
+            "from __future__ import annotations\n",
+            'class A(object):\n    """ tab\tbed """\n',
+            "a = 'line\\n'\n",
+            "a, b = c\n",
+            "def f():\n    return (1,)\n",
+            "class C(object):\n    bb1: int = '{}'\n".format("a" * 120),
+        ):
+            node = ast_parse(src, skip_docstring_remit=True)
+            with self.subTest(src=src):
+                self.assertIsNone(format_code(node))
+                with caches_disabled():
+                    self.assertEqual(
+                        emit.to_formatted_code(node, formatter="builtin"),
+                        emit._format(to_code(node)),
+                    )
+
+    def test_for_iterable(self) -> None:
+        """
+        Tests that a `for` loop's iterable is formatted as black formats it, whether or not it's an operation
+        """
+        for iterable in "a", "a[1:]", "f(a)", "a + b[1:]", "not a", "a if b else c":
+            src = "for k in {}:\n    pass\n".format(iterable)
+            node = ast_parse(src, skip_docstring_remit=True)
+            with self.subTest(src=src), caches_disabled():
+                self.assertEqual(
+                    emit.to_formatted_code(node, formatter="builtin"),
+                    emit._format(to_code(node)),
+                )
+
+    def test_long_lines(self) -> None:
+        """
+        Tests that calls and signatures too long for a line are split as black splits them
+        """
+        src = (
+            "def set_cli_args(argument_parser):\n"
+            "    argument_parser.add_argument('--{name}', type={typ}, help='{help}', required=True, default={value})\n"
+            "    return argument_parser\n"
+            "\n"
+            "\n"
+            "def f(self, {params}, *, c: int = 5, **kwargs) -> int:\n"
+            "    return c\n"
+        ).format(
+            name="n" * 30,
+            typ="t" * 30,
+            help="h" * 60,
+            value="v" * 30,
+            params=", ".join("a{}: str = 'b'".format(i) for i in range(10)),
+        )
+        node = ast_parse(src, skip_docstring_remit=True)
+        formatted = format_code(node)
+        self.assertIsNotNone(formatted)
+        self.assertEqual(formatted, emit._format(to_code(node)))
+
+        # Too long for a line, even wrapped in parentheses; so left to black
+        for line_length in 119, 40:
+            with self.subTest(line_length=line_length):
+                self.assertIsNone(
+                    format_code(
+                        ast_parse(
+                            "a = '{}'\n".format("a" * line_length),
+                            skip_docstring_remit=True,
+                        ),
+                        line_length=line_length,
+                    )
+                )
+
+    def test_file_formatter(self) -> None:
+        """
+        Tests that `emit.file` formats with the formatter it is given, defaulting to `emit.FORMATTER`
+        """
+        with TemporaryDirectory() as tempdir, caches_disabled(), patch(
+            "doctrans.emit._format", lambda src: "black\n"
+        ):
+            filename = path.join(tempdir, "config.py")
+            emit.file(classes.class_ast, filename, mode="wt", formatter="builtin")
+            with open(filename, "rt") as f:
+                self.assertEqual(f.read(), format_code(_as_module(classes.class_ast)))
+
+            emit.file(classes.class_ast, filename, mode="wt")
+            with open(filename, "rt") as f:
+                self.assertEqual(f.read(), "black\n")
+
+            with emit.using_formatter("builtin"):
+                self.assertEqual(emit.FORMATTER, "builtin")
+                emit.file(classes.class_ast, filename, mode="wt")
+            self.assertEqual(emit.FORMATTER, "black")
+            with open(filename, "rt") as f:
+                self.assertNotEqual(f.read(), "black\n")
+
+        with self.assertRaises(ValueError) as cm:
+            emit.to_formatted_code(classes.class_ast, formatter="yapf")
+        self.assertEqual(
+            str(cm.exception), "Expected formatter of 'black' or 'builtin' got 'yapf'"
+        )
+        with self.assertRaises(ValueError), emit.using_formatter("yapf"):
+            pass
+
+    def test_cli_formatter(self) -> None:
+        """
+        Tests that `--formatter` selects the formatter for the command
+        """
+        with patch(
+            "doctrans.__main__.serve",
+            lambda **kwargs: self.assertEqual(emit.FORMATTER, "builtin"),
+        ):
+            main(["--formatter", "builtin", "serve", "--socket", "doctrans.sock"])
+        self.assertEqual(emit.FORMATTER, "black")
+
+
+unittest_main()
@@ -208,6 +208,189 @@ class TestGen(TestCase):
             gold=self.expected_class_ast,
         )
 
+    def test_gen_check(self) -> None:
+        """ Tests `gen` with `check` writes nothing, and reports drift """
+
+        output_filename = os.path.join(self.tempdir, "test_gen_check_output.py")
+        kwargs = dict(
+            name_tpl="{name}Config",
+            input_mapping="gen_test_module.input_map",
+            type_="class",
+            output_filename=output_filename,
+            emit_call=True,
+            emit_default_doc=False,
+        )
+        with patch("sys.stdout", new_callable=StringIO), patch(
+            "sys.stderr", new_callable=StringIO
+        ):
+            self.assertTrue(gen(check=True, **kwargs))
+            self.assertFalse(os.path.isfile(output_filename))
+
+            self.assertIsNone(gen(**kwargs))
+            self.assertFalse(gen(check=True, **kwargs))
+
+            with open(output_filename, "a") as f:
+                f.write("\n")
+            self.assertTrue(gen(check=True, **kwargs))
+
+    def test_gen_module_layout(self) -> None:
+        """ Tests that `gen` puts the prepended docstring first, then the imports (`__future__` first) """
+
+        output_filename = os.path.join(self.tempdir, "test_gen_module_layout.py")
+        with patch("sys.stdout", new_callable=StringIO), patch(
+            "sys.stderr", new_callable=StringIO
+        ):
+            self.assertIsNone(
+                gen(
+                    name_tpl="{name}Config",
+                    input_mapping="gen_test_module.input_map",
+                    type_="class",
+                    prepend='"""Generated"""\nimport os\nfrom __future__ import print_function\n',
+                    output_filename=output_filename,
+                    emit_call=True,
+                    emit_default_doc=False,
+                )
+            )
+
+        with open(output_filename, "rt") as f:
+            gen_module_str = f.read()
+        gen_module_ast = ast.parse(gen_module_str)
+        self.assertEqual(ast.get_docstring(gen_module_ast), "Generated")
+        self.assertEqual(gen_module_ast.body[1].module, "__future__")
+        self.assertEqual(gen_module_ast.body[2].names[0].name, "os")
+        run_ast_test(self, gen_ast=gen_module_ast.body[3], gold=self.expected_class_ast)
+        self.assertEqual(
+            to_code(gen_module_ast.body[4]).rstrip("\n"), "__all__ = ['FooConfig']"
+        )
+        self.assertEqual(gen_module_str, to_code(gen_module_ast))
+
+    def test_gen_jobs(self) -> None:
+        """ Tests that `gen` with `jobs` gives the same output, and progress, as without """
+
+        with open(os.path.join(self.tempdir, "gen_jobs_module.py"), "wt") as f:
+            f.write(
+                "from gen_test_module.input import Foo\n"
+                "input_map = {'Foo': Foo, 'Bar': Foo, 'Baz': Foo}\n"
+            )
+        outputs = []
+        for jobs in 1, 3:
+            output_filename = os.path.join(
+                self.tempdir, "test_gen_jobs_output{}.py".format(jobs)
+            )
+            with patch("sys.stdout", new_callable=StringIO) as out, patch(
+                "sys.stderr", new_callable=StringIO
+            ):
+                self.assertIsNone(
+                    gen(
+                        name_tpl="{name}Config",
+                        input_mapping="gen_jobs_module.input_map",
+                        type_="class",
+                        output_filename=output_filename,
+                        emit_call=True,
+                        emit_default_doc=False,
+                        jobs=jobs,
+                    )
+                )
+            with open(output_filename, "rt") as f:
+                outputs.append((f.read(), out.getvalue()))
+        self.assertEqual(*outputs)
+        self.assertEqual(
+            outputs[0][1],
+            "Generating: 'Foo'\nGenerating: 'Bar'\nGenerating: 'Baz'\n",
+        )
+        self.assertIn("class BazConfig", outputs[0][0])
+
+    def test_gen_jobs_without_fork(self) -> None:
+        """ Tests that `gen` with `jobs`, where processes can't be forked, generates in this process """
+
+        with open(os.path.join(self.tempdir, "gen_nofork_module.py"), "wt") as f:
+            f.write(
+                "from gen_test_module.input import Foo\n"
+                "input_map = {'Foo': Foo, 'Bar': Foo}\n"
+            )
+        output_filename = os.path.join(self.tempdir, "test_gen_nofork_output.py")
+        with patch("doctrans.gen.get_all_start_methods", return_value=["spawn"]), patch(
+            "doctrans.gen.get_context", side_effect=AssertionError
+        ), patch("sys.stdout", new_callable=StringIO) as out, patch(
+            "sys.stderr", new_callable=StringIO
+        ):
+            self.assertIsNone(
+                gen(
+                    name_tpl="{name}Config",
+                    input_mapping="gen_nofork_module.input_map",
+                    type_="class",
+                    output_filename=output_filename,
+                    emit_call=True,
+                    emit_default_doc=False,
+                    jobs=2,
+                )
+            )
+        self.assertEqual(out.getvalue(), "Generating: 'Foo'\nGenerating: 'Bar'\n")
+        with open(output_filename, "rt") as f:
+            self.assertIn("class BarConfig", f.read())
+
+    def test_gen_incremental(self) -> None:
+        """
+        Tests that `gen` with `incremental` regenerates only the symbols whose source changed, keeping the
+        text of the rest
+        """
+        module_filename = os.path.join(self.tempdir, "gen_incremental_module.py")
+        output_filename = os.path.join(self.tempdir, "test_gen_incremental_output.py")
+        class_tpl = (
+            "class {name}(object):\n"
+            '    """\n'
+            "    The amazing {name}\n\n"
+            "    :cvar a: An a. Defaults to {default}\n"
+            '    """\n\n'
+            "    a = {default}\n\n\n"
+        )
+
+        def incremental_gen(foo_default):
+            """
+            Write the input module, then generate incrementally from it
+
+            :param foo_default: Default of `Foo.a`
+            :type foo_default: ```int```
+
+            :returns: The output, and what was reported as generated
+            :rtype: ```Tuple[str, str]```
+            """
+            with open(module_filename, "wt") as f:
+                f.write(
+                    "{}{}input_map = {{'Foo': Foo, 'Bar': Bar}}\n".format(
+                        class_tpl.format(name="Foo", default=foo_default),
+                        class_tpl.format(name="Bar", default=6),
+                    )
+                )
+            sys.modules.pop("gen_incremental_module", None)
+            with patch("sys.stdout", new_callable=StringIO) as out, patch(
+                "sys.stderr", new_callable=StringIO
+            ):
+                self.assertIsNone(
+                    gen(
+                        name_tpl="{name}Config",
+                        input_mapping="gen_incremental_module.input_map",
+                        type_="class",
+                        output_filename=output_filename,
+                        incremental=True,
+                    )
+                )
+            with open(output_filename, "rt") as f:
+                return f.read(), out.getvalue()
+
+        output, generated = incremental_gen(5)
+        self.assertEqual(generated, "Generating: 'Foo'\nGenerating: 'Bar'\n")
+        self.assertTrue(os.path.isfile(os.path.join(self.tempdir, ".doctrans.lock")))
+        self.assertTupleEqual(incremental_gen(5), (output, ""))
+
+        # Hand edits to what is kept are kept
+        with open(output_filename, "wt") as f:
+            f.write(output.replace("class BarConfig", "# Kept\nclass BarConfig"))
+        output, generated = incremental_gen(7)
+        self.assertEqual(generated, "Generating: 'Foo'\n")
+        self.assertIn("# Kept\nclass BarConfig", output)
+        self.assertIn("a: int = 7", output)
+
     def test_gen_with_imports_from_file(self) -> None:
         """ Tests `gen` with `imports_from_file` """
 
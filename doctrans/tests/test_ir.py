@@ -0,0 +1,100 @@
+"""
+Tests for the compact types of the intermediate_repr
+"""
+import json
+import pickle
+from collections import OrderedDict
+from copy import deepcopy
+from unittest import TestCase
+
+from doctrans import parse
+from doctrans.ir import Param, compact
+from doctrans.tests.mocks.argparse import argparse_func_ast
+from doctrans.tests.mocks.classes import class_ast
+from doctrans.tests.mocks.docstrings import docstring_str
+from doctrans.tests.mocks.ir import intermediate_repr
+from doctrans.tests.mocks.methods import class_with_method_types_ast
+from doctrans.tests.utils_for_tests import unittest_main
+
+
+class TestIr(TestCase):
+    """
+    Tests for the compact types of the intermediate_repr
+    """
+
+    def test_param(self) -> None:
+        """
+        Tests that a `Param` reads, updates, and compares as the dict it replaces, without a `__dict__`
+        """
+        param = Param({"doc": "A doc", "typ": "int"}, default=5)
+        self.assertEqual(param, {"typ": "int", "doc": "A doc", "default": 5})
+        self.assertEqual({"typ": "int", "doc": "A doc", "default": 5}, param)
+        self.assertListEqual(list(param), ["typ", "doc", "default"])
+        self.assertFalse(hasattr(param, "__dict__"))
+
+        del param["default"]
+        self.assertNotIn("default", param)
+        self.assertIsNone(param.get("default"))
+        self.assertRaises(KeyError, lambda: param["default"])
+        with self.assertRaises(KeyError):
+            del param["default"]
+
+        param["action"] = "append"
+        self.assertEqual(param["action"], "append")
+        self.assertDictEqual(
+            dict(param), {"typ": "int", "doc": "A doc", "action": "append"}
+        )
+        self.assertEqual(len(param), 3)
+        self.assertEqual(
+            repr(param), "Param({'typ': 'int', 'doc': 'A doc', 'action': 'append'})"
+        )
+
+        for copied in (
+            param.copy(),
+            deepcopy(param),
+            *(
+                pickle.loads(pickle.dumps(param, protocol))
+                for protocol in range(pickle.HIGHEST_PROTOCOL + 1)
+            ),
+        ):
+            self.assertIsInstance(copied, Param)
+            self.assertEqual(copied, param)
+        copied = param.copy()
+        copied["typ"] = "float"
+        self.assertEqual(param["typ"], "int")
+
+    def test_compact(self) -> None:
+        """
+        Tests that `compact` makes each param, and the return type, a `Param`; leaving the IR equal
+        """
+        ir = compact(deepcopy(intermediate_repr))
+        self.assertEqual(ir, intermediate_repr)
+        self.assertIsInstance(ir["params"], OrderedDict)
+        for param in ir["params"].values():
+            self.assertIsInstance(param, Param)
+        self.assertIsInstance(ir["returns"]["return_type"], Param)
+        self.assertEqual(
+            compact({"name": "f", "params": None}), {"name": "f", "params": None}
+        )
+
+    def test_parsers_compact(self) -> None:
+        """
+        Tests that the parsers give `Param`s; which `json` serialises given `default=dict`
+        """
+        for ir in (
+            parse.class_(class_ast),
+            parse.function(class_with_method_types_ast.body[1]),
+            parse.argparse_ast(argparse_func_ast),
+            parse.docstring(docstring_str),
+        ):
+            self.assertTrue(
+                all(type(param) is Param for param in ir["params"].values())
+            )
+            self.assertIs(type(ir["returns"]["return_type"]), Param)
+
+        params = parse.class_(class_ast)["params"]
+        self.assertEqual(json.loads(json.dumps(params, default=dict)), params)
+        self.assertRaises(TypeError, lambda: json.dumps(params))
+
+
+unittest_main()
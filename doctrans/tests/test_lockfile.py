@@ -0,0 +1,86 @@
+"""
+Tests for the lockfile
+"""
+from collections import OrderedDict
+from copy import deepcopy
+from os import path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+from doctrans.ir import Param
+from doctrans.lockfile import (
+    LOCK_FILENAME,
+    file_hash,
+    ir_hash,
+    load_lock,
+    lock_path,
+    save_lock,
+)
+from doctrans.tests.mocks.ir import intermediate_repr
+from doctrans.tests.utils_for_tests import unittest_main
+
+
+class TestLockfile(TestCase):
+    """
+    Tests for the lockfile
+    """
+
+    def test_save_load(self) -> None:
+        """
+        Tests that what is saved is loaded, and that missing, corrupt, and outdated lockfiles load as empty
+        """
+        with TemporaryDirectory() as tempdir:
+            lock_filename = lock_path(path.join(tempdir, "out.py"))
+            self.assertEqual(
+                lock_filename, path.join(path.realpath(tempdir), LOCK_FILENAME)
+            )
+            self.assertDictEqual(load_lock(lock_filename), {})
+
+            save_lock(lock_filename, {"gen": {"out.py": {"options": "abc"}}})
+            self.assertEqual(
+                load_lock(lock_filename)["gen"], {"out.py": {"options": "abc"}}
+            )
+
+            with open(lock_filename, "wt") as f:
+                f.write("{")
+            self.assertDictEqual(load_lock(lock_filename), {})
+
+            with open(lock_filename, "wt") as f:
+                f.write('{"version": -1, "gen": {}}')
+            self.assertDictEqual(load_lock(lock_filename), {})
+
+    def test_hashes(self) -> None:
+        """
+        Tests that equal IRs and files hash equally, and differing ones don't
+        """
+        ir = deepcopy(intermediate_repr)
+        self.assertEqual(ir_hash(ir), ir_hash(intermediate_repr))
+        ir["returns"]["return_type"]["typ"] = "Tuple[int, int]"
+        self.assertNotEqual(ir_hash(ir), ir_hash(intermediate_repr))
+
+        # Equal, though filled in a different order, and one of the params a `Param`
+        ir = dict(reversed(tuple(deepcopy(intermediate_repr).items())))
+        ir["params"] = OrderedDict(
+            (name, dict(reversed(tuple(param.items()))))
+            for name, param in ir["params"].items()
+        )
+        ir["params"]["dataset_name"] = Param(ir["params"]["dataset_name"])
+        self.assertEqual(ir, intermediate_repr)
+        self.assertEqual(ir_hash(ir), ir_hash(intermediate_repr))
+        # …whereas the order of the params is kept
+        ir["params"] = OrderedDict(reversed(tuple(ir["params"].items())))
+        self.assertNotEqual(ir_hash(ir), ir_hash(intermediate_repr))
+
+        with TemporaryDirectory() as tempdir:
+            filename = path.join(tempdir, "out.py")
+            self.assertIsNone(file_hash(filename))
+            with open(filename, "wt") as f:
+                f.write("a = 5\n")
+            _file_hash = file_hash(filename)
+            self.assertEqual(file_hash(filename), _file_hash)
+            with open(filename, "wt") as f:
+                f.write("a = 6\n")
+            self.assertNotEqual(file_hash(filename), _file_hash)
+
+
+unittest_main()
@@ -0,0 +1,49 @@
+"""
+Tests for the logging setup in doctrans/__init__.py
+"""
+from os import path
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import yaml
+
+import doctrans
+from doctrans import LOGGING_CONFIG, configure_logging, get_logger
+from doctrans.tests.utils_for_tests import unittest_main
+
+logging_yml = path.join(path.dirname(doctrans.__file__), "_data", "logging.yml")
+
+
+class TestLogging(TestCase):
+    """
+    Tests for the configure-once logging setup
+    """
+
+    def test_logging_config_matches_yaml(self) -> None:
+        """
+        Tests that the precompiled `LOGGING_CONFIG` is kept in sync with `_data/logging.yml`
+        """
+        with open(logging_yml, "rt") as f:
+            self.assertDictEqual(LOGGING_CONFIG, yaml.load(f, Loader=yaml.SafeLoader))
+
+    def test_get_logger_configures_once(self) -> None:
+        """
+        Tests that `get_logger` doesn't reapply the logging config once configured
+        """
+        dict_config_mock = MagicMock()
+        with patch("doctrans._dictConfig", dict_config_mock):
+            self.assertEqual(get_logger("doctrans.test").name, "doctrans.test")
+            get_logger("doctrans.test2")
+        dict_config_mock.assert_not_called()
+
+    def test_configure_logging_from_yaml(self) -> None:
+        """
+        Tests that an explicitly given YAML file overrides `LOGGING_CONFIG`
+        """
+        dict_config_mock = MagicMock()
+        with patch("doctrans._dictConfig", dict_config_mock):
+            configure_logging(logging_yml)
+        dict_config_mock.assert_called_once_with(LOGGING_CONFIG)
+
+
+unittest_main()
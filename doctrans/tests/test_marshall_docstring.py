@@ -11,7 +11,15 @@ import doctrans.emit
 import doctrans.emitter_utils
 from doctrans import parse
 from doctrans.ast_utils import set_value
-from doctrans.docstring_parsers import _set_name_and_type, parse_docstring
+from doctrans.docstring_parsers import (
+    Style,
+    _scan_phase,
+    _scan_phase_rest,
+    _set_name_and_type,
+    parse_docstring,
+    set_docstring_cache_size,
+)
+from doctrans.docstring_utils import ARG_TOKENS, RETURN_TOKENS
 from doctrans.emitter_utils import to_docstring
 from doctrans.tests.mocks.docstrings import (
     docstring_extra_colons_str,
@@ -292,5 +300,80 @@ class TestMarshallDocstring(TestCase):
             ),
         )
 
+    def test_scan_phase_rest(self) -> None:
+        """
+        Tests that `_scan_phase_rest` splits into (is_token, text) segments, one per token
+        """
+        self.assertListEqual(
+            _scan_phase_rest(
+                "Doc\n:ivar a: b\n:type a: int:returns:x",
+                ARG_TOKENS.rest,
+                RETURN_TOKENS.rest,
+            ),
+            [
+                (False, "Doc\n"),
+                (True, ":ivar a: b\n"),
+                (True, ":type a: int"),
+                (True, ":returns:x"),
+            ],
+        )
+        self.assertListEqual(
+            _scan_phase_rest("Doc", ARG_TOKENS.rest, RETURN_TOKENS.rest),
+            [(False, "Doc")],
+        )
+
+    def test_scan_phase_numpydoc_and_google(self) -> None:
+        """
+        Tests that the numpydoc and Google scanner split into sections of indented units
+        """
+        self.assertDictEqual(
+            _scan_phase(
+                "Doc\n\nArgs:\n  a (int): x\n    more\n  b: y\n\nReturns:\n  int: z\n    more\n",
+                style=Style.google,
+            ),
+            {
+                "doc": "Doc",
+                "Args:": [["  a (int): x", "    more"], ["  b: y"]],
+                "Returns:": ["  int: z", "    more"],
+            },
+        )
+        self.assertDictEqual(
+            _scan_phase(
+                "Doc\n\nParameters\n----------\na : int\n    x\n\nReturns\n-------\nint\n    z\n",
+                style=Style.numpydoc,
+            ),
+            {
+                "doc": "Doc",
+                "Parameters\n----------": [["a : int", "    x"], [""]],
+                "Returns\n-------": [["int", "    z"]],
+            },
+        )
+
+    def test_parse_docstring_memoized(self) -> None:
+        """
+        Tests that `parse_docstring` is memoized on all its options, and mutating its result doesn't corrupt the memo
+        """
+        set_docstring_cache_size()
+        try:
+            ir = parse_docstring(docstring_str)
+            ir["params"].clear()
+            self.assertDictEqual(
+                parse_docstring(docstring_str), intermediate_repr_no_default_doc
+            )
+            self.assertEqual(parse_docstring.cache_info().hits, 1)
+
+            parse_docstring(docstring_str, emit_default_doc=True)
+            parse_docstring(docstring_str, default_search_announce=["Default:"])
+            parse_docstring(docstring_str, default_search_announce=["Default:"])
+            self.assertEqual(parse_docstring.cache_info().misses, 3)
+            self.assertEqual(parse_docstring.cache_info().hits, 2)
+
+            set_docstring_cache_size(1)
+            parse_docstring(docstring_str)
+            parse_docstring(docstring_google_str)
+            self.assertEqual(parse_docstring.cache_info().currsize, 1)
+        finally:
+            set_docstring_cache_size()
+
 
 unittest_main()
@@ -2,11 +2,14 @@
 import unittest
 from functools import partial
 from itertools import zip_longest
+from operator import eq
 from unittest import TestCase
 
 from doctrans.pure_utils import (
+    BUILTIN_TYPES,
     assert_equal,
     blockwise,
+    casefold_eq,
     deindent,
     diff,
     get_module,
@@ -58,6 +61,10 @@ class TestPureUtils(TestCase):
             },
         )
 
+    def test_builtin_types(self) -> None:
+        """ Tests that the builtin types, built lazily (where Python can), include those of `typing` """
+        self.assertTrue({"int", "Optional", "typing.Optional"}.issubset(BUILTIN_TYPES))
+
     def test_rpartial(self) -> None:
         """ Test that rpartial works as advertised """
         self.assertTrue(rpartial(isinstance, str)(""))
@@ -90,6 +97,28 @@ class TestPureUtils(TestCase):
         self.assertTupleEqual(
             location_within(map(str, range(10)), map(str, range(10, 20))), none_res
         )
+        self.assertTupleEqual(location_within(mock_str, ()), none_res)
+
+    def test_location_within_fast_path(self) -> None:
+        """
+        Tests the `str` fast path of `location_within` agrees with the generic comparator path
+        """
+        mock_str = "Foo. Default: 5. Defaults to 6"
+        for cmp in eq, casefold_eq:
+            for tokens in (
+                ("defaults to ", "Default:"),
+                ("Default:", "defaults to "),
+                ("DEFAULT:",),
+                ("nope", ""),
+            ):
+                self.assertTupleEqual(
+                    location_within(mock_str, tokens, cmp=cmp),
+                    location_within(mock_str, tokens, cmp=lambda a, b: cmp(a, b)),
+                )
+        self.assertTupleEqual(
+            location_within(mock_str, ("defaults to ", "Default:"), cmp=casefold_eq),
+            (17, 29, "defaults to "),
+        )
 
     def test_pluralises(self) -> None:
         """ Tests that pluralises pluralises """
@@ -6,6 +6,7 @@ from unittest import TestCase
 from unittest.mock import patch
 
 from doctrans.pure_utils import PY_GTE_3_9
+from doctrans.source_transformer import ast_parse, memoize_ast_parse, to_code
 from doctrans.tests.utils_for_tests import unittest_main
 
 
@@ -46,5 +47,24 @@ class TestSourceTransformer(TestCase):
                 "class Classy:",
             )
 
+    def test_memoize_ast_parse(self) -> None:
+        """
+        Tests that memoized `ast_parse` gives out independent copies, and evicts the least recently used
+        """
+        memoize_ast_parse(maxsize=1)
+        try:
+            first = ast_parse("a: int = 5", filename="a.py")
+            first.body[0].target.id = "b"
+            second = ast_parse("a: int = 5", filename="a.py")
+            self.assertEqual(to_code(second).rstrip("\n"), "a: int = 5")
+            self.assertListEqual(second.body[0]._location, ["a"])
+
+            ast_parse("c = 6")
+            import doctrans.source_transformer
+
+            self.assertEqual(len(doctrans.source_transformer._ast_memo), 1)
+        finally:
+            memoize_ast_parse(0)
+
 
 unittest_main()
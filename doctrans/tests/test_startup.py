@@ -0,0 +1,77 @@
+"""
+Tests for the import-time cost of the CLI entrypoint, using `python -X importtime`
+"""
+from os import environ, path
+from subprocess import run
+from sys import executable, version_info
+from unittest import TestCase, skipIf
+
+from doctrans.tests.utils_for_tests import unittest_main
+
+# Microseconds. Wall-clock time depends on the machine (and its load), so the default is a few times what it takes
+# on a typical one; enough to catch a heavy import, without failing on a slow CI runner. Set the
+# `DOCTRANS_IMPORT_BUDGET` env var to check a tighter one.
+import_budget = int(environ.get("DOCTRANS_IMPORT_BUDGET", 500000))
+
+
+def import_times(module_name, runs=5):
+    """
+    Import the module in a fresh interpreter, returning the cumulative import time of each module imported
+
+    :param module_name: Module to import
+    :type module_name: ```str```
+
+    :param runs: Number of fresh interpreters to import within; the fastest run is kept (first warms `__pycache__`)
+    :type runs: ```int```
+
+    :returns: Module name to cumulative import time (in microseconds), of the fastest run
+    :rtype: ```Dict[str, int]```
+    """
+    fastest = None
+    for _ in range(runs):
+        stderr = run(
+            [executable, "-X", "importtime", "-c", "import {}".format(module_name)],
+            cwd=path.dirname(path.dirname(path.dirname(__file__))),
+            capture_output=True,
+            universal_newlines=True,
+            check=True,
+        ).stderr
+        times = {
+            name.strip(): int(cumulative)
+            for _self, cumulative, name in (
+                line.partition(":")[2].split("|")
+                for line in stderr.splitlines()
+                if line.startswith("import time:") and "cumulative" not in line
+            )
+        }
+        if fastest is None or times[module_name] < fastest[module_name]:
+            fastest = times
+    return fastest
+
+
+@skipIf(version_info[:2] < (3, 7), "`-X importtime` was added in Python 3.7")
+class TestStartup(TestCase):
+    """
+    Tests that `doctrans.__main__` stays fast to import
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        """ Import `doctrans.__main__` in fresh interpreters and record the import times """
+        cls.times = import_times("doctrans.__main__", runs=3)
+
+    def test_heavy_dependencies_not_imported(self) -> None:
+        """
+        Tests that heavy dependencies are only imported on the code paths that need them
+        """
+        for module_name in "astor", "black", "meta", "toml", "tomllib", "yaml":
+            self.assertNotIn(module_name, self.times)
+
+    def test_import_budget(self) -> None:
+        """
+        Tests that the cumulative import time of `doctrans.__main__` is within budget
+        """
+        self.assertLessEqual(self.times["doctrans.__main__"], import_budget)
+
+
+unittest_main()
@@ -85,6 +85,32 @@ class TestSyncProperties(TestCase):
                 ast.parse(output_str.replace("h: Literal['b']", "f: Literal['a']")),
             )
 
+    def test_sync_properties_check(self) -> None:
+        """ Tests `sync_properties` with `check` writes nothing, and reports drift """
+
+        with TemporaryDirectory() as tempdir:
+            (
+                input_filename,
+                input_str,
+                output_filename,
+                output_str,
+            ) = populate_files(tempdir)
+            kwargs = dict(
+                input_filename=input_filename,
+                input_params=("Foo.g.f",),
+                input_eval=False,
+                output_filename=output_filename,
+                output_params=("f.h",),
+            )
+
+            self.assertTrue(sync_properties(check=True, **kwargs))
+            with open(output_filename, "rt") as f:
+                self.assertEqual(f.read(), output_str)
+
+            sync_properties(**kwargs)
+            kwargs["output_params"] = ("f.f",)
+            self.assertFalse(sync_properties(check=True, **kwargs))
+
     def test_sync_properties_eval(self) -> None:
         """ Tests `sync_properties` with `call=True` """
 
@@ -0,0 +1,259 @@
+"""
+Tests for watching files, to re-run `sync` and `gen`
+"""
+import os
+import sys
+from argparse import Namespace
+from io import StringIO
+from os import path
+from tempfile import TemporaryDirectory
+from time import sleep
+from unittest import TestCase
+from unittest.mock import patch
+
+from doctrans import conformance, emit, source_transformer
+from doctrans.conformance import ground_truths
+from doctrans.gen import gen
+from doctrans.tests.mocks.argparse import argparse_func_ast
+from doctrans.tests.mocks.classes import class_ast_no_default_doc
+from doctrans.tests.utils_for_tests import unittest_main
+from doctrans.watch import snapshot, watch, watch_gen, watch_sync
+from doctrans.writer import write
+
+# Fast enough for tests
+watch_kwargs = {"interval": 0.01, "debounce": 0.05, "iterations": 1}
+
+# Sleeps within a watch, after which a change that should have been seen is taken to have been missed
+max_sleeps = 500
+
+
+def write_during_first_call(func, filename, src):
+    """
+    Wrap the function to write to the file as its first call ends; as an editor would while the first run is
+    underway. So the change is there to be seen by the first poll, and watching ends.
+
+    :param func: Function the watcher runs
+    :type func: ```Callable```
+
+    :param filename: File to write to
+    :type filename: ```str```
+
+    :param src: What to write
+    :type src: ```str```
+
+    :returns: The wrapped function
+    :rtype: ```Callable```
+    """
+
+    def write():
+        """ Write the file """
+        with open(filename, "wt") as f:
+            f.write(src)
+
+    def wrapper(*args, **kwargs):
+        """
+        :param args: Passed to `func`
+        :type args: ```Any```
+
+        :param kwargs: Passed to `func`
+        :type kwargs: ```Any```
+
+        :returns: What `func` returns
+        :rtype: ```Any```
+        """
+        try:
+            return func(*args, **kwargs)
+        finally:
+            if not wrapper.called:
+                wrapper.called = True
+                write()
+
+    wrapper.called = False
+    return wrapper
+
+
+class TestWatch(TestCase):
+    """
+    Tests for watching files, to re-run `sync` and `gen`
+    """
+
+    def setUp(self) -> None:
+        """
+        Bound each watch, so one that misses a change fails rather than polling forever
+        """
+
+        def bounded_sleep(seconds):
+            """
+            :param seconds: Seconds to sleep
+            :type seconds: ```float```
+            """
+            bounded_sleep.calls += 1
+            if bounded_sleep.calls > max_sleeps:
+                raise AssertionError("change not seen")
+            sleep(seconds)
+
+        bounded_sleep.calls = 0
+        patcher = patch("doctrans.watch.sleep", bounded_sleep)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_snapshot(self) -> None:
+        """
+        Tests that the snapshot changes when a file is written, and marks missing files
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = path.join(tempdir, "a.py")
+            self.assertDictEqual(snapshot((filename,)), {filename: None})
+            with open(filename, "wt") as f:
+                f.write("a = 5\n")
+            before = snapshot((filename,))
+            with open(filename, "wt") as f:
+                f.write("a = 56\n")
+            self.assertNotEqual(snapshot((filename,)), before)
+
+    def test_watch(self) -> None:
+        """
+        Tests that `run` is called with every file, then with those changed once settled; and that its errors are
+        reported rather than raised
+        """
+        with TemporaryDirectory() as tempdir:
+            filenames = path.join(tempdir, "a.py"), path.join(tempdir, "b.py")
+            for filename in filenames:
+                with open(filename, "wt") as f:
+                    f.write("a = 5\n")
+
+            calls = []
+
+            def run(changed):
+                """
+                :param changed: Resolved files that changed
+                :type changed: ```FrozenSet[str]```
+                """
+                calls.append(changed)
+                if len(calls) == 1:
+                    raise ValueError("saved midway")
+
+            with patch("sys.stderr", new_callable=StringIO) as err:
+                watch(
+                    lambda: filenames,
+                    write_during_first_call(run, filenames[1], "a = 56\n"),
+                    **watch_kwargs
+                )
+            self.assertListEqual(
+                calls, [frozenset(filenames), frozenset(filenames[1:])]
+            )
+            self.assertEqual(err.getvalue(), "error\tValueError: saved midway\n")
+
+    def test_watch_own_writes(self) -> None:
+        """
+        Tests that what `run` writes itself isn't a change, but what's saved while it runs is
+        """
+        with TemporaryDirectory() as tempdir:
+            filenames = tuple(
+                path.realpath(path.join(tempdir, name)) for name in ("a.py", "b.py")
+            )
+            for filename in filenames:
+                with open(filename, "wt") as f:
+                    f.write("a = 5\n")
+
+            calls = []
+
+            def run(changed):
+                """
+                :param changed: Resolved files that changed
+                :type changed: ```FrozenSet[str]```
+                """
+                calls.append(changed)
+                write(filenames[0], "wt", str, "a = {:d}\n".format(len(calls) * 100))
+
+            watch(
+                lambda: filenames,
+                write_during_first_call(run, filenames[1], "a = 56\n"),
+                **watch_kwargs
+            )
+            self.assertListEqual(
+                calls, [frozenset(filenames), frozenset(filenames[1:])]
+            )
+
+    def test_watch_sync(self) -> None:
+        """
+        Tests that a target edited while watched is conformed back to the truth; with the ASTs and gold IRs held
+        in memory only while watching
+        """
+        with TemporaryDirectory() as tempdir:
+            argparse_filename = path.join(tempdir, "argparse.py")
+            class_filename = path.join(tempdir, "classes.py")
+            emit.file(argparse_func_ast, argparse_filename, mode="wt")
+            emit.file(class_ast_no_default_doc, class_filename, mode="wt")
+            with open(class_filename, "rt") as f:
+                class_src = f.read()
+            args = Namespace(
+                argparse_functions=[argparse_filename],
+                argparse_function_names=["set_cli_args"],
+                classes=[class_filename],
+                class_names=["ConfigClass"],
+                functions=None,
+                function_names=None,
+                truth="argparse_function",
+            )
+
+            self.assertIn("'mnist'", class_src)
+            with patch("sys.stdout", new_callable=StringIO), patch(
+                "doctrans.watch.ground_truths",
+                write_during_first_call(
+                    ground_truths,
+                    class_filename,
+                    class_src.replace("'mnist'", "'cifar10'"),
+                ),
+            ):
+                watch_sync([args], watch_kwargs=watch_kwargs)
+            with open(class_filename, "rt") as f:
+                self.assertEqual(f.read(), class_src)
+            self.assertIsNone(conformance._ir_memo)
+            self.assertIsNone(source_transformer._ast_memo)
+
+    def test_watch_gen(self) -> None:
+        """
+        Tests that `gen` regenerates from the input mapping's module, reloaded, when it changes
+        """
+        with TemporaryDirectory() as tempdir:
+            module_filename = path.join(tempdir, "gen_watch_module.py")
+            output_filename = path.join(tempdir, "gen_watch_output.py")
+            module_tpl = (
+                "class Foo(object):\n"
+                '    """\n'
+                "    The amazing Foo\n\n"
+                "    :cvar a: An a. Defaults to {default}\n"
+                '    """\n\n'
+                "    a = {default}\n\n\n"
+                "input_map = {{'Foo': Foo}}\n"
+            )
+            with open(module_filename, "wt") as f:
+                f.write(module_tpl.format(default=5))
+            sys.path.insert(0, tempdir)
+            try:
+                # Different sizes, so the change is seen whatever the resolution of modification times
+                with patch("sys.stdout", new_callable=StringIO), patch(
+                    "sys.stderr", new_callable=StringIO
+                ), patch(
+                    "doctrans.watch.gen",
+                    write_during_first_call(
+                        gen, module_filename, module_tpl.format(default=789)
+                    ),
+                ):
+                    watch_gen(
+                        watch_kwargs=watch_kwargs,
+                        name_tpl="{name}Config",
+                        input_mapping="gen_watch_module.input_map",
+                        type_="class",
+                        output_filename=output_filename,
+                    )
+            finally:
+                sys.path.remove(tempdir)
+                sys.modules.pop("gen_watch_module", None)
+            with open(output_filename, "rt") as f:
+                self.assertIn("a: int = 789", f.read())
+            self.assertTrue(os.path.isfile(path.join(tempdir, ".doctrans.lock")))
+
+
+unittest_main()
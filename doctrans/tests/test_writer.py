@@ -0,0 +1,128 @@
+"""
+Tests for writing emitted code to files
+"""
+import os
+from io import StringIO
+from multiprocessing import get_context
+from os import path, stat, umask
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+from unittest.mock import patch
+
+from doctrans import emit
+from doctrans.tests.mocks.classes import class_ast
+from doctrans.tests.test_cache import temporary_cache
+from doctrans.tests.utils_for_tests import unittest_main
+from doctrans.writer import BatchWriteError, batched_writes, batching, write
+
+
+class TestWriter(TestCase):
+    """
+    Tests for writing emitted code to files
+    """
+
+    def test_write(self) -> None:
+        """
+        Tests that writes overwrite or append, and that new files get the usual permissions
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = path.join(tempdir, "out.py")
+            write(filename, "a", str, "a = 5\n")
+            write(filename, "a", str, "b = 6\n")
+            with open(filename, "rt") as f:
+                self.assertEqual(f.read(), "a = 5\nb = 6\n")
+            write(filename, "wt", str, "c = 7\n")
+            with open(filename, "rt") as f:
+                self.assertEqual(f.read(), "c = 7\n")
+
+            mask = umask(0)
+            umask(mask)
+            self.assertEqual(stat(filename).st_mode & 0o777, 0o666 & ~mask)
+
+    def test_batched_writes(self) -> None:
+        """
+        Tests that writes within `batched_writes` happen at its end, rendered in parallel and applied in order
+        """
+        for jobs in 1, 2:
+            with TemporaryDirectory() as tempdir:
+                filename0 = path.join(tempdir, "out0.py")
+                filename1 = path.join(tempdir, "out1.py")
+                with open(filename0, "wt") as f:
+                    f.write("a = 5\n")
+
+                with batched_writes(jobs=jobs):
+                    self.assertTrue(batching())
+                    write(filename0, "a", str, "b = 6\n")
+                    write(filename1, "wt", str, "c = 7\n")
+                    write(filename1, "a", str, "d = 8\n")
+                    with batched_writes(jobs=jobs):
+                        write(filename0, "a", str, "e = 9\n")
+                    self.assertFalse(path.isfile(filename1))
+                self.assertFalse(batching())
+
+                with open(filename0, "rt") as f:
+                    self.assertEqual(f.read(), "a = 5\nb = 6\ne = 9\n")
+                with open(filename1, "rt") as f:
+                    self.assertEqual(f.read(), "c = 7\nd = 8\n")
+
+    def test_batched_writes_errors(self) -> None:
+        """
+        Tests that a file whose output fails to render is reported and left as it was, while the rest are written
+        """
+        with TemporaryDirectory() as tempdir:
+            filename0 = path.join(tempdir, "out0.py")
+            filename1 = path.join(tempdir, "out1.py")
+            with open(filename0, "wt") as f:
+                f.write("a = 5\n")
+
+            with patch("sys.stderr", new_callable=StringIO) as err, self.assertRaises(
+                BatchWriteError
+            ) as e:
+                with batched_writes(jobs=2):
+                    write(filename0, "wt", str, "b = 6\n")
+                    write(filename0, "a", int, "not an int")
+                    write(filename1, "wt", str, "c = 7\n")
+            self.assertListEqual(list(e.exception.errors), [filename0])
+            self.assertIn("ValueError", e.exception.errors[filename0])
+            self.assertTrue(err.getvalue().startswith("error\t{}\t".format(filename0)))
+
+            with open(filename0, "rt") as f:
+                self.assertEqual(f.read(), "a = 5\n")
+            with open(filename1, "rt") as f:
+                self.assertEqual(f.read(), "c = 7\n")
+
+    def test_batched_writes_exception(self) -> None:
+        """
+        Tests that nothing is written when `batched_writes` is left with an exception
+        """
+        with TemporaryDirectory() as tempdir:
+            filename = path.join(tempdir, "out.py")
+            with self.assertRaises(ZeroDivisionError):
+                with batched_writes():
+                    write(filename, "wt", str, "a = 5\n")
+                    1 / 0
+            self.assertFalse(path.isfile(filename))
+            self.assertFalse(batching())
+
+    def test_batched_writes_spawned(self) -> None:
+        """
+        Tests that `batched_writes`' workers cache as their parent does, when they inherit nothing; as on macOS and
+        Windows
+        """
+        with temporary_cache() as tempdir, patch.dict(
+            "os.environ",
+            {"DOCTRANS_CACHE_KEY_FILE": path.join(tempdir, "key", "cache.key")},
+        ), patch("doctrans.writer.Pool", get_context("spawn").Pool):
+            with batched_writes(jobs=2):
+                for name in "out0.py", "out1.py":
+                    emit.file(class_ast, path.join(tempdir, name), skip_black=False)
+            self.assertTrue(path.isfile(path.join(tempdir, "out1.py")))
+            self.assertTrue(
+                any(
+                    filenames
+                    for _, _, filenames in os.walk(path.join(tempdir, "cache"))
+                )
+            )
+
+
+unittest_main()
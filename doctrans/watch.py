@@ -0,0 +1,286 @@
+"""
+Watching files, to re-run `sync` and `gen` whenever they change, from one warm process.
+
+Files are polled for changes to their modification time or size—which works on every platform and however an editor
+saves—and a burst of saves is waited out (debounced) before re-running. The parsed ASTs and gold IRs of the files
+left untouched are kept in memory between runs.
+"""
+
+import sys
+from importlib import reload
+from inspect import getfile
+from os import path, stat
+from time import sleep
+from traceback import format_exception_only
+
+from doctrans.conformance import (
+    affected_groups,
+    ground_truths,
+    group_filenames,
+    load_manifest,
+    memoize_truths,
+)
+from doctrans.gen import gen
+from doctrans.pure_utils import get_module
+from doctrans.source_transformer import memoize_ast_parse
+from doctrans.writer import recording_writes
+
+# Seconds between polls of the watched files
+POLL_INTERVAL = 0.5
+
+# Seconds the files must go unchanged, after a change, before re-running
+DEBOUNCE = 0.2
+
+
+def snapshot(filenames):
+    """
+    :param filenames: Files to stat
+    :type filenames: ```Iterable[str]```
+
+    :returns: Filename to its modification time and size; None if it doesn't exist
+    :rtype: ```Dict[str, Optional[Tuple[int, int]]]```
+    """
+
+    def stamp(filename):
+        """
+        :param filename: File to stat
+        :type filename: ```str```
+
+        :returns: The file's modification time and size; None if it doesn't exist
+        :rtype: ```Optional[Tuple[int, int]]```
+        """
+        try:
+            return _stamp(stat(filename))
+        except OSError:
+            return None
+
+    return {filename: stamp(filename) for filename in filenames}
+
+
+def _stamp(st):
+    """
+    :param st: Status of a file
+    :type st: ```os.stat_result```
+
+    :returns: The file's modification time and size
+    :rtype: ```Tuple[int, int]```
+    """
+    return st.st_mtime_ns, st.st_size
+
+
+def watch(
+    get_filenames, run, interval=POLL_INTERVAL, debounce=DEBOUNCE, iterations=None
+):
+    """
+    Call `run` with every file; then poll the files, and call `run` with those changed, once they have gone unchanged
+    for `debounce` seconds. What `run` writes itself doesn't count as a change; anything else changed while it runs
+    does. An error from `run` is reported, and watching continues. Runs until interrupted.
+
+    :param get_filenames: Gives the resolved files to watch; called again after each run, as a run may change them
+    :type get_filenames: ```Callable[[], Iterable[str]]```
+
+    :param run: Re-runs for the resolved files that changed
+    :type run: ```Callable[[FrozenSet[str]], None]```
+
+    :param interval: Seconds between polls
+    :type interval: ```float```
+
+    :param debounce: Seconds the files must go unchanged, after a change, before `run` is called
+    :type debounce: ```float```
+
+    :param iterations: Number of times to call `run` on a change before returning; None for no limit
+    :type iterations: ```Optional[int]```
+    """
+    stamps = snapshot(get_filenames())
+    stamps = _run(run, frozenset(stamps), stamps, get_filenames)
+    while iterations is None or iterations > 0:
+        sleep(interval)
+        current = snapshot(stamps)
+        if current == stamps:
+            continue
+
+        # Wait out the burst of saves
+        settled = snapshot(stamps)
+        while True:
+            sleep(debounce)
+            current, settled = settled, snapshot(stamps)
+            if current == settled:
+                break
+        changed = frozenset(
+            filename for filename, stamp in settled.items() if stamps[filename] != stamp
+        )
+        if changed:
+            stamps = _run(run, changed, settled, get_filenames)
+            if iterations is not None:
+                iterations -= 1
+        else:
+            stamps = snapshot(get_filenames())
+
+
+def _run(run, changed, stamps, get_filenames):
+    """
+    Call `run`, then snapshot the files to count the next changes from: as `run` left those it wrote, but as they
+    were before it for the rest, so what was saved meanwhile—e.g., by an editor—is run again
+
+    :param run: Re-runs for the resolved files that changed
+    :type run: ```Callable[[FrozenSet[str]], None]```
+
+    :param changed: Resolved files that changed
+    :type changed: ```FrozenSet[str]```
+
+    :param stamps: Snapshot of the files, taken before `run`
+    :type stamps: ```Dict[str, Optional[Tuple[int, int]]]```
+
+    :param get_filenames: Gives the resolved files to watch
+    :type get_filenames: ```Callable[[], Iterable[str]]```
+
+    :returns: Snapshot of the files to count the next changes from
+    :rtype: ```Dict[str, Optional[Tuple[int, int]]]```
+    """
+    with recording_writes() as written:
+        _report_errors(run, changed)
+    return {
+        filename: (
+            stamp
+            if filename in written and stamp == _stamp(written[filename])
+            else stamps.get(filename, stamp)
+        )
+        for filename, stamp in snapshot(get_filenames()).items()
+    }
+
+
+def _report_errors(run, changed):
+    """
+    Call `run`, reporting rather than raising any error; e.g., from a file saved midway through an edit
+
+    :param run: Re-runs for the resolved files that changed
+    :type run: ```Callable[[FrozenSet[str]], None]```
+
+    :param changed: Resolved files that changed
+    :type changed: ```FrozenSet[str]```
+    """
+    try:
+        run(changed)
+    except Exception as e:
+        print(
+            "error",
+            "".join(format_exception_only(type(e), e)).rstrip("\n"),
+            sep="\t",
+            file=sys.stderr,
+        )
+
+
+def watch_sync(
+    groups, manifest=None, check=False, jobs=1, lock=False, watch_kwargs=None
+):
+    """
+    Sync every group, then re-sync each group whenever any of its files—truth or target—changes
+
+    :param groups: Namespace with the values of the CLI arguments, for each group
+    :type groups: ```List[Namespace]```
+
+    :param manifest: Manifest the groups were loaded from; when it changes, they are reloaded, and all re-synced
+    :type manifest: ```Optional[str]```
+
+    :param check: Only report which files would change, writing nothing
+    :type check: ```bool```
+
+    :param jobs: Number of processes to format files with. 0 uses one per CPU.
+    :type jobs: ```int```
+
+    :param lock: Skip the files unchanged since last conformed, per the `.doctrans.lock` beside each truth
+    :type lock: ```bool```
+
+    :param watch_kwargs: Passed to `watch`
+    :type watch_kwargs: ```Optional[dict]```
+    """
+    manifest = None if manifest is None else path.realpath(manifest)
+    groups = list(groups)
+
+    def get_filenames():
+        """
+        :returns: Resolved files of every group, and the manifest
+        :rtype: ```FrozenSet[str]```
+        """
+        return frozenset(filter(None, (manifest,))).union(*map(group_filenames, groups))
+
+    def run(changed):
+        """
+        Re-sync the groups affected by the change
+
+        :param changed: Resolved files that changed
+        :type changed: ```FrozenSet[str]```
+        """
+        if manifest in changed:
+            groups[:] = load_manifest(manifest)
+            affected = groups
+        else:
+            affected = affected_groups(groups, changed)
+        effect = ground_truths(affected, check=check, jobs=jobs, lock=lock)
+        if check:
+            for filename, drifted in effect.items():
+                if drifted:
+                    print("drifted", filename, sep="\t")
+
+    memoize_ast_parse()
+    memoize_truths()
+    try:
+        watch(get_filenames, run, **(watch_kwargs or {}))
+    finally:
+        memoize_ast_parse(0)
+        memoize_truths(0)
+
+
+def watch_gen(watch_kwargs=None, **gen_kwargs):
+    """
+    Generate, then regenerate—incrementally—whenever the module of the input mapping (or the file imports are taken
+    from) changes; reloading the module first
+
+    :param watch_kwargs: Passed to `watch`
+    :type watch_kwargs: ```Optional[dict]```
+
+    :param gen_kwargs: Passed to `gen`
+    :type gen_kwargs: ```**gen_kwargs```
+    """
+    module_name = gen_kwargs["input_mapping"].rpartition(".")[0]
+    imports_from_file = gen_kwargs.get("imports_from_file")
+
+    def get_filenames():
+        """
+        :returns: Resolved files of the input mapping's module, and of the file imports are taken from
+        :rtype: ```FrozenSet[str]```
+        """
+        return frozenset(
+            path.realpath(filename)
+            for filename in (
+                getfile(get_module(module_name)),
+                imports_from_file
+                if imports_from_file is not None and path.isfile(imports_from_file)
+                else None,
+            )
+            if filename is not None
+        )
+
+    def run(changed):
+        """
+        Reload the input mapping's module if it changed, then regenerate
+
+        :param changed: Resolved files that changed
+        :type changed: ```FrozenSet[str]```
+        """
+        module = get_module(module_name)
+        if run.ran and path.realpath(getfile(module)) in changed:
+            reload(module)
+        run.ran = True
+        if gen(**dict(gen_kwargs, incremental=True)) and gen_kwargs.get("check"):
+            print("drifted", gen_kwargs["output_filename"], sep="\t")
+
+    run.ran = False
+    memoize_ast_parse()
+    try:
+        watch(get_filenames, run, **(watch_kwargs or {}))
+    finally:
+        memoize_ast_parse(0)
+
+
+__all__ = ["DEBOUNCE", "POLL_INTERVAL", "snapshot", "watch", "watch_gen", "watch_sync"]
@@ -0,0 +1,222 @@
+"""
+Writing emitted code to files. Within `batched_writes`, every output is collected instead of written; then they are
+rendered—i.e., unparsed and formatted, the costly part—in parallel across a pool of processes, and each file is
+written atomically. A file whose output couldn't be rendered is left as it was, and reported.
+"""
+
+import sys
+from collections import OrderedDict
+from contextlib import contextmanager
+from multiprocessing import Pool
+from os import chmod, cpu_count, getpid, path, replace, stat, umask
+from shutil import copymode
+from tempfile import mkstemp
+from traceback import format_exception_only
+
+from doctrans import cache
+
+# Outputs collected within `batched_writes`, and the process collecting them; forked workers don't collect
+_pending = None
+_pending_pid = None
+
+# Files written within `recording_writes`, to their `os.stat` once written. None when not recording.
+_written = None
+
+
+class BatchWriteError(Exception):
+    """
+    Outputs that couldn't be rendered within `batched_writes`; every other file was written
+
+    :ivar errors: Filename to the error rendering its output
+    """
+
+    def __init__(self, errors):
+        """
+        :param errors: Filename to the error rendering its output
+        :type errors: ```OrderedDict[str, str]```
+        """
+        super(BatchWriteError, self).__init__(
+            "{:d} file(s) could not be written: {}".format(
+                len(errors), ", ".join(errors)
+            )
+        )
+        self.errors = errors
+
+
+def batching():
+    """
+    :returns: Whether outputs are being collected by `batched_writes`, in this process
+    :rtype: ```bool```
+    """
+    return _pending is not None and _pending_pid == getpid()
+
+
+def write(filename, mode, render, *args):
+    """
+    Write what `render(*args)` returns to the file. Within `batched_writes`, this is deferred to the end of it.
+
+    :param filename: File to write to
+    :type filename: ```str```
+
+    :param mode: "wt" to overwrite the file, "a" to append to it
+    :type mode: ```Literal['wt', 'a']```
+
+    :param render: Module-level function giving the source to write, picklable so it can be run in a worker process
+    :type render: ```Callable[..., str]```
+
+    :param args: Arguments to `render`
+    :type args: ```Any```
+    """
+    if batching():
+        _pending.append((filename, mode, render, args))
+    else:
+        _write_atomically(filename, ((mode, render(*args)),))
+
+
+@contextmanager
+def batched_writes(jobs=1):
+    """
+    Collect the outputs written within this context, then render them with `jobs` processes and write each file
+    atomically. Nothing is written if the context is left with an exception. Nested contexts join the outermost.
+
+    :param jobs: Number of processes to render with. 0 uses one per CPU.
+    :type jobs: ```int```
+    """
+    global _pending, _pending_pid
+
+    if batching():
+        yield
+        return
+    _pending, _pending_pid = [], getpid()
+    try:
+        yield
+        pending = _pending
+    finally:
+        _pending = _pending_pid = None
+    flush(pending, jobs)
+
+
+@contextmanager
+def recording_writes():
+    """
+    Record the files written within this context, and their status once written; so a watcher can tell the writes
+    from those made by others meanwhile
+
+    :returns: Resolved filename to its `os.stat` once written; filled in as they are
+    :rtype: ```Dict[str, os.stat_result]```
+    """
+    global _written
+
+    previous, _written = _written, {}
+    try:
+        yield _written
+    finally:
+        if previous is not None:
+            previous.update(_written)
+        _written = previous
+
+
+def flush(pending, jobs=1):
+    """
+    Render the outputs, in parallel, then write each file atomically; skipping (and reporting) those whose outputs
+    couldn't be rendered
+
+    :param pending: Filename, mode, render function, and its arguments; for each output, in the order written
+    :type pending: ```List[Tuple[str, str, Callable[..., str], Tuple[Any, ...]]]```
+
+    :param jobs: Number of processes to render with. 0 uses one per CPU.
+    :type jobs: ```int```
+
+    :raises BatchWriteError: If any output couldn't be rendered
+    """
+    jobs = min(jobs or cpu_count(), len(pending))
+    if jobs < 2:
+        rendered = list(map(_render, pending))
+    else:
+        # The workers may be spawned rather than forked, so get the cache directory explicitly. The formatter is
+        # among each render function's arguments.
+        with Pool(
+            jobs, initializer=cache.set_cache_dir, initargs=(cache.CACHE_DIR,)
+        ) as pool:
+            rendered = pool.map(_render, pending, chunksize=1)
+
+    files, errors = OrderedDict(), OrderedDict()
+    for (filename, mode, _, _), (src, error) in zip(pending, rendered):
+        if error is not None and filename not in errors:
+            errors[filename] = error
+        files.setdefault(filename, []).append((mode, src))
+    for filename, writes in files.items():
+        if filename in errors:
+            print("error", filename, errors[filename], sep="\t", file=sys.stderr)
+        else:
+            _write_atomically(filename, writes)
+    if errors:
+        raise BatchWriteError(errors)
+
+
+def _render(pending_output):
+    """
+    Render one output, catching any error so the other outputs are still written
+
+    :param pending_output: Filename, mode, render function, and its arguments
+    :type pending_output: ```Tuple[str, str, Callable[..., str], Tuple[Any, ...]]```
+
+    :returns: The source and None, or None and the error
+    :rtype: ```Tuple[Optional[str], Optional[str]]```
+    """
+    _, _, render, args = pending_output
+    try:
+        return render(*args), None
+    except Exception as e:
+        return None, "".join(format_exception_only(type(e), e)).rstrip("\n")
+
+
+def _write_atomically(filename, writes):
+    """
+    Apply the writes to the file, in order, via a temporary file that then replaces it; so readers see either the
+    old content or all of the new
+
+    :param filename: File to write to
+    :type filename: ```str```
+
+    :param writes: Mode ("wt" or "a") and source, for each write
+    :type writes: ```Iterable[Tuple[str, str]]```
+    """
+    filename = path.realpath(filename)
+    exists = path.isfile(filename)
+    content = None
+    for mode, src in writes:
+        if mode.startswith("a") and content is None:
+            content = ""
+            if exists:
+                with open(filename, "rt") as f:
+                    content = f.read()
+        content = src if mode.startswith("w") else content + src
+
+    fd, tmp_filename = mkstemp(
+        dir=path.dirname(path.abspath(filename)),
+        prefix=".{}.".format(path.basename(filename)),
+        suffix=".tmp",
+    )
+    with open(fd, "wt") as f:
+        f.write(content)
+    if exists:
+        copymode(filename, tmp_filename)
+    else:
+        # `mkstemp` creates the file readable only by its owner
+        mask = umask(0)
+        umask(mask)
+        chmod(tmp_filename, 0o666 & ~mask)
+    replace(tmp_filename, filename)
+    if _written is not None:
+        _written[filename] = stat(filename)
+
+
+__all__ = [
+    "BatchWriteError",
+    "batched_writes",
+    "batching",
+    "flush",
+    "recording_writes",
+    "write",
+]
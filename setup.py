@@ -51,7 +51,7 @@ def main():
         name=package_name,
         author=__author__,
         version=__version__,
-        install_requires=["pyyaml"],
+        install_requires=["pyyaml", 'toml; python_version < "3.11"'],
         test_suite=package_name + ".tests",
         packages=find_packages(),
         package_dir={package_name: package_name},